@@ -0,0 +1,59 @@
+"""
+Gunicorn settings for running the app in production:
+
+    gunicorn -c gunicorn.conf.py src.run:app
+
+The values come from the config class selected by APP_CONFIG (see src/config.py).
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.config import get_config_class  # noqa: E402
+
+app_config = get_config_class()
+
+bind = f":{os.environ.get('PORT', '5000')}"
+
+worker_class = app_config.GUNICORN_WORKER_CLASS
+workers = app_config.GUNICORN_WORKERS
+threads = app_config.GUNICORN_THREADS
+
+# each worker holds at least one pooled connection and its LISTEN connection
+if workers * 2 > app_config.DATABASE_MAX_CONNECTIONS:
+    raise RuntimeError(f'{workers} workers need more than DATABASE_MAX_CONNECTIONS='
+                       f'{app_config.DATABASE_MAX_CONNECTIONS} database connections, lower WEB_CONCURRENCY')
+
+keepalive = app_config.GUNICORN_KEEPALIVE
+timeout = app_config.GUNICORN_TIMEOUT
+graceful_timeout = app_config.GUNICORN_GRACEFUL_TIMEOUT
+
+max_requests = app_config.GUNICORN_MAX_REQUESTS
+max_requests_jitter = app_config.GUNICORN_MAX_REQUESTS_JITTER
+
+preload_app = app_config.GUNICORN_PRELOAD_APP
+
+# the app writes its own structured access log records
+accesslog = None
+errorlog = '-'
+
+
+def when_ready(server):
+    if server.cfg.preload_app:
+        from src.run import app
+        server.log.info('App preloaded in %sms', app.extensions['boot_ms'])
+
+    server.log.info('Serving with %s %s workers x %s threads',
+                    server.cfg.workers, server.cfg.worker_class_str, server.cfg.threads)
+
+
+def post_fork(server, worker):
+    if server.cfg.preload_app:
+        # create_app opens no connections but make sure a forked worker never
+        # shares a pooled connection with the master or its siblings
+        from src.run import app
+        from src.app import db
+
+        with app.app_context():
+            db.get_engine(app).dispose()
@@ -1,20 +1,20 @@
 from flask import Flask, render_template, jsonify
 from flask_sqlalchemy import SQLAlchemy
 from src.config import DevelopmentConfig
-from flask_migrate import Migrate
 
-import logging
-from logging.handlers import RotatingFileHandler
-import os
-from dotenv import load_dotenv
-
-basedir = os.path.abspath(os.path.dirname(__file__))
-load_dotenv(os.path.join(basedir, '.env'))
+import click
+import time
 
 db = SQLAlchemy()
 
 
 def create_app(config_class=DevelopmentConfig):
+    """
+    Creates the app without opening any database connection or socket so that it can be
+    preloaded by the gunicorn master and shared copy-on-write with the forked workers
+    """
+    boot_started_at = time.perf_counter()
+
     app = Flask(__name__)
 
     # Setup configurations
@@ -32,24 +32,41 @@ def create_app(config_class=DevelopmentConfig):
 
     db.init_app(app)
 
-    Migrate(app, db)
+    from src.app.blueprints.api_v1.utils.auth0_helper import init_auth
+    init_auth(app)
 
-    if not app.debug and not app.testing:
-        # enable logging
-        if not os.path.exists('logs'):
-            os.mkdir('logs')
+    from src.app.utils.pg_notify import init_notifications
+    from src.app.models.activity_event import ACTIVITY_CHANNEL
+    init_notifications(app)
+    app.extensions['notification_listener'].register_channel(ACTIVITY_CHANNEL)
+
+    from src.app.blueprints.api_v1.utils.live_feed import init_feed
+    init_feed(app)
 
-        APP_NAME = os.environ.get('APP_NAME')
-        file_handler = RotatingFileHandler(
-            f'logs/{APP_NAME}.log', maxBytes=10240, backupCount=10)
+    from src.app.utils.cache_bus import init_cache_bus
+    init_cache_bus(app)
 
-        file_handler.setFormatter(logging.Formatter(
-            '%(asctime)s %(levelname)s: %(messages)s [in %(pathname)s:%(lineno)d]'))
+    from src.app.utils.compression import init_compression
+    init_compression(app)
 
-        file_handler.setLevel(logging.INFO)
-        app.logger.addHandler(file_handler)
+    from src.app.cli import init_cli
+    init_cli(app)
+
+    # Flask-Migrate pulls in alembic which is only needed by the `flask db` commands,
+    # so it is only registered when the app is loaded by the flask cli
+    if click.get_current_context(silent=True) is not None:
+        from flask_migrate import Migrate
+        Migrate(app, db)
+
+    boot_ms = round((time.perf_counter() - boot_started_at) * 1000, 2)
+    app.extensions['boot_ms'] = boot_ms
+
+    if not app.debug and not app.testing:
+        # enable logging
+        from src.app.utils.request_logging import init_logging
+        init_logging(app)
 
-        app.logger.setLevel(logging.INFO)
-        app.logger.info(f'{APP_NAME} startup')
+        app.logger.info(f"{app.config['APP_NAME']} startup",
+                        extra={"boot_ms": boot_ms})
 
     return app
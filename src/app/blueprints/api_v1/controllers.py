@@ -1,17 +1,33 @@
 from flask import Blueprint, current_app, request, jsonify, abort, make_response
-from flask_sqlalchemy import SQLAlchemy
 from marshmallow import ValidationError
 from src.app.blueprints.api_v1.utils.auth0_helper import requires_auth, get_jwt_subject
-from src.app.blueprints.api_v1.utils.input_validators import Nanodegree_Input_Schema, Project_Input_Schema, Question_Input_Schema
+from src.app.blueprints.api_v1.utils.input_validators import Nanodegree_Input_Schema, Project_Input_Schema, Question_Input_Schema, Batch_Input_Schema, Comment_Input_Schema
+from src.app.blueprints.api_v1.utils.batch import dispatch_sub_request
+from src.app.blueprints.api_v1.utils.sparse_fieldsets import get_requested_fields
+from src.app.blueprints.api_v1.utils.multi_get import get_requested_ids, get_by_ids, serialize_multi_get
 from src.app.models.user import User
 from src.app.models.nanodegree import Nanodegree
 from src.app.models.project import Project
 from src.app.models.question import Question
 from src.app.models.answer import Answer
+from src.app.models.question_comment import QuestionComment
+from src.app.models.answer_comment import AnswerComment
+from src.app.models.activity_event import ActivityEvent
+from src.app.models.nanodegree_stats import get_nanodegree_stats
+from src.app.blueprints.api_v1.utils.live_feed import stream_activity
+from src.app.blueprints.api_v1.utils.dashboard import build_dashboard
+from src.app.blueprints.api_v1.utils.idempotency import idempotent
+from src.app.blueprints.api_v1.utils.preconditions import ANY_VERSION, get_if_match_versions, make_etag
+from src.app.blueprints.api_v1.utils.comments import get_comments_page_size, get_comment_thread, load_comment_threads
+from src.app.utils.cache_bus import invalidate, get_or_compute
+from src.app.utils.jobs import enqueue
+from src.app.utils.bulk_enrollment import MEDIA_TYPES, bulk_enroll
+from src.app.utils.hot_queries import get_by_id, get_user, get_enrolled_student, get_projects_of_nanodegree, count_questions, get_questions_page
+from src.app import db
+from sqlalchemy.orm import undefer
+import math
 import sys
 
-db = SQLAlchemy()
-
 
 api_v1_bp = Blueprint('api_v1', __name__)
 
@@ -21,8 +37,39 @@ def api_home():
     return jsonify({"message": "Welcome to the Student Hub API"})
 
 
+@api_v1_bp.route('/batch', methods=['POST'])
+def batch():
+    """
+    Executes several API requests in one HTTP round trip and returns their responses in the same order.
+
+    Each sub-request is dispatched through the api_v1 routes with the Authorization header of the batch
+    request. The sub-requests are not atomic, each one commits or fails on its own.
+    """
+    request_payload = request.get_json()
+
+    try:
+        input_is_valid = Batch_Input_Schema().load(request_payload)
+
+    except ValidationError:
+        abort(400)
+
+    sub_requests = request_payload['requests']
+
+    if len(sub_requests) > current_app.config['MAX_BATCH_REQUESTS']:
+        abort(400)
+
+    responses = [dispatch_sub_request(sub_request['method'], sub_request['path'], sub_request.get('body'))
+                 for sub_request in sub_requests]
+
+    return jsonify({
+        "success": True,
+        "data": responses
+    })
+
+
 @api_v1_bp.route('/nanodegrees', methods=['POST'])
 @requires_auth(permission="create:nanodegree")
+@idempotent
 def create_nanodegree(jwt):
     """
     Creates a new Nanodegree program
@@ -40,6 +87,9 @@ def create_nanodegree(jwt):
         description = request_payload['description']
 
         new_nanodegree = Nanodegree(title=title, description=description)
+
+        invalidate('nanodegrees')
+
         new_nanodegree.save()
         print(new_nanodegree)
 
@@ -61,11 +111,18 @@ def create_nanodegree(jwt):
 @api_v1_bp.route('/nanodegrees', methods=['GET'])
 def get_nanodegrees():
     """Returns a list of all available nanodegrees"""
-    try:
-        list_of_nanodegrees = Nanodegree.query.all()
+    fields = get_requested_fields(Nanodegree.API_FIELDS)
+
+    def load_nanodegrees():
+        list_of_nanodegrees = Nanodegree.query.options(
+            Nanodegree.load_only_fields(fields)).all()
 
-        list_of_nanodegrees = [nanodegree.serialize()
-                               for nanodegree in list_of_nanodegrees]
+        return [nanodegree.serialize(fields)
+                for nanodegree in list_of_nanodegrees]
+
+    try:
+        list_of_nanodegrees = get_or_compute('nanodegrees', tuple(fields), load_nanodegrees,
+                                             current_app.config['NANODEGREES_CACHE_TTL'])
 
         response_object = {
             "success": True,
@@ -84,6 +141,7 @@ def get_nanodegrees():
 
 @api_v1_bp.route('/nanodegrees/<int:nanodegree_id>/projects', methods=['POST'])
 @requires_auth(permission="create:project")
+@idempotent
 def create_nanodegree_projects(jwt, nanodegree_id):
     """Creates new projects for a nanodegree"""
 
@@ -105,6 +163,8 @@ def create_nanodegree_projects(jwt, nanodegree_id):
             new_project = Project(title=project['title'])
             nanodegree.projects.append(new_project)
 
+        invalidate('projects', nanodegree_id)
+
         nanodegree.save()
 
         number_of_projects = len(list_of_projects)
@@ -128,14 +188,18 @@ def create_nanodegree_projects(jwt, nanodegree_id):
 def get_nanodegree_projects(nanodegree_id):
     """Returns all the projects for a given nanodegree"""
 
-    nanodegree = Nanodegree.query.get(nanodegree_id)
+    fields = get_requested_fields(Project.API_FIELDS)
+
+    nanodegree = get_by_id(Nanodegree, nanodegree_id)
 
     if nanodegree is None:
         abort(404)
 
     try:
-        list_of_projects = [project.serialize()
-                            for project in nanodegree.projects]
+        projects = get_projects_of_nanodegree(nanodegree_id, fields)
+
+        list_of_projects = [project.serialize(fields)
+                            for project in projects]
 
         if len(list_of_projects) == 0:
             return make_response(jsonify({
@@ -159,6 +223,100 @@ def get_nanodegree_projects(nanodegree_id):
         db.session.close()
 
 
+@api_v1_bp.route('/projects', methods=['GET'])
+def get_projects_by_id():
+    """Returns the projects with the ids given in the ids query parameter using a single query"""
+
+    ids = get_requested_ids()
+
+    fields = get_requested_fields(Project.API_FIELDS)
+
+    try:
+        projects = get_by_ids(Project, ids, Project.load_only_fields(fields))
+
+        return jsonify(serialize_multi_get(ids, projects, lambda project: project.serialize(fields)))
+
+    except:
+        print(sys.exc_info())
+        abort(500)
+
+    finally:
+        db.session.close()
+
+
+@api_v1_bp.route('/users', methods=['GET'])
+def get_users_by_id():
+    """Returns the users with the ids given in the ids query parameter using a single query"""
+
+    ids = get_requested_ids()
+
+    try:
+        users = get_by_ids(User, ids, User.load_only_fields(
+            list(User.API_FIELDS)))
+
+        return jsonify(serialize_multi_get(ids, users, lambda user: user.serialize()))
+
+    except:
+        print(sys.exc_info())
+        abort(500)
+
+    finally:
+        db.session.close()
+
+
+@api_v1_bp.route('/nanodegrees/<int:nanodegree_id>/feed', methods=['GET'])
+@api_v1_bp.route('/nanodegrees/<int:nanodegree_id>/projects/<int:project_id>/feed', methods=['GET'])
+def get_activity_feed(nanodegree_id, project_id=None):
+    """
+    Streams new questions, new answers and accepted answers in a nanodegree, or one of its projects, as server-sent events
+    """
+
+    nanodegree = Nanodegree.query.get(nanodegree_id)
+
+    if nanodegree is None:
+        abort(404)
+
+    return stream_activity(nanodegree_id, project_id)
+
+
+@api_v1_bp.route('/nanodegrees/<int:nanodegree_id>/stats', methods=['GET'])
+def get_nanodegree_statistics(nanodegree_id):
+    """
+    Returns the question and enrollment statistics of a nanodegree.
+
+    The statistics are read from materialized views refreshed by `flask stats refresh`
+    so they are as old as the refreshed_at timestamp.
+    """
+
+    nanodegree = Nanodegree.query.get(nanodegree_id)
+
+    if nanodegree is None:
+        abort(404)
+
+    try:
+        stats = get_or_compute('nanodegree_stats', nanodegree_id, lambda: get_nanodegree_stats(nanodegree_id),
+                               current_app.config['STATS_CACHE_TTL'])
+
+    except:
+        print(sys.exc_info())
+        abort(500)
+
+    finally:
+        db.session.close()
+
+    if stats is None:
+        return make_response(jsonify({
+            "success": False,
+            "error": 404,
+            "message": "The statistics of this nanodegree have not been computed yet. Please check back later."
+        }), 404)
+
+    return jsonify({
+        "success": True,
+        "data": stats
+    })
+
+
 @api_v1_bp.route('/nanodegrees/<int:nanodegree_id>/students', methods=['GET'])
 @requires_auth(permission="get:nanodegree-students")
 def get_nanodegree_students(jwt, nanodegree_id):
@@ -243,11 +401,10 @@ def enroll_in_nanodegree(nanodegree_id):
 
     jwt_subject = get_jwt_subject()
 
-    nanodegree = Nanodegree.query.get(nanodegree_id)
+    nanodegree = get_by_id(Nanodegree, nanodegree_id)
 
     # check if the student is already enrolled and raise an error if so
-    already_enrolled_student = nanodegree.students.filter_by(
-        jwt_subject=jwt_subject).first()
+    already_enrolled_student = get_enrolled_student(nanodegree_id, jwt_subject)
 
     if already_enrolled_student is not None:
         return make_response(jsonify({"error": 409,
@@ -256,7 +413,7 @@ def enroll_in_nanodegree(nanodegree_id):
 
     try:
         # check if the student is in the db
-        student = User.query.filter_by(jwt_subject=jwt_subject).first()
+        student = get_user(jwt_subject)
 
         # if not present create the student in the db
         if student is None:
@@ -265,6 +422,14 @@ def enroll_in_nanodegree(nanodegree_id):
 
         # then proceed as usual and register the student for that nanodegree
         nanodegree.students.append(student)
+
+        invalidate('enrollments', nanodegree_id)
+        invalidate('users', jwt_subject)
+        invalidate('dashboards', jwt_subject)
+
+        enqueue('refresh_stats', unique_key='refresh_stats',
+                delay=current_app.config['STATS_REFRESH_DELAY'])
+
         nanodegree.save()
 
         # return success message
@@ -283,8 +448,69 @@ def enroll_in_nanodegree(nanodegree_id):
         db.session.close()
 
 
+@api_v1_bp.route('/nanodegrees/<int:nanodegree_id>/enrollments', methods=['POST'])
+@requires_auth(permission="create:enrollments")
+def bulk_enroll_in_nanodegree(jwt, nanodegree_id):
+    """
+    Enrolls a cohort of students in a given nanodegree from a CSV or NDJSON stream of JWT subjects
+
+    The request body is streamed into a staging table with COPY rather than loaded in memory.
+    """
+    file_format = MEDIA_TYPES.get(request.mimetype)
+
+    if file_format is None:
+        abort(415)
+
+    nanodegree = Nanodegree.query.get(nanodegree_id)
+
+    if nanodegree is None:
+        abort(404)
+
+    try:
+        report = bulk_enroll(nanodegree_id, request.stream, file_format)
+
+        return jsonify({
+            "success": True,
+            "data": report
+        })
+
+    except:
+        print(sys.exc_info())
+        abort(500)
+
+    finally:
+        db.session.close()
+
+
+@api_v1_bp.route('/me/dashboard', methods=['GET'])
+def get_my_dashboard():
+    """
+    Returns the enrolled nanodegrees, questions, answers and the unanswered questions in the
+    nanodegrees of the user making the request in a single response
+    """
+
+    jwt_subject = get_jwt_subject()
+
+    try:
+        dashboard = get_or_compute('dashboards', jwt_subject, lambda: build_dashboard(jwt_subject),
+                                   current_app.config['DASHBOARD_CACHE_TTL'])
+
+        return jsonify({
+            "success": True,
+            "data": dashboard
+        })
+
+    except:
+        print(sys.exc_info())
+        abort(500)
+
+    finally:
+        db.session.close()
+
+
 @api_v1_bp.route('/questions', methods=['POST'])
 @requires_auth(permission="create:question")
+@idempotent
 def create_new_question(jwt):
     """
     Creates a new question on the platform
@@ -306,14 +532,14 @@ def create_new_question(jwt):
     github_link = question['github_link']
 
     # get nanodegree
-    nanodegree = Nanodegree.query.get(nanodegree_id)
+    nanodegree = get_by_id(Nanodegree, nanodegree_id)
 
     if nanodegree is None:
         print("Nanodegree not found")
         abort(404)
 
     # get project
-    project = Project.query.get(project_id)
+    project = get_by_id(Project, project_id)
 
     if project is None:
         print("Project not found")
@@ -324,8 +550,8 @@ def create_new_question(jwt):
         jwt_subject = get_jwt_subject()
 
         # check if the student is enrolled in that nanodegree and return an error if not
-        already_enrolled_student = nanodegree.students.filter_by(
-            jwt_subject=jwt_subject).first()
+        already_enrolled_student = get_enrolled_student(
+            nanodegree.id, jwt_subject)
 
         if already_enrolled_student is None:
             return make_response(jsonify({
@@ -334,7 +560,7 @@ def create_new_question(jwt):
             }), 403)
 
         # get the student
-        student = User.query.filter_by(jwt_subject=jwt_subject).first()
+        student = get_user(jwt_subject)
 
         # create question
         question = Question(title=title,
@@ -349,6 +575,18 @@ def create_new_question(jwt):
         # # assign question to nanodegree
         # nanodegree.questions.append(question)
 
+        db.session.add(question)
+        db.session.flush()
+
+        ActivityEvent.record('question_created', nanodegree.id,
+                             project.id, question.serialize_preview())
+
+        invalidate('questions')
+        invalidate('dashboards', jwt_subject)
+
+        enqueue('refresh_stats', unique_key='refresh_stats',
+                delay=current_app.config['STATS_REFRESH_DELAY'])
+
         question.save()
 
         # get back the question data
@@ -371,8 +609,14 @@ def create_new_question(jwt):
 def get_questions():
     """
     Returns a paginated list of questions on the platform
+
+    The first page is the hottest so it is served from the questions cache.
+    If an ids query parameter is given the questions with those ids are returned instead
     """
 
+    if 'ids' in request.args:
+        return get_questions_by_id()
+
     request_body = request.get_json(
     ) or {'page': 1, 'questions_per_page': int(current_app.config['QUESTIONS_PER_PAGE'])}
 
@@ -383,25 +627,28 @@ def get_questions():
 
     questions_per_page = request_body['questions_per_page'] or int(current_app.config['QUESTIONS_PER_PAGE'])
 
-    if questions_per_page <= 0:
+    if questions_per_page <= 0 or questions_per_page > current_app.config['MAX_QUESTIONS_PER_PAGE']:
         abort(400)
 
-    start = ((page - 1) * questions_per_page) + 1
+    fields = get_requested_fields(Question.PREVIEW_FIELDS)
 
-    questions = Question.query
+    start = ((page - 1) * questions_per_page) + 1
 
-    total_number_of_questions = questions.count()
+    def load_questions_page():
+        total_number_of_questions = count_questions()
 
-    questions_pagination_object = questions.paginate(
-        start, questions_per_page, False)
+        if total_number_of_questions < 1:
+            return None
 
-    if total_number_of_questions < 1:
-        abort(404)
+        # same page as questions.paginate(start, questions_per_page, False), whose count
+        # query would repeat the one above
+        questions = get_questions_page(
+            (start - 1) * questions_per_page, questions_per_page, fields)
 
-    try:
-        has_next_page = questions_pagination_object.has_next
+        has_next_page = start < math.ceil(
+            total_number_of_questions / questions_per_page)
 
-        has_prev_page = questions_pagination_object.has_prev
+        has_prev_page = start > 1
 
         next_page = None
 
@@ -413,22 +660,25 @@ def get_questions():
         if has_prev_page:
             previous_page = page - 1
 
-        list_of_questions = [question.serialize_preview()
-                             for question in questions_pagination_object.items]
+        list_of_questions = [question.serialize_preview(fields)
+                             for question in questions]
 
-        response_data = {
-            "success": True,
-            "data": {
-                "questions": list_of_questions,
-                "total_number_of_questions": total_number_of_questions,
-                "has_next_page": has_next_page,
-                "next_page": next_page,
-                "has_previous_page": has_prev_page,
-                "previous_page": previous_page
-            }
+        return {
+            "questions": list_of_questions,
+            "total_number_of_questions": total_number_of_questions,
+            "has_next_page": has_next_page,
+            "next_page": next_page,
+            "has_previous_page": has_prev_page,
+            "previous_page": previous_page
         }
 
-        return jsonify(response_data)
+    try:
+        if page == 1:
+            questions_page = get_or_compute('questions', (questions_per_page, tuple(fields)), load_questions_page,
+                                            current_app.config['QUESTIONS_CACHE_TTL'])
+
+        else:
+            questions_page = load_questions_page()
 
     except:
         print(sys.exc_info())
@@ -437,30 +687,210 @@ def get_questions():
     finally:
         db.session.close()
 
+    if questions_page is None:
+        abort(404)
 
-@api_v1_bp.route('/questions/<int:question_id>', methods=['PATCH'])
-@requires_auth(permission="update:question")
-def update_question(jwt, question_id):
-    "Updates the details of a given question the person making the request is the same as the original poster and returns the updated question"
+    response_data = {
+        "success": True,
+        "data": questions_page
+    }
 
-    who_made_the_request = get_jwt_subject()
+    return jsonify(response_data)
+
+
+def get_questions_by_id():
+    """Returns the questions with the ids given in the ids query parameter using a single query"""
+
+    ids = get_requested_ids()
 
-    question_to_be_edited = Question.query.get(question_id)
+    fields = get_requested_fields(Question.PREVIEW_FIELDS)
 
-    if question_to_be_edited is None:
+    try:
+        # deleted questions are reported as not found like on the question page
+        questions = get_by_ids(Question, ids, Question.load_only_fields(
+            fields, Question.PREVIEW_FIELDS), criteria=[Question.is_deleted.is_(False)])
+
+        return jsonify(serialize_multi_get(ids, questions, lambda question: question.serialize_preview(fields)))
+
+    except:
+        print(sys.exc_info())
+        abort(500)
+
+    finally:
+        db.session.close()
+
+
+@api_v1_bp.route('/questions/<int:question_id>', methods=['GET'])
+def get_question(question_id):
+    """
+    Returns a question with its answers and the first page of comments on the question and on each answer
+
+    The comments of the question and of all its answers are fetched in a single query.
+    """
+
+    question = Question.query.options(undefer('details')).get(question_id)
+
+    if question is None or question.is_deleted:
         abort(404)
 
-    original_poster = User.query.get(question_to_be_edited.posted_by)
+    page_size = get_comments_page_size()
+
+    try:
+        answers = Answer.query.filter_by(question_id=question_id).options(
+            undefer('details')).order_by(Answer.id).all()
+
+        question_comments, answer_comments = load_comment_threads(
+            question_id, [answer.id for answer in answers], page_size)
+
+        response_data = dict(question.serialize_full(), comments=question_comments, answers=[
+            dict(answer.serialize(), comments=answer_comments[answer.id]) for answer in answers])
+
+        return make_response(jsonify({
+            "success": True,
+            "data": response_data
+        }), 200, {"ETag": make_etag(question.version)})
+
+    except:
+        print(sys.exc_info())
+        abort(500)
+
+    finally:
+        db.session.close()
+
+
+def get_enrolled_commenter(nanodegree_id):
+    """
+    Returns the user making the request if they are enrolled in the nanodegree,
+    only enrolled students can comment on its questions and answers
+    """
+    jwt_subject = get_jwt_subject()
+
+    return User.query.filter(User.jwt_subject == jwt_subject, User.nanodegrees.any(
+        Nanodegree.id == nanodegree_id)).first()
 
-    if original_poster.jwt_subject != who_made_the_request:
-        abort(403)
+
+def create_comment(comment_model, nanodegree_id, **thread):
+    """Validates the request payload and saves a comment posted by an enrolled student"""
 
     request_payload = request.get_json()
 
-    title = request_payload.get('title', question_to_be_edited.title)
-    details = request_payload.get('details', question_to_be_edited.details)
-    github_link = request_payload.get(
-        'github_link', question_to_be_edited.github_link)
+    try:
+        input_is_valid = Comment_Input_Schema().load(request_payload)
+
+    except ValidationError:
+        abort(400)
+
+    student = get_enrolled_commenter(nanodegree_id)
+
+    if student is None:
+        return make_response(jsonify({
+            "success": False,
+            "message": "The student is not enrolled in the Nanodegree so they are not allowed to comment"
+        }), 403)
+
+    try:
+        comment = comment_model(
+            details=request_payload['details'], posted_by=student.id, **thread)
+
+        comment.save()
+
+        return make_response(jsonify({
+            "success": True,
+            "data": comment.serialize()
+        }), 201)
+
+    except:
+        print(sys.exc_info())
+        abort(500)
+
+    finally:
+        db.session.close()
+
+
+@api_v1_bp.route('/questions/<int:question_id>/comments', methods=['POST'])
+@requires_auth(permission="create:comment")
+@idempotent
+def comment_on_question(jwt, question_id):
+    """Adds a comment to a question"""
+
+    question = Question.query.get(question_id)
+
+    if question is None or question.is_deleted:
+        abort(404)
+
+    return create_comment(QuestionComment, question.nanodegree_id, question_id=question_id)
+
+
+@api_v1_bp.route('/questions/<int:question_id>/comments', methods=['GET'])
+def get_question_comments(question_id):
+    """Returns a page of the comments on a question, the next page is requested with the next_cursor of the previous one"""
+
+    question = Question.query.get(question_id)
+
+    if question is None or question.is_deleted:
+        abort(404)
+
+    page_size = get_comments_page_size()
+
+    try:
+        return jsonify(dict(get_comment_thread(QuestionComment, QuestionComment.question_id, question_id,
+                                               page_size, request.args.get('cursor')), success=True))
+
+    finally:
+        db.session.close()
+
+
+@api_v1_bp.route('/answers/<int:answer_id>/comments', methods=['POST'])
+@requires_auth(permission="create:comment")
+@idempotent
+def comment_on_answer(jwt, answer_id):
+    """Adds a comment to an answer"""
+
+    answer = Answer.query.get(answer_id)
+
+    if answer is None:
+        abort(404)
+
+    return create_comment(AnswerComment, answer.question.nanodegree_id, answer_id=answer_id)
+
+
+@api_v1_bp.route('/answers/<int:answer_id>/comments', methods=['GET'])
+def get_answer_comments(answer_id):
+    """Returns a page of the comments on an answer, the next page is requested with the next_cursor of the previous one"""
+
+    answer = Answer.query.get(answer_id)
+
+    if answer is None:
+        abort(404)
+
+    page_size = get_comments_page_size()
+
+    try:
+        return jsonify(dict(get_comment_thread(AnswerComment, AnswerComment.answer_id, answer_id,
+                                               page_size, request.args.get('cursor')), success=True))
+
+    finally:
+        db.session.close()
+
+
+@api_v1_bp.route('/questions/<int:question_id>', methods=['PATCH'])
+@requires_auth(permission="update:question")
+def update_question(jwt, question_id):
+    """
+    Updates the details of a given question if the person making the request is the same as the original poster and returns the updated question
+
+    The request must carry the ETag of the question it edits in an If-Match header so that concurrent
+    edits don't overwrite each other. The question is checked, updated and read back with a single
+    UPDATE ... RETURNING statement.
+    """
+
+    who_made_the_request = get_jwt_subject()
+
+    request_payload = request.get_json() or {}
+
+    title = request_payload.get('title', '')
+    details = request_payload.get('details', '')
+    github_link = request_payload.get('github_link')
 
     # validate input
     if type(title) != str:
@@ -468,28 +898,36 @@ def update_question(jwt, question_id):
 
     if type(details) != str:
         return make_response(jsonify({"message": "bad details"}), 400)
-        # abort(400)
 
-    if type(github_link) not in [str, None]:
+    if github_link is not None and type(github_link) != str:
         return make_response(jsonify({"message": "bad link"}), 400)
-        # abort(400)
 
-    try:
-        question_to_be_edited.title = title
+    # only the fields present in the payload are updated
+    values = {field: request_payload[field] for field in [
+        'title', 'details', 'github_link'] if field in request_payload}
 
-        question_to_be_edited.details = details
+    expected_versions = get_if_match_versions()
 
-        question_to_be_edited.github_link = github_link
+    question = None
 
-        question_to_be_edited.update()
+    try:
+        if expected_versions is not None:
+            question = Question.update_if_posted_by(question_id, who_made_the_request,
+                                                    None if expected_versions == ANY_VERSION else expected_versions,
+                                                    **values)
 
-        question = question_to_be_edited
+        if question is not None:
+            invalidate('questions')
+            invalidate('dashboards', who_made_the_request)
 
-        response_data = {"success": True,
-                         "message": "Question successfully updated",
-                         "data": question.serialize_preview()}
+            db.session.commit()
 
-        return jsonify(response_data)
+        else:
+            db.session.rollback()
+
+            # nothing was updated so find out why
+            write_access = Question.get_write_access(
+                question_id, who_made_the_request)
 
     except:
         print(sys.exc_info())
@@ -498,31 +936,64 @@ def update_question(jwt, question_id):
     finally:
         db.session.close()
 
+    if question is None:
+        if write_access is None:
+            abort(404)
+
+        if not write_access.is_poster:
+            abort(403)
+
+        if expected_versions is None:
+            status_code = 428
+            message = "Send the ETag of the question you are editing in an If-Match header."
+
+        else:
+            status_code = 412
+            message = "The question has been modified since you last fetched it."
+
+        return make_response(jsonify({
+            "success": False,
+            "error": status_code,
+            "message": message
+        }), status_code, {"ETag": make_etag(write_access.version)})
+
+    response_data = {"success": True,
+                     "message": "Question successfully updated",
+                     "data": Question.serialize_preview_row(question)}
+
+    return make_response(jsonify(response_data), 200, {"ETag": make_etag(question.version)})
+
 
 @api_v1_bp.route('/questions/<int:question_id>', methods=['DELETE'])
 @requires_auth(permission="delete:question")
 def delete_question(jwt, question_id):
-    "Marks a given question as deleted if the person making the request is the same as the original poster"
+    """
+    Marks a given question as deleted if the person making the request is the same as the original poster
 
-    who_made_the_request = get_jwt_subject()
+    The question is checked and marked as deleted with a single UPDATE statement.
+    """
 
-    question_to_be_deleted = Question.query.get(question_id)
+    who_made_the_request = get_jwt_subject()
 
-    if question_to_be_deleted is None:
-        abort(404)
+    try:
+        question = Question.update_if_posted_by(
+            question_id, who_made_the_request, is_deleted=True)
 
-    original_poster = User.query.get(question_to_be_deleted.posted_by)
+        if question is not None:
+            invalidate('questions')
+            invalidate('dashboards', who_made_the_request)
 
-    if original_poster.jwt_subject != who_made_the_request:
-        abort(403)
+            # the stats views leave deleted questions out
+            enqueue('refresh_stats', unique_key='refresh_stats',
+                    delay=current_app.config['STATS_REFRESH_DELAY'])
 
-    try:
-        question_to_be_edited.is_deleted = True
+            db.session.commit()
 
-        response_data = {"success": True,
-                         "message": "Question successfully deleted"}
+        else:
+            db.session.rollback()
 
-        return jsonify(response_data)
+            write_access = Question.get_write_access(
+                question_id, who_made_the_request)
 
     except:
         print(sys.exc_info())
@@ -530,3 +1001,11 @@ def delete_question(jwt, question_id):
 
     finally:
         db.session.close()
+
+    if question is None:
+        abort(404 if write_access is None else 403)
+
+    response_data = {"success": True,
+                     "message": "Question successfully deleted"}
+
+    return jsonify(response_data)
@@ -1,19 +1,12 @@
 import json
-from flask import request, _request_ctx_stack, abort
+import sys
+import threading
+import time
+from flask import request, _request_ctx_stack, abort, current_app, g
 from functools import wraps
 import jose
 from jose import jwt
 from urllib.request import urlopen
-import os
-from dotenv import load_dotenv
-
-basedir = os.path.abspath(os.path.dirname(__file__))
-load_dotenv(os.path.join(basedir, '.env'))
-
-
-AUTH0_DOMAIN = os.environ.get('AUTH0_TENANT_DOMAIN')
-ALGORITHMS = os.environ.get('AUTH0_ALGORITHMS')
-API_AUDIENCE = os.environ.get('AUTH0_API_AUDIENCE')
 
 
 class AuthError(Exception):
@@ -78,12 +71,141 @@ def check_permissions(permission, payload):
     return True
 
 
+def find_rsa_key(jwks, kid):
+    """
+    Returns the key in a JSON Web Key Set matching the given key id or None if there is no match
+    """
+    for key in jwks["keys"]:
+        if key["kid"] == kid:
+            return {
+                "kty": key["kty"],
+                "kid": key["kid"],
+                "use": key["use"],
+                "n": key["n"],
+                "e": key["e"]
+            }
+
+    return None
+
+
+class JWKSKeyProvider(object):
+    """
+    Provides the signing keys published by the identity provider at a JWKS url.
+
+    The key set is cached for cache_ttl seconds. An unknown key id triggers a refetch,
+    at most once every min_refresh_interval seconds, so that rotated keys are picked up.
+
+    A single thread fetches the key set at a time, giving up after timeout seconds. The other
+    threads keep verifying tokens with the cached keys meanwhile and only wait for the fetch if
+    they need a key which is not cached. If a refresh fails the cached keys are kept and the
+    fetch is tried again after min_refresh_interval seconds.
+    """
+
+    def __init__(self, jwks_url, cache_ttl=3600, min_refresh_interval=60, timeout=5):
+        self.jwks_url = jwks_url
+        self.cache_ttl = cache_ttl
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+        self._jwks = None
+        self._fetched_at = 0
+        self._retry_at = 0
+        self._lock = threading.Lock()
+
+    def _load_jwks(self):
+        jsonurl = urlopen(self.jwks_url, timeout=self.timeout)
+        return json.loads(jsonurl.read())
+
+    def _fetch_jwks(self):
+        self._jwks = self._load_jwks()
+        self._fetched_at = time.monotonic()
+
+    def _needs_refresh(self, kid):
+        if self._jwks is None:
+            return True
+
+        now = time.monotonic()
+
+        if now < self._retry_at:
+            return False
+
+        age = now - self._fetched_at
+
+        if age > self.cache_ttl:
+            return True
+
+        return find_rsa_key(self._jwks, kid) is None and age > self.min_refresh_interval
+
+    def _refresh(self, kid):
+        # checked again since another thread may have refreshed the key set while this one waited
+        if not self._needs_refresh(kid):
+            return
+
+        try:
+            self._fetch_jwks()
+
+        except Exception:
+            if self._jwks is None:
+                raise
+
+            print(sys.exc_info())
+            self._retry_at = time.monotonic() + self.min_refresh_interval
+
+    def get_signing_key(self, kid):
+        if self._needs_refresh(kid):
+            jwks = self._jwks
+            cached_key = find_rsa_key(jwks, kid) if jwks is not None else None
+
+            # a thread which has its key in the cache doesn't wait for another thread's fetch
+            if self._lock.acquire(blocking=cached_key is None):
+                try:
+                    self._refresh(kid)
+
+                finally:
+                    self._lock.release()
+
+        return find_rsa_key(self._jwks, kid)
+
+
+class StaticKeyProvider(object):
+    """
+    Provides signing keys from a JSON Web Key Set held in memory e.g. one set in the config
+    """
+
+    def __init__(self, jwks):
+        self.jwks = jwks
+
+    def get_signing_key(self, kid):
+        return find_rsa_key(self.jwks, kid)
+
+
+def init_auth(app):
+    """
+    Attaches the key provider configured for the app.
+
+    An inline AUTH0_JWKS takes precedence over fetching the key set from AUTH0_JWKS_URL.
+    """
+    if app.config.get('AUTH0_JWKS'):
+        key_provider = StaticKeyProvider(app.config['AUTH0_JWKS'])
+
+    else:
+        key_provider = JWKSKeyProvider(
+            app.config['AUTH0_JWKS_URL'], cache_ttl=app.config['AUTH0_JWKS_CACHE_TTL'],
+            timeout=app.config['AUTH0_JWKS_TIMEOUT'])
+
+    app.extensions['auth0_key_provider'] = key_provider
+
+
 def verify_decode_jwt(token):
     """
     Validates a JWT and returns the decoded payload.
+
+    Decoded tokens are remembered for the lifetime of the app context, so a token is only
+    verified once per request even if several helpers (or batched sub-requests) need it.
     """
-    jsonurl = urlopen(f"https://{AUTH0_DOMAIN}/.well-known/jwks.json")
-    jwks = json.loads(jsonurl.read())
+    decoded_tokens = g.setdefault('decoded_tokens', {})
+
+    if token in decoded_tokens:
+        return decoded_tokens[token]
 
     unverified_header = None
 
@@ -96,34 +218,28 @@ def verify_decode_jwt(token):
             'description': 'Error decoding token headers.'
         }, 401)
 
-    rsa_key = {}
-
     if 'kid' not in unverified_header:
         raise AuthError({
             'code': 'invalid_header',
             'description': 'Authorization malformed.'
         }, 401)
 
-    for key in jwks["keys"]:
-        if key["kid"] == unverified_header["kid"]:
-            rsa_key = {
-                "kty": key["kty"],
-                "kid": key["kid"],
-                "use": key["use"],
-                "n": key["n"],
-                "e": key["e"]
-            }
+    key_provider = current_app.extensions['auth0_key_provider']
+
+    rsa_key = key_provider.get_signing_key(unverified_header["kid"])
 
     if rsa_key:
         try:
             payload = jwt.decode(
                 token,
                 rsa_key,
-                algorithms=ALGORITHMS,
-                audience=API_AUDIENCE,
-                issuer=f"https://{AUTH0_DOMAIN}/"
+                algorithms=current_app.config['AUTH0_ALGORITHMS'],
+                audience=current_app.config['AUTH0_API_AUDIENCE'],
+                issuer=current_app.config['AUTH0_ISSUER']
             )
 
+            decoded_tokens[token] = payload
+
             return payload
 
         except jwt.ExpiredSignatureError:
@@ -158,6 +274,7 @@ def requires_auth(permission=''):
                 token = get_token_auth_header()
                 payload = verify_decode_jwt(token)
                 check_permissions(permission, payload)
+                _request_ctx_stack.top.current_user = payload
 
             except AuthError as auth_error:
                 print(auth_error)
@@ -184,4 +301,6 @@ def get_jwt_subject():
     if "sub" not in payload:
         abort(401)
 
+    _request_ctx_stack.top.current_user = payload
+
     return payload["sub"]
@@ -0,0 +1,75 @@
+import sys
+from flask import current_app, request
+from werkzeug.exceptions import HTTPException
+from werkzeug.test import EnvironBuilder
+
+# the sub-requests can only reach the routes of the api_v1 blueprint, except the batch route itself
+DISPATCHABLE_ENDPOINT_PREFIX = 'api_v1.'
+BATCH_ENDPOINT = 'api_v1.batch'
+
+# routes streaming their response for as long as the client stays connected, which can't be batched
+STREAMING_ENDPOINTS = {'api_v1.get_activity_feed'}
+
+
+def build_sub_request_environ(method, path, body):
+    """
+    Builds the WSGI environ of a sub-request.
+
+    The sub-request carries the batch request's Authorization header so the token is
+    decoded once for the whole batch (see verify_decode_jwt).
+    """
+    headers = {}
+
+    if 'Authorization' in request.headers:
+        headers['Authorization'] = request.headers['Authorization']
+
+    builder = EnvironBuilder(path=path, method=method, base_url=request.host_url,
+                             headers=headers, json=body)
+
+    try:
+        return builder.get_environ()
+
+    finally:
+        builder.close()
+
+
+def is_dispatchable(environ):
+    """Returns True if the sub-request matches a route of the api_v1 blueprint other than the batch and streaming routes"""
+    try:
+        endpoint, _ = current_app.url_map.bind_to_environ(environ).match()
+
+    except HTTPException:
+        return False
+
+    return endpoint.startswith(DISPATCHABLE_ENDPOINT_PREFIX) and endpoint != BATCH_ENDPOINT \
+        and endpoint not in STREAMING_ENDPOINTS
+
+
+def dispatch_sub_request(method, path, body=None):
+    """
+    Runs a sub-request through the app's routes, hooks and error handlers without any HTTP round trip.
+
+    The sub-request runs in its own request context but shares the batch request's app context,
+    so it uses the same database session and the same decoded token.
+
+    Returns a dictionary with the status code and the JSON body of the response.
+    """
+    environ = build_sub_request_environ(method, path, body)
+
+    if not is_dispatchable(environ):
+        return {"status": 404, "body": {"success": False, "error": 404, "message": "The requested resource does not exist."}}
+
+    with current_app.request_context(environ):
+        try:
+            response = current_app.full_dispatch_request()
+
+        except Exception:
+            print(sys.exc_info())
+            return {"status": 500, "body": {"success": False, "error": 500, "message": "Something went wrong on the server."}}
+
+        try:
+            return {"status": response.status_code, "body": response.get_json(silent=True)}
+
+        finally:
+            # runs the response's close callbacks, like a WSGI server does once it is sent
+            response.close()
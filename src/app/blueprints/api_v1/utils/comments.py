@@ -0,0 +1,114 @@
+import base64
+import json
+from flask import request, abort, current_app
+from sqlalchemy import select, union_all, literal, func
+from src.app import db
+from src.app.models.question_comment import QuestionComment
+from src.app.models.answer_comment import AnswerComment
+
+
+def encode_cursor(comment_id):
+    """Returns an opaque cursor pointing after the given comment"""
+    return base64.urlsafe_b64encode(json.dumps({"after": comment_id}).encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        return int(json.loads(base64.urlsafe_b64decode(cursor.encode()))['after'])
+
+    except (ValueError, KeyError, TypeError):
+        abort(400)
+
+
+def get_comments_page_size():
+    """Returns the number of comments per page, from the limit query parameter if given"""
+    limit = request.args.get('limit', current_app.config['COMMENTS_PER_PAGE'])
+
+    try:
+        limit = int(limit)
+
+    except ValueError:
+        abort(400)
+
+    if limit <= 0 or limit > current_app.config['MAX_COMMENTS_PER_PAGE']:
+        abort(400)
+
+    return limit
+
+
+def serialize_comment_thread(comments, page_size):
+    """
+    Serializes a page of comments fetched with one comment more than the page size,
+    which tells whether there is a next page
+    """
+    has_next_page = len(comments) > page_size
+    comments = comments[:page_size]
+
+    return {
+        "comments": comments,
+        "next_cursor": encode_cursor(comments[-1]['id']) if has_next_page else None
+    }
+
+
+def get_comment_thread(model, thread_column, thread_id, page_size, cursor=None):
+    """Returns a page of the comments on a question or an answer using keyset pagination on the comment id"""
+    comments = model.query.filter(thread_column == thread_id)
+
+    if cursor is not None:
+        comments = comments.filter(model.id > decode_cursor(cursor))
+
+    comments = comments.order_by(model.id).limit(page_size + 1).all()
+
+    return serialize_comment_thread([comment.serialize() for comment in comments], page_size)
+
+
+def load_comment_threads(question_id, answer_ids, page_size):
+    """
+    Returns the first page of the comments on a question and on each of its answers in a single query.
+
+    The comments of both tables are combined with UNION ALL and numbered within each thread so that
+    long threads only contribute their first page. They are then grouped by thread in memory.
+    Returns a (question_thread, {answer_id: answer_thread}) tuple.
+    """
+    columns = ['id', 'posted_by', 'details', 'date_created']
+
+    comments = select([literal('question', db.String).label('thread_type'),
+                       QuestionComment.question_id.label('thread_id')] +
+                      [getattr(QuestionComment, column) for column in columns]).where(
+        QuestionComment.question_id == question_id)
+
+    if answer_ids:
+        answer_comments = select([literal('answer', db.String).label('thread_type'),
+                                  AnswerComment.answer_id.label('thread_id')] +
+                                 [getattr(AnswerComment, column) for column in columns]).where(
+            AnswerComment.answer_id.in_(answer_ids))
+
+        comments = union_all(comments, answer_comments)
+
+    comments = comments.alias('comments')
+
+    numbered_comments = select([comments, func.row_number().over(
+        partition_by=[comments.c.thread_type, comments.c.thread_id],
+        order_by=comments.c.id).label('position')]).alias('numbered_comments')
+
+    rows = db.session.execute(select([numbered_comments]).where(
+        numbered_comments.c.position <= page_size + 1).order_by(numbered_comments.c.id))
+
+    threads = {('question', question_id): []}
+    threads.update({('answer', answer_id): [] for answer_id in answer_ids})
+
+    for row in rows:
+        threads[(row['thread_type'], row['thread_id'])].append({
+            "id": row['id'],
+            "posted_by": row['posted_by'],
+            "details": row['details'],
+            "timestamp": row['date_created']
+        })
+
+    question_thread = serialize_comment_thread(
+        threads.pop(('question', question_id)), page_size)
+
+    answer_threads = {answer_id: serialize_comment_thread(comments, page_size)
+                      for (thread_type, answer_id), comments in threads.items()}
+
+    return question_thread, answer_threads
@@ -0,0 +1,69 @@
+from flask import current_app
+from sqlalchemy import select
+from sqlalchemy.orm import load_only
+from src.app.models.nanodegree import Nanodegree, nanodegree_enrollments
+from src.app.models.question import Question
+from src.app.models.answer import Answer
+from src.app.utils.hot_queries import get_user_id
+
+
+def serialize_answer_preview(answer):
+    return {
+        "id": answer.id,
+        "question_id": answer.question_id,
+        "accepted": answer.accepted,
+        "timestamp": answer.date_created
+    }
+
+
+def build_dashboard(jwt_subject):
+    """
+    Returns the dashboard of a user: the nanodegrees they are enrolled in, their latest questions
+    and answers and the latest unanswered questions of other students in their nanodegrees.
+
+    The dashboard is built with one query per section whatever the number of enrollments,
+    questions or answers, i.e. five queries at most.
+    """
+    limit = current_app.config['DASHBOARD_ITEMS_LIMIT']
+
+    user = get_user_id(jwt_subject)
+
+    # users are only created when they first enroll
+    if user is None:
+        return {
+            "nanodegrees": [],
+            "questions": [],
+            "answers": [],
+            "unanswered_questions": []
+        }
+
+    question_fields = list(Question.PREVIEW_FIELDS)
+
+    enrolled_nanodegree_ids = select([nanodegree_enrollments.c.nanodegree_id]).where(
+        nanodegree_enrollments.c.user_id == user.id)
+
+    nanodegrees = user.nanodegrees.options(
+        Nanodegree.load_only_fields(['id', 'title'])).order_by(Nanodegree.id).all()
+
+    questions = Question.query.filter_by(posted_by=user.id, is_deleted=False).options(
+        Question.load_only_fields(question_fields, Question.PREVIEW_FIELDS)).order_by(
+        Question.id.desc()).limit(limit).all()
+
+    answers = Answer.query.filter_by(posted_by=user.id).options(
+        load_only('id', 'question_id', 'accepted', 'date_created')).order_by(
+        Answer.id.desc()).limit(limit).all()
+
+    unanswered_questions = Question.query.filter(
+        Question.nanodegree_id.in_(enrolled_nanodegree_ids),
+        Question.posted_by != user.id,
+        Question.is_deleted.is_(False),
+        ~Question.answers.any()).options(
+        Question.load_only_fields(question_fields, Question.PREVIEW_FIELDS)).order_by(
+        Question.id.desc()).limit(limit).all()
+
+    return {
+        "nanodegrees": [nanodegree.serialize(['id', 'title']) for nanodegree in nanodegrees],
+        "questions": [question.serialize_preview() for question in questions],
+        "answers": [serialize_answer_preview(answer) for answer in answers],
+        "unanswered_questions": [question.serialize_preview() for question in unanswered_questions]
+    }
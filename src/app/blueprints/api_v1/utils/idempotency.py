@@ -0,0 +1,151 @@
+import hashlib
+import sys
+from datetime import datetime, timedelta
+from functools import wraps
+from flask import Response, current_app, request, abort, jsonify, make_response
+from sqlalchemy.dialects.postgresql import insert
+from src.app import db
+from src.app.models.idempotency_key import IdempotencyKey
+from src.app.utils.jobs import enqueue
+
+
+def get_request_fingerprint():
+    """Hashes what makes two requests the same so that a key reused for a different request can be rejected"""
+    fingerprint = hashlib.sha256()
+
+    fingerprint.update(request.method.encode())
+    fingerprint.update(request.path.encode())
+    fingerprint.update(request.get_data())
+
+    return fingerprint.hexdigest()
+
+
+def claim_idempotency_key(jwt_subject, key, fingerprint):
+    """
+    Records that a request with this key is in progress.
+
+    Returns None if the key was free, otherwise the record of the request which used it first.
+    Expired records are replaced. The claim is only held for IDEMPOTENCY_KEY_LOCK_TIMEOUT seconds
+    so that the key of a request whose worker died before answering is reclaimed by a retry.
+    """
+    now = datetime.utcnow()
+
+    statement = insert(IdempotencyKey.__table__).values(
+        jwt_subject=jwt_subject, key=key, request_fingerprint=fingerprint,
+        expires_at=now + timedelta(seconds=current_app.config['IDEMPOTENCY_KEY_LOCK_TIMEOUT'])).on_conflict_do_nothing(
+        index_elements=['jwt_subject', 'key']).returning(IdempotencyKey.__table__.c.id)
+
+    claimed = db.session.execute(statement).first()
+    db.session.commit()
+
+    if claimed is not None:
+        return None
+
+    existing = IdempotencyKey.query.filter_by(
+        jwt_subject=jwt_subject, key=key).first()
+
+    if existing is None or existing.expires_at <= now:
+        if existing is not None:
+            db.session.delete(existing)
+            db.session.commit()
+
+        return claim_idempotency_key(jwt_subject, key, fingerprint)
+
+    return existing
+
+
+def save_response(jwt_subject, key, response):
+    """Stores the response to replay for retries and keeps it for IDEMPOTENCY_KEY_TTL seconds"""
+    IdempotencyKey.query.filter_by(jwt_subject=jwt_subject, key=key).update({
+        "status_code": response.status_code,
+        "response_body": response.get_data(as_text=True),
+        "expires_at": datetime.utcnow() + timedelta(seconds=current_app.config['IDEMPOTENCY_KEY_TTL'])
+    })
+
+    # expired keys are deleted in the background, at most once per ttl
+    enqueue('purge_expired_idempotency_keys', unique_key='purge_expired_idempotency_keys',
+            delay=current_app.config['IDEMPOTENCY_KEY_TTL'])
+
+    db.session.commit()
+
+
+def release_idempotency_key(jwt_subject, key):
+    """Frees a key whose request failed so that it can be retried"""
+    IdempotencyKey.query.filter_by(jwt_subject=jwt_subject, key=key).delete()
+    db.session.commit()
+
+
+def replay_response(idempotency_key):
+    return Response(idempotency_key.response_body, status=idempotency_key.status_code,
+                    mimetype='application/json', headers={"Idempotent-Replayed": "true"})
+
+
+def idempotent(f):
+    """
+    Makes a POST endpoint safe to retry with an Idempotency-Key header.
+
+    The first successful response for a user and key is stored for IDEMPOTENCY_KEY_TTL seconds and
+    replayed for retries without running the endpoint again. Failed requests are not stored so they
+    can be retried with the same key. Must be applied below requires_auth.
+    """
+    @wraps(f)
+    def wrapper(jwt, *args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+
+        if key is None:
+            return f(jwt, *args, **kwargs)
+
+        if not key or len(key) > 255:
+            abort(400)
+
+        jwt_subject = jwt['sub']
+        fingerprint = get_request_fingerprint()
+
+        try:
+            existing = claim_idempotency_key(jwt_subject, key, fingerprint)
+
+            if existing is not None:
+                if existing.request_fingerprint != fingerprint:
+                    return make_response(jsonify({
+                        "success": False,
+                        "error": 422,
+                        "message": "This Idempotency-Key was already used for a different request."
+                    }), 422)
+
+                if existing.status_code is None:
+                    return make_response(jsonify({
+                        "success": False,
+                        "error": 409,
+                        "message": "A request with this Idempotency-Key is still being processed."
+                    }), 409)
+
+                return replay_response(existing)
+
+        finally:
+            db.session.close()
+
+        try:
+            response = make_response(f(jwt, *args, **kwargs))
+
+        except:
+            release_idempotency_key(jwt_subject, key)
+            db.session.close()
+            raise
+
+        try:
+            if 200 <= response.status_code < 300:
+                save_response(jwt_subject, key, response)
+
+            else:
+                release_idempotency_key(jwt_subject, key)
+
+        except:
+            # the request itself succeeded, retries get a 409 until the claim of the key expires
+            print(sys.exc_info())
+
+        finally:
+            db.session.close()
+
+        return response
+
+    return wrapper
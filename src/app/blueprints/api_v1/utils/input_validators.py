@@ -1,4 +1,4 @@
-from marshmallow import Schema, fields
+from marshmallow import Schema, fields, validate
 
 
 class Nanodegree_Input_Schema(Schema):
@@ -22,3 +22,25 @@ class Question_Input_Schema(Schema):
     nanodegree_id = fields.Integer(required=True)
     project_id = fields.Integer(required=True)
     github_link = fields.String(allow_none=True)
+
+
+class Comment_Input_Schema(Schema):
+    """A marshmallow schema which validates the JSON payload accompanying POST requests to comment on a question or an answer"""
+
+    details = fields.String(required=True, validate=validate.Length(min=1))
+
+
+class Sub_Request_Input_Schema(Schema):
+    """A marshmallow schema which validates a single sub-request of a batch request"""
+
+    method = fields.String(required=True, validate=validate.OneOf(
+        ['GET', 'POST', 'PATCH', 'DELETE']))
+    path = fields.String(required=True)
+    body = fields.Raw(allow_none=True)
+
+
+class Batch_Input_Schema(Schema):
+    """A marshmallow schema which validates the JSON payload accompanying POST requests to the batch endpoint"""
+
+    requests = fields.List(fields.Nested(
+        Sub_Request_Input_Schema), required=True)
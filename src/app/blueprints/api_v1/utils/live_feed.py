@@ -0,0 +1,157 @@
+import json
+import queue
+import threading
+import time
+from flask import Response, current_app, request, abort
+from src.app import db
+from src.app.models.activity_event import ActivityEvent, ACTIVITY_CHANNEL
+
+# number of events kept for a client which reads them slower than they arrive
+CLIENT_QUEUE_SIZE = 1000
+
+
+def init_feed(app):
+    """Attaches the per-process limit on open activity streams to the app"""
+    app.extensions['feed_streams'] = threading.BoundedSemaphore(
+        app.config['FEED_MAX_STREAMS'])
+
+
+def format_server_sent_event(event):
+    return f"id: {event['id']}\nevent: {event['event_type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+def get_last_event_id():
+    """
+    Returns the id of the last event received by a reconnecting client or None.
+
+    Browsers send it in the Last-Event-ID header, other clients can use the last_event_id query parameter.
+    """
+    last_event_id = request.headers.get(
+        'Last-Event-ID') or request.args.get('last_event_id')
+
+    if last_event_id is None:
+        return None
+
+    try:
+        return int(last_event_id)
+
+    except ValueError:
+        abort(400)
+
+
+def get_missed_events(nanodegree_id, project_id, last_event_id):
+    """Returns the events recorded after last_event_id, oldest first"""
+    missed_events = ActivityEvent.query.filter(
+        ActivityEvent.nanodegree_id == nanodegree_id, ActivityEvent.id > last_event_id)
+
+    if project_id is not None:
+        missed_events = missed_events.filter(
+            ActivityEvent.project_id == project_id)
+
+    missed_events = missed_events.order_by(ActivityEvent.id).limit(
+        current_app.config['FEED_MAX_REPLAY'])
+
+    return [event.serialize() for event in missed_events]
+
+
+def stream_activity(nanodegree_id, project_id=None):
+    """
+    Returns a server-sent events response streaming the activity of a nanodegree or one of its projects.
+
+    Events come from the process wide notification listener so an open stream holds no database connection.
+    A comment is sent every FEED_HEARTBEAT_INTERVAL seconds to keep proxies from closing the connection, and
+    the stream ends after FEED_MAX_DURATION seconds after which the client reconnects with Last-Event-ID.
+
+    Every stream holds a worker thread until it ends, so at most FEED_MAX_STREAMS are open per process
+    and clients beyond that get a 503 with a Retry-After header.
+    """
+    listener = current_app.extensions['notification_listener']
+    streams = current_app.extensions['feed_streams']
+
+    heartbeat_interval = current_app.config['FEED_HEARTBEAT_INTERVAL']
+    max_duration = current_app.config['FEED_MAX_DURATION']
+    retry_ms = current_app.config['FEED_RETRY_MS']
+
+    client_queue = queue.Queue(maxsize=CLIENT_QUEUE_SIZE)
+    overflowed = threading.Event()
+
+    def on_activity(event):
+        if event['nanodegree_id'] != nanodegree_id:
+            return
+
+        if project_id is not None and event['project_id'] != project_id:
+            return
+
+        try:
+            client_queue.put_nowait(event)
+
+        except queue.Full:
+            # the stream is ended rather than skipping events, the client reconnects
+            # with the id of the last event it received and gets the rest replayed
+            overflowed.set()
+
+    if not streams.acquire(blocking=False):
+        abort(503, retry_after=current_app.config['FEED_STREAMS_RETRY_AFTER'])
+
+    try:
+        # subscribe before looking up missed events so that nothing falls in between
+        listener.subscribe(ACTIVITY_CHANNEL, on_activity)
+
+        last_event_id = get_last_event_id()
+
+        missed_events = []
+
+        if last_event_id is not None:
+            missed_events = get_missed_events(
+                nanodegree_id, project_id, last_event_id)
+
+    except:
+        listener.unsubscribe(ACTIVITY_CHANNEL, on_activity)
+        streams.release()
+        raise
+
+    finally:
+        db.session.close()
+
+    def generate_events():
+        try:
+            yield f"retry: {retry_ms}\n\n"
+
+            replayed_event_ids = set()
+
+            for event in missed_events:
+                replayed_event_ids.add(event['id'])
+                yield format_server_sent_event(event)
+
+            stream_ends_at = time.monotonic() + max_duration
+
+            while time.monotonic() < stream_ends_at:
+                try:
+                    event = client_queue.get(timeout=heartbeat_interval)
+
+                except queue.Empty:
+                    yield ": heartbeat\n\n"
+                    continue
+
+                if overflowed.is_set():
+                    break
+
+                if event['id'] not in replayed_event_ids:
+                    yield format_server_sent_event(event)
+
+        finally:
+            listener.unsubscribe(ACTIVITY_CHANNEL, on_activity)
+
+    response = Response(generate_events(), mimetype='text/event-stream', headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+    def close_stream():
+        listener.unsubscribe(ACTIVITY_CHANNEL, on_activity)
+        streams.release()
+
+    # called when the response is closed, even if the client went away before the stream started
+    response.call_on_close(close_stream)
+
+    return response
@@ -0,0 +1,48 @@
+from flask import request, abort, current_app
+
+
+def get_requested_ids():
+    """
+    Returns the ids listed in the `ids` query parameter e.g. ?ids=3,1,2 in the order they were given.
+
+    Requests with a malformed list or more than MAX_IDS_PER_REQUEST ids are rejected with a 400 error.
+    """
+    ids_parameter = request.args.get('ids', '')
+
+    try:
+        ids = [int(id) for id in ids_parameter.split(',') if id.strip()]
+
+    except ValueError:
+        abort(400)
+
+    if len(ids) == 0 or len(ids) > current_app.config['MAX_IDS_PER_REQUEST']:
+        abort(400)
+
+    return ids
+
+
+def get_by_ids(model, ids, *options, criteria=()):
+    """
+    Fetches all the rows with the given ids, and matching the optional criteria, in a single query.
+
+    Returns a list in the same order as the ids holding None wherever no row was found.
+    """
+    rows = model.query.filter(model.id.in_(set(ids)), *criteria).options(*options).all()
+
+    rows_by_id = {row.id: row for row in rows}
+
+    return [rows_by_id.get(id) for id in ids]
+
+
+def serialize_multi_get(ids, rows, serialize):
+    """
+    Builds the response data for a multi-get request.
+
+    The data list follows the order of the requested ids with null marking the ids
+    which were not found. Those ids are also listed under not_found.
+    """
+    return {
+        "success": True,
+        "data": [serialize(row) if row is not None else None for row in rows],
+        "not_found": [id for id, row in zip(ids, rows) if row is None]
+    }
@@ -0,0 +1,29 @@
+from flask import request
+from src.app.utils.compression import remove_encoding_from_etag
+
+# returned by get_if_match_versions for If-Match: *
+ANY_VERSION = 'any'
+
+
+def make_etag(version):
+    """Returns the ETag header value of a resource at the given version"""
+    return f'"{version}"'
+
+
+def get_if_match_versions():
+    """
+    Returns the versions listed in the If-Match header, ANY_VERSION for If-Match: *, or None if the header is missing.
+
+    If-Match uses the strong comparison so weak tags never match. The ETag of a compressed response
+    is the version followed by the encoding, e.g. "5-gzip", and matches that version.
+    Tags which are not versions of this API never match.
+    """
+    if 'If-Match' not in request.headers:
+        return None
+
+    if request.if_match.star_tag:
+        return ANY_VERSION
+
+    tags = [remove_encoding_from_etag(tag) for tag in request.if_match.as_set()]
+
+    return [int(tag) for tag in tags if tag.isdigit()]
@@ -0,0 +1,21 @@
+from flask import request, abort
+
+
+def get_requested_fields(api_fields):
+    """
+    Returns the fields listed in the `fields` query parameter e.g. ?fields=id,title
+
+    All the fields are returned if the parameter is missing. Unknown fields are rejected with a 400 error.
+    """
+    fields_parameter = request.args.get('fields')
+
+    if not fields_parameter:
+        return list(api_fields)
+
+    fields = [field.strip()
+              for field in fields_parameter.split(',') if field.strip()]
+
+    if not fields or any(field not in api_fields for field in fields):
+        abort(400)
+
+    return fields
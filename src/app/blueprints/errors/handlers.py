@@ -1,5 +1,6 @@
 from flask import Blueprint, jsonify
 from src.app import db
+from src.app.blueprints.api_v1.utils.auth0_helper import AuthError
 
 
 errors_bp = Blueprint('errors', __name__)
@@ -61,6 +62,15 @@ def conflict(error):
     }), 409
 
 
+@errors_bp.app_errorhandler(415)
+def unsupported_media_type(error):
+    return jsonify({
+        "error": 415,
+        "message": "The request body is not in a supported format.",
+        "success": False
+    }), 415
+
+
 @errors_bp.app_errorhandler(422)
 def unprocessable_entity(error):
     return jsonify({
@@ -70,6 +80,34 @@ def unprocessable_entity(error):
     }), 422
 
 
+@errors_bp.app_errorhandler(503)
+def service_unavailable(error):
+    headers = {}
+
+    if getattr(error, 'retry_after', None) is not None:
+        headers['Retry-After'] = str(error.retry_after)
+
+    return jsonify({
+        "error": 503,
+        "message": "The server is busy, please try again later.",
+        "success": False
+    }), 503, headers
+
+
+@errors_bp.app_errorhandler(AuthError)
+def auth_error(error):
+    """Handles the auth errors raised outside of requires_auth e.g. by get_jwt_subject"""
+    print(error.error)
+
+    if error.status_code == 403:
+        return permission_not_found(error)
+
+    if error.status_code == 400:
+        return bad_request(error)
+
+    return unauthorized(error)
+
+
 @errors_bp.app_errorhandler(500)
 def internal_serval_error(error):
     db.session.rollback()
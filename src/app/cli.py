@@ -0,0 +1,191 @@
+import click
+import time
+from flask import current_app
+from flask.cli import AppGroup, with_appcontext
+
+stats_cli = AppGroup('stats', help='Manage the nanodegree statistics views.')
+
+
+@stats_cli.command('refresh')
+@click.option('--blocking', is_flag=True, help='Refresh without CONCURRENTLY, which is faster but blocks the readers of the views.')
+def refresh_stats_command(blocking):
+    """Recomputes the nanodegree statistics, run it on a schedule e.g. every 10 minutes"""
+    from src.app.models.nanodegree_stats import refresh_stats
+
+    refresh_stats(concurrently=not blocking)
+
+    click.echo('Nanodegree statistics refreshed')
+
+
+enrollments_cli = AppGroup('enrollments', help='Manage nanodegree enrollments.')
+
+
+@enrollments_cli.command('import')
+@click.argument('nanodegree_id', type=int)
+@click.argument('file', type=click.File('rb'))
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'ndjson']), default=None,
+              help='Format of the file, ndjson for .ndjson and .jsonl files and csv otherwise by default.')
+def import_enrollments_command(nanodegree_id, file, file_format):
+    """
+    Enrolls the students whose JWT subjects are listed in FILE in a nanodegree, use - to read from stdin
+
+    CSV files hold one subject per row in their first column, NDJSON files one {"jwt_subject": str} object per line.
+    """
+    from src.app.models.nanodegree import Nanodegree
+    from src.app.utils.bulk_enrollment import CSV_FORMAT, NDJSON_FORMAT, bulk_enroll
+
+    if Nanodegree.query.get(nanodegree_id) is None:
+        raise click.BadParameter(f'there is no nanodegree with id {nanodegree_id}', param_hint='NANODEGREE_ID')
+
+    if file_format is None:
+        file_format = NDJSON_FORMAT if file.name.endswith(('.ndjson', '.jsonl')) else CSV_FORMAT
+
+    report = bulk_enroll(nanodegree_id, file, file_format)
+
+    click.echo(f"{report['enrolled']} students enrolled, {report['already_enrolled']} already enrolled, "
+               f"{report['new_users']} new users, {report['duplicates']} duplicate rows, {report['failed']} failed rows")
+
+    if report['failed_lines']:
+        click.echo(f"Failed lines: {', '.join(str(line_number) for line_number in report['failed_lines'])}")
+
+
+dataset_cli = AppGroup('dataset', help='Generate synthetic data for scale testing.')
+
+
+@dataset_cli.command('generate')
+@click.option('--seed', type=int, default=0, show_default=True, help='The same seed always generates the same rows.')
+@click.option('--nanodegrees', type=click.IntRange(min=1), default=20, show_default=True)
+@click.option('--projects-per-nanodegree', type=click.IntRange(min=1), default=8, show_default=True)
+@click.option('--users', type=click.IntRange(min=1), default=10000, show_default=True)
+@click.option('--enrollments-per-user', type=click.FloatRange(min=1), default=1.5, show_default=True, help='Average number of nanodegrees per user.')
+@click.option('--questions', type=click.IntRange(min=0), default=100000, show_default=True)
+@click.option('--answers-per-question', type=click.FloatRange(min=0), default=1.5, show_default=True, help='Average number of answers per question.')
+@click.option('--days', type=click.IntRange(min=1), default=365, show_default=True, help='Length of the period the questions are spread over.')
+@click.option('--end', type=click.DateTime(), default=None, help='End of that period, now by default. Set it to regenerate identical timestamps.')
+@click.confirmation_option(prompt='The rows are added to the database of the app, continue?')
+def generate_dataset_command(seed, nanodegrees, projects_per_nanodegree, users, enrollments_per_user,
+                             questions, answers_per_question, days, end):
+    """
+    Adds a synthetic dataset of nanodegrees, projects, users, enrollments, questions and answers to the database
+
+    The rows are loaded with COPY after the existing ones, e.g. --users 1000000 --questions 4000000
+    builds a dataset of about ten million rows in a few minutes.
+    """
+    from src.app.utils.synthetic_data import SyntheticDataset, get_first_ids, load_dataset
+
+    started_at = time.perf_counter()
+
+    dataset = SyntheticDataset(seed=seed, nanodegrees=nanodegrees, projects_per_nanodegree=projects_per_nanodegree,
+                               users=users, enrollments_per_user=enrollments_per_user, questions=questions,
+                               answers_per_question=answers_per_question, days=days, end=end,
+                               first_ids=get_first_ids())
+
+    counts = load_dataset(dataset)
+
+    for table, count in counts.items():
+        click.echo(f'{count} {table} rows')
+
+    click.echo(f'{sum(counts.values())} rows loaded in {time.perf_counter() - started_at:.1f}s')
+
+
+benchmark_cli = AppGroup('benchmark', help='Measure the Python overhead of the hot paths.')
+
+
+@benchmark_cli.command('hot-queries')
+@click.option('--iterations', type=click.IntRange(min=1), default=1000, show_default=True)
+def benchmark_hot_queries_command(iterations):
+    """
+    Times the hot queries and the requests using them with and without the compiled query cache
+
+    Run it against a database holding a dataset, e.g. one added by `flask dataset generate`.
+    The queries only read so the command can be run against any database.
+    """
+    from src.app import db
+    from src.app.models.user import User
+    from src.app.models.nanodegree import Nanodegree, nanodegree_enrollments
+    from src.app.models.project import Project
+    from src.app.models.question import Question
+    from src.app.utils import hot_queries
+
+    enrollment = db.session.query(nanodegree_enrollments.c.nanodegree_id, User.jwt_subject).join(
+        User, User.id == nanodegree_enrollments.c.user_id).first()
+
+    db.session.remove()
+
+    if enrollment is None:
+        raise click.ClickException(
+            'There is no enrollment to benchmark with, add a dataset with `flask dataset generate` first')
+
+    nanodegree_id, jwt_subject = enrollment
+
+    project_fields = list(Project.API_FIELDS)
+    question_fields = list(Question.PREVIEW_FIELDS)
+    questions_per_page = int(current_app.config['QUESTIONS_PER_PAGE'])
+
+    client = current_app.test_client()
+
+    calls = {
+        'get_user': lambda: hot_queries.get_user(jwt_subject),
+        'get_user_id': lambda: hot_queries.get_user_id(jwt_subject),
+        'get_enrolled_student': lambda: hot_queries.get_enrolled_student(nanodegree_id, jwt_subject),
+        'get_by_id': lambda: hot_queries.get_by_id(Nanodegree, nanodegree_id),
+        'get_projects_of_nanodegree': lambda: hot_queries.get_projects_of_nanodegree(nanodegree_id, project_fields),
+        'count_questions': hot_queries.count_questions,
+        'get_questions_page': lambda: hot_queries.get_questions_page(questions_per_page, questions_per_page, question_fields),
+        # the first page of questions is cached, the second one is read from the database
+        'GET /api/v1/questions': lambda: client.get('/api/v1/questions', json={
+            "page": 2, "questions_per_page": questions_per_page}),
+        'GET /api/v1/nanodegrees/id/projects': lambda: client.get(f'/api/v1/nanodegrees/{nanodegree_id}/projects')
+    }
+
+    click.echo(f"{'':38}{'total µs':>20}{'python µs':>20}")
+    click.echo(f"{'':38}{'before':>10}{'after':>10}{'before':>10}{'after':>10}")
+
+    for name, (unbaked_total, unbaked_python), (baked_total, baked_python) in hot_queries.benchmark(calls, iterations):
+        click.echo(f'{name:38}{unbaked_total:10.0f}{baked_total:10.0f}{unbaked_python:10.0f}{baked_python:10.0f}')
+
+
+@click.command('worker')
+@click.option('--queue', default='default', help='Name of the queue to run the jobs of.')
+@click.option('--poll-interval', type=float, default=None, help='Seconds to wait before looking for new jobs when the queue is empty.')
+@click.option('--burst', is_flag=True, help='Exit once there are no due jobs left.')
+@with_appcontext
+def worker_command(queue, poll_interval, burst):
+    """Runs the background jobs stored in the job table"""
+    from src.app import tasks
+    from src.app.utils.jobs import run_worker
+
+    click.echo(f'Running the jobs of the {queue} queue')
+
+    run_worker(queue, poll_interval or current_app.config['JOB_POLL_INTERVAL'], burst)
+
+
+@click.command('check-migrations')
+@click.option('-d', '--directory', default=None, help='Migration script directory, defaults to the one of `flask db`.')
+@with_appcontext
+def check_migrations_command(directory):
+    """Lists the operations of the migrations which would block a table of the live database, exits with 1 if there are any"""
+    import os
+    from src.app.utils.online_migrations import check_revisions
+
+    unsafe_revisions = check_revisions(os.path.join(
+        directory or current_app.extensions['migrate'].directory, 'versions'))
+
+    for file_name, unsafe_operations in unsafe_revisions.items():
+        for line_number, message in unsafe_operations:
+            click.echo(f'{file_name}:{line_number}: {message}', err=True)
+
+    if unsafe_revisions:
+        raise click.exceptions.Exit(1)
+
+    click.echo('The migrations are safe to run on the live database')
+
+
+def init_cli(app):
+    """Registers the app's flask commands"""
+    app.cli.add_command(stats_cli)
+    app.cli.add_command(enrollments_cli)
+    app.cli.add_command(dataset_cli)
+    app.cli.add_command(benchmark_cli)
+    app.cli.add_command(worker_command)
+    app.cli.add_command(check_migrations_command)
@@ -0,0 +1,59 @@
+import json
+from src.app.models.base import Base
+from src.app.utils.pg_notify import publish
+from src.app import db
+
+ACTIVITY_CHANNEL = 'activity'
+
+
+class ActivityEvent(Base):
+    """
+    A record of something happening in a nanodegree e.g. a new question.
+
+    Events are kept so that live feed clients can resume from the last event they received.
+    """
+    __tablename__ = 'activity_event'
+
+    event_type = db.Column(db.String(50), nullable=False)
+
+    nanodegree_id = db.Column(db.Integer, db.ForeignKey(
+        'nanodegree.id'), nullable=False)
+
+    project_id = db.Column(db.Integer, db.ForeignKey(
+        'project.id'), nullable=True)
+
+    data = db.Column(db.Text, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_activity_event_nanodegree_id_id', 'nanodegree_id', 'id'),
+    )
+
+    def __repr__(self):
+        return f'<ActivityEvent {self.event_type} in nanodegree {self.nanodegree_id}>'
+
+    def serialize(self):
+        return {
+            "id": self.id,
+            "event_type": self.event_type,
+            "nanodegree_id": self.nanodegree_id,
+            "project_id": self.project_id,
+            "data": json.loads(self.data)
+        }
+
+    @classmethod
+    def record(cls, event_type, nanodegree_id, project_id, data):
+        """
+        Adds an event to the current transaction and notifies the live feed listeners.
+
+        The notification is only delivered if the transaction commits.
+        Supported event types are question_created, answer_created and answer_accepted.
+        """
+        event = cls(event_type=event_type, nanodegree_id=nanodegree_id,
+                    project_id=project_id, data=json.dumps(data, default=str))
+
+        db.session.add(event)
+        db.session.flush()
+
+        publish(ACTIVITY_CHANNEL, event.serialize())
+
+        return event
@@ -7,15 +7,23 @@ import enum
 class Answer(Base):
     __tablename__ = 'answer'
 
-    posted_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    posted_by = db.Column(db.Integer, db.ForeignKey(
+        'user.id'), nullable=False, index=True)
 
-    details = db.Column(db.String(), nullable=False)
+    # details can be long so it is only loaded when accessed
+    details = db.deferred(db.Column(db.String(), nullable=False))
 
     question_id = db.Column(db.Integer, db.ForeignKey(
-        'question.id'), nullable=False)
+        'question.id'), nullable=False, index=True)
 
     accepted = db.Column(db.Boolean, default=False, nullable=False)
 
+    # incremented by every update so that concurrent updates can be detected
+    version = db.Column(db.Integer, nullable=False,
+                        default=1, server_default='1')
+
+    __mapper_args__ = dict(Base.__mapper_args__, version_id_col=version)
+
     def __repr__(self):
         return f'<Answer to question {self.question_id} posted by {self.posted_by}>'
 
@@ -25,5 +33,6 @@ class Answer(Base):
             "posted_by": self.posted_by,
             "details": self.details,
             "accepted": self.accepted,
-            "timestamp": self.date_created
+            "timestamp": self.date_created,
+            "version": self.version
         }
@@ -0,0 +1,25 @@
+from src.app.models.base import Base
+from src.app import db
+
+
+class AnswerComment(Base):
+    __tablename__ = 'answer_comment'
+
+    posted_by = db.Column(db.Integer, db.ForeignKey(
+        'user.id'), nullable=False, index=True)
+
+    details = db.Column(db.String(), nullable=False)
+
+    answer_id = db.Column(db.Integer, db.ForeignKey(
+        'answer.id'), nullable=False, index=True)
+
+    def __repr__(self):
+        return f'<Comment on answer {self.answer_id} posted by {self.posted_by}>'
+
+    def serialize(self):
+        return {
+            "id": self.id,
+            "posted_by": self.posted_by,
+            "details": self.details,
+            "timestamp": self.date_created
+        }
@@ -1,5 +1,27 @@
 from src.app import db
+from contextlib import contextmanager
 from datetime import datetime
+from sqlalchemy.orm import load_only
+
+
+@contextmanager
+def expire_on_commit(expire):
+    """
+    Sets whether the objects of the current session are expired by the commits made inside the block.
+
+    Objects which are not expired can still be read once the transaction is committed
+    without being reloaded with a SELECT.
+    """
+    session = db.session()
+    previous_setting = session.expire_on_commit
+    session.expire_on_commit = expire
+
+    try:
+        yield session
+
+    finally:
+        session.expire_on_commit = previous_setting
+
 
 class Base(db.Model):
     """
@@ -7,6 +29,11 @@ class Base(db.Model):
     """
     __abstract__ = True
 
+    # ids and server side defaults are read back in the RETURNING clause of the INSERT
+    # instead of with a SELECT when they are first accessed.
+    # Models setting their own mapper arguments should extend these ones
+    __mapper_args__ = {"eager_defaults": True}
+
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
 
     date_created = db.Column(
@@ -15,9 +42,38 @@ class Base(db.Model):
     date_modified = db.Column(
         db.DateTime, onupdate=datetime.utcnow)
 
+    # Maps the name of each field exposed by the API to the model attribute it is read from
+    API_FIELDS = {}
+
+    def serialize_fields(self, fields, api_fields=None):
+        """
+        Returns a dictionary with only the requested API fields.
+
+        Only the attributes backing those fields are read so that columns left out of
+        the query (see load_only_fields) are not loaded one by one.
+        """
+        api_fields = api_fields or self.API_FIELDS
+
+        return {field: getattr(self, api_fields[field]) for field in fields}
+
+    @classmethod
+    def load_only_fields(cls, fields, api_fields=None):
+        """Returns a query option which only loads the columns backing the requested API fields"""
+        api_fields = api_fields or cls.API_FIELDS
+
+        return load_only(*[api_fields[field] for field in fields])
+
     def save(self):
+        """
+        Adds the object to the session and commits.
+
+        The session is not expired by this commit: the object was just written so it is
+        serialized from memory instead of being selected again after the commit.
+        """
         db.session.add(self)
-        db.session.commit()
+
+        with expire_on_commit(False):
+            db.session.commit()
 
     def update(self):
         db.session.commit()
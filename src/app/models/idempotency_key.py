@@ -0,0 +1,33 @@
+from src.app.models.base import Base
+from src.app import db
+
+
+class IdempotencyKey(Base):
+    """
+    The first response to a POST request sent with an Idempotency-Key header.
+
+    Retries of the request with the same key are answered with the stored response instead
+    of being run again. A record without a status code belongs to a request still in progress.
+    """
+    __tablename__ = 'idempotency_key'
+
+    jwt_subject = db.Column(db.String(200), nullable=False)
+
+    key = db.Column(db.String(255), nullable=False)
+
+    # hash of the method, path and body the key was first used with
+    request_fingerprint = db.Column(db.String(64), nullable=False)
+
+    status_code = db.Column(db.Integer, nullable=True)
+
+    response_body = db.Column(db.Text, nullable=True)
+
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    __table_args__ = (
+        db.UniqueConstraint('jwt_subject', 'key',
+                            name='uq_idempotency_key_jwt_subject_key'),
+    )
+
+    def __repr__(self):
+        return f'<IdempotencyKey {self.key} of {self.jwt_subject}>'
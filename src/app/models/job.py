@@ -0,0 +1,59 @@
+import json
+from datetime import datetime
+from src.app.models.base import Base
+from src.app import db
+
+
+class Job(Base):
+    """
+    A unit of background work waiting to be run by a `flask worker` process.
+
+    Jobs are deleted once they succeed and moved to the dead_job table once they
+    have failed max_attempts times.
+    """
+    __tablename__ = 'job'
+
+    queue = db.Column(db.String(50), nullable=False, default='default')
+
+    task = db.Column(db.String(100), nullable=False)
+
+    payload = db.Column(db.Text, nullable=False, default='{}')
+
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+
+    max_attempts = db.Column(db.Integer, nullable=False)
+
+    # at most one pending job can have a given unique key, see enqueue. Cleared once the job is claimed
+    unique_key = db.Column(db.String(200), nullable=True, unique=True)
+
+    last_error = db.Column(db.Text, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_job_queue_run_at', 'queue', 'run_at'),
+    )
+
+    def __repr__(self):
+        return f'<Job {self.task} ({self.attempts}/{self.max_attempts} attempts)>'
+
+    def get_payload(self):
+        return json.loads(self.payload)
+
+
+class DeadJob(Base):
+    """A job which failed too many times, kept for inspection and manual replay"""
+    __tablename__ = 'dead_job'
+
+    queue = db.Column(db.String(50), nullable=False)
+
+    task = db.Column(db.String(100), nullable=False)
+
+    payload = db.Column(db.Text, nullable=False)
+
+    attempts = db.Column(db.Integer, nullable=False)
+
+    last_error = db.Column(db.Text, nullable=True)
+
+    def __repr__(self):
+        return f'<DeadJob {self.task} after {self.attempts} attempts>'
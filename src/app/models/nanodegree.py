@@ -14,12 +14,14 @@ class Nanodegree(Base):
 
     questions = db.relationship('Question', backref="nanodegree", lazy=True)
 
-    def serialize(self):
-        return {
-            "id": int(self.id),
-            "title": str(self.title),
-            "description": str(self.description)
-        }
+    API_FIELDS = {
+        "id": "id",
+        "title": "title",
+        "description": "description"
+    }
+
+    def serialize(self, fields=None):
+        return self.serialize_fields(fields or list(self.API_FIELDS))
 
     def __repr__(self):
         return f'<Nanodegree: {self.title} >'
@@ -30,5 +32,5 @@ nanodegree_enrollments = db.Table(
     db.Column('user_id', db.Integer, db.ForeignKey(
         'user.id'), primary_key=True),
     db.Column('nanodegree_id', db.Integer, db.ForeignKey(
-        'nanodegree.id'), primary_key=True)
+        'nanodegree.id'), primary_key=True, index=True)
 )
@@ -0,0 +1,111 @@
+from sqlalchemy import DDL, event, text
+from src.app import db
+from src.app.utils.cache_bus import invalidate
+
+# Question counts per project. now() is evaluated when the view is refreshed so
+# refreshed_at tells how old the numbers are.
+# A change to a view needs a migration recreating it, migration_safety_tests checks that the
+# latest definition in the migrations is the one below
+PROJECT_STATS_VIEW = """
+CREATE MATERIALIZED VIEW project_stats AS
+SELECT project.id AS project_id,
+       project.nanodegree_id,
+       project.title,
+       count(question.id) AS number_of_questions,
+       count(question.id) FILTER (WHERE answered.question_id IS NULL) AS number_of_unanswered_questions,
+       count(question.id) FILTER (WHERE question.has_accepted_answer) AS number_of_questions_with_accepted_answer,
+       now() AS refreshed_at
+FROM project
+LEFT JOIN question ON question.project_id = project.id AND NOT question.is_deleted
+LEFT JOIN (SELECT DISTINCT question_id FROM answer) AS answered ON answered.question_id = question.id
+GROUP BY project.id
+"""
+
+NANODEGREE_STATS_VIEW = """
+CREATE MATERIALIZED VIEW nanodegree_stats AS
+SELECT nanodegree.id AS nanodegree_id,
+       (SELECT count(*) FROM nanodegree_enrollment
+        WHERE nanodegree_enrollment.nanodegree_id = nanodegree.id) AS number_of_students,
+       (SELECT count(*) FROM project
+        WHERE project.nanodegree_id = nanodegree.id) AS number_of_projects,
+       count(question.id) AS number_of_questions,
+       count(question.id) FILTER (WHERE answered.question_id IS NULL) AS number_of_unanswered_questions,
+       count(question.id) FILTER (WHERE question.has_accepted_answer) AS number_of_questions_with_accepted_answer,
+       now() AS refreshed_at
+FROM nanodegree
+LEFT JOIN question ON question.nanodegree_id = nanodegree.id AND NOT question.is_deleted
+LEFT JOIN (SELECT DISTINCT question_id FROM answer) AS answered ON answered.question_id = question.id
+GROUP BY nanodegree.id
+"""
+
+# REFRESH MATERIALIZED VIEW CONCURRENTLY needs a unique index on each view
+STATS_VIEW_INDEXES = [
+    'CREATE UNIQUE INDEX ux_project_stats_project_id ON project_stats (project_id)',
+    'CREATE INDEX ix_project_stats_nanodegree_id ON project_stats (nanodegree_id)',
+    'CREATE UNIQUE INDEX ux_nanodegree_stats_nanodegree_id ON nanodegree_stats (nanodegree_id)'
+]
+
+STATS_VIEWS = ['project_stats', 'nanodegree_stats']
+
+# the views are not tables so db.create_all() and db.drop_all() are told about them here
+for statement in [PROJECT_STATS_VIEW, NANODEGREE_STATS_VIEW] + STATS_VIEW_INDEXES:
+    event.listen(db.metadata, 'after_create',
+                 DDL(statement).execute_if(dialect='postgresql'))
+
+event.listen(db.metadata, 'before_drop', DDL(
+    'DROP MATERIALIZED VIEW IF EXISTS nanodegree_stats, project_stats').execute_if(dialect='postgresql'))
+
+
+def refresh_stats(concurrently=True):
+    """
+    Recomputes the statistics views.
+
+    A concurrent refresh does not lock out the readers of the views, it builds the new
+    contents on the side and applies the difference.
+    """
+    for view in STATS_VIEWS:
+        db.session.execute(text(
+            f'REFRESH MATERIALIZED VIEW {"CONCURRENTLY " if concurrently else ""}{view}'))
+
+    invalidate('nanodegree_stats')
+
+    db.session.commit()
+
+
+def get_ratio(count, total):
+    return round(count / total, 4) if total else None
+
+
+def serialize_question_stats(row):
+    return {
+        "number_of_questions": row['number_of_questions'],
+        "number_of_unanswered_questions": row['number_of_unanswered_questions'],
+        "unanswered_ratio": get_ratio(row['number_of_unanswered_questions'], row['number_of_questions']),
+        "accepted_answer_rate": get_ratio(row['number_of_questions_with_accepted_answer'], row['number_of_questions'])
+    }
+
+
+def get_nanodegree_stats(nanodegree_id):
+    """
+    Returns the statistics of a nanodegree as of the last refresh, or None if the
+    nanodegree was created after it
+    """
+    nanodegree_row = db.session.execute(text(
+        'SELECT * FROM nanodegree_stats WHERE nanodegree_id = :nanodegree_id'),
+        {"nanodegree_id": nanodegree_id}).first()
+
+    if nanodegree_row is None:
+        return None
+
+    project_rows = db.session.execute(text(
+        'SELECT * FROM project_stats WHERE nanodegree_id = :nanodegree_id ORDER BY project_id'),
+        {"nanodegree_id": nanodegree_id}).fetchall()
+
+    return dict(
+        nanodegree_id=nanodegree_id,
+        number_of_students=nanodegree_row['number_of_students'],
+        number_of_projects=nanodegree_row['number_of_projects'],
+        **serialize_question_stats(nanodegree_row),
+        projects=[dict(project_id=row['project_id'], title=row['title'], **serialize_question_stats(row))
+                  for row in project_rows],
+        refreshed_at=nanodegree_row['refreshed_at'].isoformat())
@@ -13,12 +13,14 @@ class Project(Base):
 
     questions = db.relationship('Question', backref='project', lazy=True)
 
-    def serialize(self):
-        return {
-            "id": int(self.id),
-            "title": str(self.title),
-            "nanodegree_id": int(self.nanodegree_id)
-        }
+    API_FIELDS = {
+        "id": "id",
+        "title": "title",
+        "nanodegree_id": "nanodegree_id"
+    }
+
+    def serialize(self, fields=None):
+        return self.serialize_fields(fields or list(self.API_FIELDS))
 
     def __repr__(self):
         return f'<Project: {self.title} >'
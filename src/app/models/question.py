@@ -1,5 +1,6 @@
 from flask import current_app
 from src.app.models.base import Base
+from src.app.models.user import User
 from src.app import db
 import enum
 
@@ -9,9 +10,11 @@ class Question(Base):
 
     title = db.Column(db.String(150), nullable=False)
 
-    details = db.Column(db.String(), nullable=False)
+    # details can be long so it is only loaded when accessed
+    details = db.deferred(db.Column(db.String(), nullable=False))
 
-    posted_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    posted_by = db.Column(db.Integer, db.ForeignKey(
+        'user.id'), nullable=False, index=True)
 
     nanodegree_id = db.Column(db.Integer, db.ForeignKey(
         'nanodegree.id'), nullable=False, index=True)
@@ -21,23 +24,75 @@ class Question(Base):
 
     github_link = db.Column(db.String(150), nullable=True)
 
-    is_deleted = db.Column(db.Boolean, nullable=False, default=False)
+    is_deleted = db.Column(db.Boolean, nullable=False,
+                           default=False, server_default=db.false())
 
     answers = db.relationship("Answer", backref="question", lazy=True)
 
     has_accepted_answer = db.Column(db.Boolean, nullable=False, default=False)
 
+    # incremented by every update, exposed as the ETag of the question
+    version = db.Column(db.Integer, nullable=False,
+                        default=1, server_default='1')
+
+    __mapper_args__ = dict(Base.__mapper_args__, version_id_col=version)
+
     def __repr__(self):
         return f'<Question: {self.title} >'
 
-    def serialize_preview(self):
-        return {
-            "title": self.title,
-            "id": self.id,
-            "nanodegree_id": self.nanodegree_id,
-            "project_id": self.project_id,
-            "asked_by": self.posted_by
-        }
+    PREVIEW_FIELDS = {
+        "title": "title",
+        "id": "id",
+        "nanodegree_id": "nanodegree_id",
+        "project_id": "project_id",
+        "asked_by": "posted_by"
+    }
+
+    def serialize_preview(self, fields=None):
+        return self.serialize_fields(fields or list(self.PREVIEW_FIELDS), self.PREVIEW_FIELDS)
+
+    @classmethod
+    def serialize_preview_row(cls, row):
+        """Serializes a row holding the preview columns, e.g. one returned by update_if_posted_by"""
+        return {field: row[attribute] for field, attribute in cls.PREVIEW_FIELDS.items()}
+
+    @classmethod
+    def update_if_posted_by(cls, question_id, jwt_subject, expected_versions=None, **values):
+        """
+        Updates a question which is not deleted, only if it was posted by the user with the given subject
+        and, if expected_versions is given, only if its version is one of them. The version is incremented.
+
+        The checks, the update and the read of the updated row are a single UPDATE ... RETURNING
+        statement, so concurrent updates can't overwrite each other without taking any lock.
+        Returns the preview columns and version of the updated row, or None if no question was updated.
+        """
+        poster_id = db.select([User.id]).where(
+            User.jwt_subject == jwt_subject).as_scalar()
+
+        statement = cls.__table__.update().where(cls.id == question_id).where(
+            cls.is_deleted.is_(False)).where(cls.posted_by == poster_id)
+
+        if expected_versions is not None:
+            statement = statement.where(cls.version.in_(expected_versions))
+
+        statement = statement.values(version=cls.version + 1, **values).returning(
+            cls.version, *[cls.__table__.c[attribute] for attribute in cls.PREVIEW_FIELDS.values()])
+
+        return db.session.execute(statement).first()
+
+    @classmethod
+    def get_write_access(cls, question_id, jwt_subject):
+        """
+        Returns the version of a question which is not deleted and whether it was posted by
+        the user with the given subject, or None if there is no such question.
+
+        Used to explain why update_if_posted_by did not update anything.
+        """
+        poster_id = db.select([User.id]).where(
+            User.jwt_subject == jwt_subject).as_scalar()
+
+        return db.session.query(cls.version, (cls.posted_by == poster_id).label('is_poster')).filter(
+            cls.id == question_id, cls.is_deleted.is_(False)).first()
 
     def serialize_full(self):
         return {
@@ -48,6 +103,7 @@ class Question(Base):
             "details": self.details,
             "github_link": self.github_link,
             "has_accepted_answer": self.has_accepted_answer,
-            "answers": self.answers,
+            "asked_by": self.posted_by,
+            "version": self.version
         }
 
@@ -20,8 +20,12 @@ class User(Base):
     # anwers
     answers = db.relationship('Answer', backref="user", lazy=True)
 
-    def serialize(self):
-        return {"id": self.id}
+    API_FIELDS = {
+        "id": "id"
+    }
+
+    def serialize(self, fields=None):
+        return self.serialize_fields(fields or list(self.API_FIELDS))
 
     def __repr__(self):
         return f'<User {self.jwt_subject}>'
@@ -0,0 +1,19 @@
+"""
+Background tasks run by `flask worker`, see src/app/utils/jobs.py
+"""
+from datetime import datetime
+from src.app.utils.jobs import task
+from src.app.models import nanodegree_stats
+from src.app.models.idempotency_key import IdempotencyKey
+
+
+@task()
+def refresh_stats():
+    """Refreshes the nanodegree statistics after writes, coalesced by the unique key it is enqueued with"""
+    nanodegree_stats.refresh_stats()
+
+
+@task()
+def purge_expired_idempotency_keys():
+    """Deletes the stored responses of idempotency keys past their ttl"""
+    IdempotencyKey.query.filter(IdempotencyKey.expires_at <= datetime.utcnow()).delete()
@@ -0,0 +1,191 @@
+"""
+Enrolls whole cohorts of students at once.
+
+The JWT subjects are streamed into a temporary staging table with COPY. The missing users and the
+enrollments are then created with two set based INSERT ... ON CONFLICT DO NOTHING statements, so a
+cohort of thousands of students takes a handful of statements instead of thousands of requests.
+"""
+import csv
+import json
+import tempfile
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import text
+from src.app import db
+from src.app.models.user import User
+from src.app.utils.cache_bus import invalidate
+from src.app.utils.jobs import enqueue
+
+CSV_FORMAT = 'csv'
+NDJSON_FORMAT = 'ndjson'
+
+# media type -> format of the request bodies accepted by the bulk enrollment endpoint
+MEDIA_TYPES = {
+    'text/csv': CSV_FORMAT,
+    'application/x-ndjson': NDJSON_FORMAT
+}
+
+STAGING_TABLE = 'enrollment_staging'
+
+# the staged subjects are kept in memory up to this size and spilled to a temporary file beyond it
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+# only the line numbers of the first failed rows are reported
+MAX_REPORTED_FAILED_LINES = 100
+
+
+def parse_subject(line, file_format):
+    """
+    Returns the JWT subject of a row.
+
+    CSV rows hold the subject in their first column and NDJSON rows are {"jwt_subject": str} objects.
+    Raises ValueError if the row is malformed or the subject is not valid.
+    """
+    if file_format == NDJSON_FORMAT:
+        row = json.loads(line)
+
+        if not isinstance(row, dict) or not isinstance(row.get('jwt_subject'), str):
+            raise ValueError('the row has no jwt_subject')
+
+        subject = row['jwt_subject'].strip()
+
+    else:
+        subject = next(csv.reader([line]))[0].strip()
+
+    if not subject or len(subject) > User.jwt_subject.type.length or '\x00' in subject:
+        raise ValueError('the jwt_subject is not valid')
+
+    return subject
+
+
+def read_subjects(lines, file_format=CSV_FORMAT):
+    """
+    Yields a (line_number, subject) tuple for each row of a CSV or NDJSON stream, subject is None if the row is not valid.
+
+    Blank lines and the jwt_subject header row of CSV files are skipped.
+    """
+    for line_number, line in enumerate(lines, start=1):
+        try:
+            if isinstance(line, bytes):
+                line = line.decode('utf-8')
+
+            line = line.strip()
+
+            if not line:
+                continue
+
+            subject = parse_subject(line, file_format)
+
+        except ValueError:
+            # UnicodeDecodeError and JSONDecodeError are ValueErrors too
+            yield line_number, None
+            continue
+
+        if file_format == CSV_FORMAT and line_number == 1 and subject == 'jwt_subject':
+            continue
+
+        yield line_number, subject
+
+
+def stage_subjects(subjects):
+    """
+    Copies the subjects into a temporary staging table which is dropped when the transaction ends.
+
+    Returns the number of staged rows.
+    """
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE, mode='w+', newline='') as staged_rows:
+        writer = csv.writer(staged_rows)
+
+        number_of_rows = 0
+
+        for subject in subjects:
+            writer.writerow([subject])
+            number_of_rows += 1
+
+        staged_rows.seek(0)
+
+        connection = db.session.connection()
+
+        connection.execute(text(
+            f'CREATE TEMPORARY TABLE {STAGING_TABLE} (jwt_subject varchar({User.jwt_subject.type.length}) NOT NULL) ON COMMIT DROP'))
+
+        # COPY is only exposed by the DBAPI cursor
+        cursor = connection.connection.cursor()
+
+        try:
+            cursor.copy_expert(
+                f'COPY {STAGING_TABLE} (jwt_subject) FROM STDIN WITH (FORMAT csv)', staged_rows)
+
+        finally:
+            cursor.close()
+
+    return number_of_rows
+
+
+def bulk_enroll(nanodegree_id, lines, file_format=CSV_FORMAT):
+    """
+    Enrolls the students listed in a CSV or NDJSON stream of JWT subjects in a nanodegree and commits.
+
+    Users are created for the subjects which have none. Subjects listed twice and students who are
+    already enrolled are left as they are, so the same file can be imported again safely.
+    Returns the number of new enrollments, of students who were already enrolled, of new users,
+    of duplicate rows and of rows which failed to parse along with their line numbers.
+    """
+    report = {
+        "enrolled": 0,
+        "already_enrolled": 0,
+        "new_users": 0,
+        "duplicates": 0,
+        "failed": 0,
+        "failed_lines": []
+    }
+
+    def valid_subjects():
+        for line_number, subject in read_subjects(lines, file_format):
+            if subject is not None:
+                yield subject
+                continue
+
+            report['failed'] += 1
+
+            if len(report['failed_lines']) < MAX_REPORTED_FAILED_LINES:
+                report['failed_lines'].append(line_number)
+
+    number_of_rows = stage_subjects(valid_subjects())
+
+    number_of_subjects = db.session.execute(
+        text(f'SELECT count(DISTINCT jwt_subject) FROM {STAGING_TABLE}')).scalar()
+
+    new_users = db.session.execute(text(f'''
+        INSERT INTO "user" (jwt_subject, date_created)
+        SELECT DISTINCT jwt_subject, :date_created FROM {STAGING_TABLE}
+        ON CONFLICT (jwt_subject) DO NOTHING
+    '''), {"date_created": datetime.utcnow()})
+
+    new_enrollments = db.session.execute(text(f'''
+        INSERT INTO nanodegree_enrollment (user_id, nanodegree_id)
+        SELECT "user".id, :nanodegree_id
+        FROM "user" JOIN (SELECT DISTINCT jwt_subject FROM {STAGING_TABLE}) AS staged_subject
+        ON "user".jwt_subject = staged_subject.jwt_subject
+        ON CONFLICT DO NOTHING
+    '''), {"nanodegree_id": nanodegree_id})
+
+    # ON COMMIT DROP only cleans up after failures, the table is dropped as soon as it is no longer needed
+    db.session.execute(text(f'DROP TABLE {STAGING_TABLE}'))
+
+    report['new_users'] = new_users.rowcount
+    report['enrolled'] = new_enrollments.rowcount
+    report['already_enrolled'] = number_of_subjects - new_enrollments.rowcount
+    report['duplicates'] = number_of_rows - number_of_subjects
+
+    if new_enrollments.rowcount:
+        invalidate('enrollments', nanodegree_id)
+        invalidate('users')
+        invalidate('dashboards')
+
+        enqueue('refresh_stats', unique_key='refresh_stats',
+                delay=current_app.config['STATS_REFRESH_DELAY'])
+
+    db.session.commit()
+
+    return report
@@ -0,0 +1,299 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+from sqlalchemy import event
+from flask_sqlalchemy import SignallingSession
+from src.app import db
+from src.app.utils.pg_notify import publish
+
+CACHE_INVALIDATION_CHANNEL = 'cache_invalidation'
+
+_MISSING = object()
+
+
+class _Flight(object):
+    """A computation of a cache entry which other callers can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class LocalCache(object):
+    """
+    Thread safe in-memory cache of one worker process.
+
+    Entries are dropped by the invalidation bus when the data behind them changes in any
+    process. The optional ttl is only a safety net in case an invalidation is missed.
+    Beyond max_entries the least recently used entries are evicted, so keys derived from
+    request parameters can't grow the memory of the worker without bound.
+    """
+
+    def __init__(self, namespace, ttl=None, max_entries=None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._flights = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            value, expires_at, stale_until = self._entries.get(
+                key, (_MISSING, None, None))
+
+            if value is _MISSING:
+                return default
+
+            now = time.monotonic()
+
+            if stale_until is not None and stale_until <= now:
+                del self._entries[key]
+                return default
+
+            if expires_at is not None and expires_at <= now:
+                return default
+
+            self._entries.move_to_end(key)
+
+            return value
+
+    def set(self, key, value, ttl=None, grace=0):
+        """Caches a value for ttl seconds. It can still be served as stale for another grace seconds by get_or_compute"""
+        with self._lock:
+            self._store(key, value, ttl, grace)
+
+    def _store(self, key, value, ttl=None, grace=0):
+        ttl = ttl or self.ttl
+
+        if ttl:
+            expires_at = time.monotonic() + ttl
+            self._entries[key] = (value, expires_at, expires_at + grace)
+
+        else:
+            self._entries[key] = (value, None, None)
+
+        self._entries.move_to_end(key)
+
+        if self.max_entries is not None:
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key, compute, ttl=None, grace=0, refresh_ahead=0, wait_timeout=None):
+        """
+        Returns the cached value of key, calling compute() to fill it.
+
+        Only one caller per key runs compute() at a time. The others wait for its result or,
+        if the value expired less than grace seconds ago, are served the stale value while it is
+        recomputed in the background. Values are also recomputed in the background once they are
+        within refresh_ahead seconds of expiring, so hot keys never expire under load.
+        """
+        now = time.monotonic()
+
+        with self._lock:
+            value, expires_at, stale_until = self._entries.get(
+                key, (_MISSING, None, None))
+
+            generation = self._generation
+
+            if value is not _MISSING:
+                self._entries.move_to_end(key)
+
+                if expires_at is None or now < expires_at - refresh_ahead:
+                    return value
+
+                if now < stale_until:
+                    if key not in self._flights:
+                        flight = self._flights[key] = _Flight()
+                        self._refresh_in_background(
+                            key, flight, compute, ttl, grace, generation)
+
+                    return value
+
+            flight = self._flights.get(key)
+            is_leader = flight is None
+
+            if is_leader:
+                flight = self._flights[key] = _Flight()
+
+        if is_leader:
+            return self._compute(key, flight, compute, ttl, grace, generation)
+
+        if not flight.done.wait(wait_timeout):
+            # the computation is taking too long, don't keep the request waiting any longer
+            return compute()
+
+        if flight.error is not None:
+            raise flight.error
+
+        return flight.value
+
+    def _compute(self, key, flight, compute, ttl, grace, generation):
+        try:
+            flight.value = compute()
+
+            with self._lock:
+                # a value computed while the cache was invalidated may already be stale
+                if self._generation == generation:
+                    self._store(key, flight.value, ttl, grace)
+
+            return flight.value
+
+        except Exception as error:
+            flight.error = error
+            raise
+
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+
+            flight.done.set()
+
+    def _refresh_in_background(self, key, flight, compute, ttl, grace, generation):
+        app = current_app._get_current_object()
+
+        def refresh():
+            with app.app_context():
+                try:
+                    self._compute(key, flight, compute,
+                                  ttl, grace, generation)
+
+                except Exception:
+                    print(sys.exc_info())
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def delete(self, key):
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class CacheInvalidationBus(object):
+    """
+    Keeps the local caches of every worker process in sync using Postgres LISTEN/NOTIFY.
+
+    Writes call invalidate() inside their transaction. The invalidation is applied to the
+    local caches straight away and again after the commit, and is sent to the other processes
+    with pg_notify which Postgres only delivers once the transaction commits.
+    """
+
+    def __init__(self, listener):
+        self.listener = listener
+        self.caches = {}
+        self._lock = threading.Lock()
+
+        listener.register_channel(CACHE_INVALIDATION_CHANNEL)
+        listener.subscribe(CACHE_INVALIDATION_CHANNEL,
+                           self.on_message, process_wide=True)
+
+        # invalidations sent while the listener was disconnected are lost
+        listener.add_connect_callback(self.clear_all)
+
+    def get_cache(self, namespace, ttl=None, max_entries=None):
+        """Returns the local cache of a namespace, creating it the first time"""
+        with self._lock:
+            if namespace not in self.caches:
+                self.caches[namespace] = LocalCache(
+                    namespace, ttl, max_entries)
+
+            return self.caches[namespace]
+
+    def invalidate(self, namespace, key=None):
+        """
+        Drops a key, or the whole namespace if key is None, from the caches of every process
+        once the current transaction commits
+        """
+        message = {"namespace": namespace, "key": key}
+
+        self.apply(message)
+
+        db.session.info.setdefault(
+            'cache_invalidations', []).append((self, message))
+
+        publish(CACHE_INVALIDATION_CHANNEL, message)
+
+    def apply(self, message):
+        cache = self.caches.get(message['namespace'])
+
+        if cache is None:
+            return
+
+        if message.get('key') is None:
+            cache.clear()
+
+        else:
+            cache.delete(message['key'])
+
+    def on_message(self, message):
+        self.apply(message)
+
+    def clear_all(self):
+        for cache in list(self.caches.values()):
+            cache.clear()
+
+
+@event.listens_for(SignallingSession, 'after_commit')
+def apply_pending_invalidations(session):
+    """
+    Applies the invalidations of a committed transaction a second time, in case a concurrent
+    request cached the old data between invalidate() and the commit
+    """
+    for bus, message in session.info.pop('cache_invalidations', []):
+        bus.apply(message)
+
+
+@event.listens_for(SignallingSession, 'after_rollback')
+def discard_pending_invalidations(session):
+    session.info.pop('cache_invalidations', None)
+
+
+def get_cache(namespace, ttl=None):
+    """Returns the local cache of a namespace for the current app"""
+    return current_app.extensions['cache_bus'].get_cache(namespace, ttl, current_app.config['CACHE_MAX_ENTRIES'])
+
+
+def get_or_compute(namespace, key, compute, ttl):
+    """
+    Returns the value cached under key in a namespace, computing it with single flight and
+    stale-while-revalidate according to the CACHE_* settings
+    """
+    config = current_app.config
+
+    return get_cache(namespace).get_or_compute(key, compute, ttl=ttl,
+                                               grace=config['CACHE_STALE_GRACE'],
+                                               refresh_ahead=config['CACHE_REFRESH_AHEAD'],
+                                               wait_timeout=config['CACHE_WAIT_TIMEOUT'])
+
+
+def invalidate(namespace, key=None):
+    """Invalidates a cached key, or a whole namespace, in every worker process when the current transaction commits"""
+    current_app.extensions['cache_bus'].invalidate(namespace, key)
+
+
+def init_cache_bus(app):
+    """
+    Attaches the cache invalidation bus to the app.
+
+    Must be called after init_notifications. The notification listener is started by the
+    first request of each worker process rather than here, so that no connection is opened
+    by the gunicorn master.
+    """
+    listener = app.extensions['notification_listener']
+
+    bus = CacheInvalidationBus(listener)
+    app.extensions['cache_bus'] = bus
+
+    app.before_request(listener.ensure_started)
@@ -0,0 +1,147 @@
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# content encodings a response can be compressed with
+ENCODINGS = ('br', 'gzip')
+
+
+class CompressedBodyCache(object):
+    """
+    Small LRU cache of compressed response bodies keyed by a digest of the uncompressed body.
+
+    Hot pages return the same bytes request after request so they are only compressed once.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            compressed_body = self._entries.get(key)
+
+            if compressed_body is not None:
+                self._entries.move_to_end(key)
+
+            return compressed_body
+
+    def set(self, key, compressed_body):
+        with self._lock:
+            self._entries[key] = compressed_body
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+def choose_encoding(accept_encodings):
+    """
+    Returns the best content encoding accepted by the client or None.
+
+    Brotli is only offered if the brotli module is installed.
+    """
+    gzip_quality = accept_encodings.quality('gzip')
+
+    if brotli is not None:
+        brotli_quality = accept_encodings.quality('br')
+
+        if brotli_quality > 0 and brotli_quality >= gzip_quality:
+            return 'br'
+
+    if gzip_quality > 0:
+        return 'gzip'
+
+    return None
+
+
+def add_encoding_to_etag(etag, encoding):
+    """Returns the strong ETag of a response compressed with encoding, e.g. "5-gzip" for "5\""""
+    return f'{etag}-{encoding}'
+
+
+def remove_encoding_from_etag(etag):
+    """Returns the ETag of the uncompressed response given the ETag of a compressed one, other ETags as is"""
+    uncompressed_etag, _, encoding = etag.rpartition('-')
+
+    if uncompressed_etag and encoding in ENCODINGS:
+        return uncompressed_etag
+
+    return etag
+
+
+def compress(body, encoding, gzip_level, brotli_quality):
+    if encoding == 'br':
+        return brotli.compress(body, quality=brotli_quality)
+
+    return gzip.compress(body, compresslevel=gzip_level)
+
+
+def init_compression(app):
+    """
+    Compresses responses above COMPRESSION_MIN_SIZE bytes with the best encoding the client accepts
+    """
+    min_size = app.config.get('COMPRESSION_MIN_SIZE', 1024)
+    gzip_level = app.config.get('COMPRESSION_GZIP_LEVEL', 6)
+    brotli_quality = app.config.get('COMPRESSION_BROTLI_QUALITY', 5)
+    mimetypes = set(app.config.get(
+        'COMPRESSION_MIMETYPES', ['application/json', 'text/html']))
+
+    body_cache = CompressedBodyCache(
+        app.config.get('COMPRESSION_CACHE_SIZE', 256))
+
+    app.extensions['compressed_body_cache'] = body_cache
+
+    @app.after_request
+    def compress_response(response):
+        if response.mimetype not in mimetypes:
+            return response
+
+        # the response varies with Accept-Encoding even when it is not compressed
+        response.vary.add('Accept-Encoding')
+
+        if (response.status_code < 200 or response.status_code >= 300
+                or response.status_code == 204
+                or response.direct_passthrough
+                or 'Content-Encoding' in response.headers):
+            return response
+
+        encoding = choose_encoding(request.accept_encodings)
+
+        if encoding is None:
+            return response
+
+        body = response.get_data()
+
+        if len(body) < min_size:
+            return response
+
+        cache_key = (hashlib.sha1(body).digest(), encoding)
+
+        compressed_body = body_cache.get(cache_key)
+
+        if compressed_body is None:
+            compressed_body = compress(
+                body, encoding, gzip_level, brotli_quality)
+            body_cache.set(cache_key, compressed_body)
+
+        response.set_data(compressed_body)
+        response.headers['Content-Encoding'] = encoding
+        response.headers['Content-Length'] = len(compressed_body)
+
+        # the compressed bytes differ from the uncompressed ones so a strong ETag gets the
+        # encoding appended and stays strong, see remove_encoding_from_etag
+        etag, is_weak = response.get_etag()
+
+        if etag is not None and not is_weak:
+            response.set_etag(add_encoding_to_etag(etag, encoding))
+
+        return response
@@ -0,0 +1,183 @@
+"""
+Queries of the hot paths, built and compiled to SQL once instead of on every request.
+
+On SQLAlchemy 1.3 building an ORM query and compiling it takes longer than most of these
+queries take to run. The functions registered with @hot_query are baked: the Query they build
+and its compiled SQL are cached in the bakery the first time they run, later calls only bind
+their parameters. Values which change from call to call must be bindparam()s given to .params(),
+anything else changing the SQL has to be part of the cache key (see with_fields).
+
+`flask benchmark hot-queries` compares the registered queries with and without the cache.
+"""
+import time
+from contextlib import contextmanager
+from sqlalchemy import bindparam, event
+from sqlalchemy.ext import baked
+from sqlalchemy.orm import load_only
+from src.app import db
+from src.app.models.user import User
+from src.app.models.nanodegree import nanodegree_enrollments
+from src.app.models.project import Project
+from src.app.models.question import Question
+
+# number of queries and compiled statements kept, each set of requested fields is a separate entry
+BAKERY_SIZE = 500
+
+bakery = baked.bakery(size=BAKERY_SIZE)
+
+# name -> baked query of every hot query
+HOT_QUERIES = {}
+
+
+def hot_query(build):
+    """Registers a function building a query from a session as a hot query and returns its baked query"""
+    baked_query = bakery(build)
+
+    HOT_QUERIES[build.__name__] = baked_query
+
+    return baked_query
+
+
+def with_fields(baked_query, model, fields, api_fields=None):
+    """Returns a copy of a hot query which only loads the columns backing the requested API fields"""
+    api_fields = api_fields or model.API_FIELDS
+
+    columns = tuple(api_fields[field] for field in fields)
+
+    return baked_query.with_criteria(lambda query: query.options(load_only(*columns)), columns)
+
+
+def get_by_id(model, id):
+    """Same as model.query.get(id), the query is looked up in the session's identity map first"""
+    return bakery(lambda session: session.query(model), model)(db.session()).get(id)
+
+
+@hot_query
+def user_by_jwt_subject(session):
+    return session.query(User).filter(User.jwt_subject == bindparam('jwt_subject'))
+
+
+@hot_query
+def user_id_by_jwt_subject(session):
+    return session.query(User).options(load_only('id')).filter(User.jwt_subject == bindparam('jwt_subject'))
+
+
+@hot_query
+def enrolled_student(session):
+    return session.query(User).join(nanodegree_enrollments, nanodegree_enrollments.c.user_id == User.id).filter(
+        nanodegree_enrollments.c.nanodegree_id == bindparam('nanodegree_id'),
+        User.jwt_subject == bindparam('jwt_subject'))
+
+
+@hot_query
+def nanodegree_projects(session):
+    return session.query(Project).filter(
+        Project.nanodegree_id == bindparam('nanodegree_id')).order_by(Project.id)
+
+
+@hot_query
+def questions(session):
+    return session.query(Question).filter(Question.is_deleted.is_(False))
+
+
+@hot_query
+def questions_page(session):
+    # ordered by the primary key so that pages are stable and read through its index
+    return session.query(Question).filter(Question.is_deleted.is_(False)).order_by(Question.id).limit(
+        bindparam('limit')).offset(bindparam('offset'))
+
+
+def get_user(jwt_subject):
+    """Returns the user with a JWT subject, None if there is none"""
+    return user_by_jwt_subject(db.session()).params(jwt_subject=jwt_subject).first()
+
+
+def get_user_id(jwt_subject):
+    """Returns the user with a JWT subject with only its id loaded, None if there is none"""
+    return user_id_by_jwt_subject(db.session()).params(jwt_subject=jwt_subject).first()
+
+
+def get_enrolled_student(nanodegree_id, jwt_subject):
+    """Returns the user with a JWT subject if they are enrolled in a nanodegree, None otherwise"""
+    return enrolled_student(db.session()).params(
+        nanodegree_id=nanodegree_id, jwt_subject=jwt_subject).first()
+
+
+def get_projects_of_nanodegree(nanodegree_id, fields):
+    """Returns the projects of a nanodegree ordered by id, with only the requested API fields loaded"""
+    return with_fields(nanodegree_projects, Project, fields)(db.session()).params(
+        nanodegree_id=nanodegree_id).all()
+
+
+def count_questions():
+    """Returns the number of questions which are not deleted"""
+    return questions(db.session()).count()
+
+
+def get_questions_page(offset, limit, fields):
+    """Returns limit questions which are not deleted ordered by id starting at offset, with only the requested preview fields loaded"""
+    return with_fields(questions_page, Question, fields, Question.PREVIEW_FIELDS)(db.session()).params(
+        offset=offset, limit=limit).all()
+
+
+@contextmanager
+def database_timer():
+    """Yields a list whose first item is the number of seconds spent executing statements in the block"""
+    database_time = [0.0]
+
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info['statement_started_at'] = time.perf_counter()
+
+    def after_execute(conn, cursor, statement, parameters, context, executemany):
+        database_time[0] += time.perf_counter() - conn.info.pop('statement_started_at')
+
+    event.listen(db.engine, 'before_cursor_execute', before_execute)
+    event.listen(db.engine, 'after_cursor_execute', after_execute)
+
+    try:
+        yield database_time
+
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_execute)
+        event.remove(db.engine, 'after_cursor_execute', after_execute)
+
+
+def time_calls(call, iterations, baked_queries):
+    """
+    Returns the mean number of microseconds a call takes and the part of it spent in Python,
+    i.e. outside of the database, with the bakery enabled or not.
+
+    Each call gets a new session like each request does.
+    """
+    db.session.remove()
+    db.session.configure(enable_baked_queries=baked_queries)
+
+    try:
+        # bakes the queries, or fills the caches the app has either way
+        call()
+        db.session.remove()
+
+        with database_timer() as database_time:
+            started_at = time.perf_counter()
+
+            for _ in range(iterations):
+                call()
+                db.session.remove()
+
+            total_time = time.perf_counter() - started_at
+
+    finally:
+        db.session.configure(enable_baked_queries=True)
+
+    return total_time * 1e6 / iterations, (total_time - database_time[0]) * 1e6 / iterations
+
+
+def benchmark(calls, iterations):
+    """
+    Times each call without and then with the bakery.
+
+    calls maps names to functions. Returns a (name, unbaked timings, baked timings) tuple for
+    each call, see time_calls.
+    """
+    return [(name, time_calls(call, iterations, False), time_calls(call, iterations, True))
+            for name, call in calls.items()]
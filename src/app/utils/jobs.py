@@ -0,0 +1,163 @@
+import json
+import sys
+import time
+import traceback
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy.dialects.postgresql import insert
+from src.app import db
+from src.app.models.job import Job, DeadJob
+
+# task name -> function, filled by the task decorator
+TASKS = {}
+
+
+def task(name=None):
+    """
+    Registers a function as a background task.
+
+    Tasks are called with the keyword arguments given to enqueue inside a savepoint of the
+    worker's transaction, so they should leave committing to the worker.
+    """
+    def register(function):
+        TASKS[name or function.__name__] = function
+        return function
+
+    return register
+
+
+def enqueue(task_name, queue='default', delay=0, unique_key=None, max_attempts=None, **payload):
+    """
+    Adds a job to the current transaction, it is only visible to the workers once the transaction commits.
+
+    If unique_key is given and a job with that key is already pending, no new job is added.
+    This coalesces work like refreshing the statistics which only needs to run once for many writes.
+    Jobs which are running no longer hold their key, see claim_next_job.
+    """
+    values = {
+        "queue": queue,
+        "task": task_name,
+        "payload": json.dumps(payload, default=str),
+        "run_at": datetime.utcnow() + timedelta(seconds=delay),
+        "attempts": 0,
+        "max_attempts": max_attempts or current_app.config['JOB_MAX_ATTEMPTS'],
+        "unique_key": unique_key
+    }
+
+    statement = insert(Job.__table__).values(**values)
+
+    if unique_key is not None:
+        statement = statement.on_conflict_do_nothing(
+            index_elements=['unique_key'])
+
+    db.session.execute(statement)
+
+
+def get_retry_delay(attempts):
+    """Exponential backoff: JOB_RETRY_BASE_DELAY seconds after the first failure, doubling up to JOB_RETRY_MAX_DELAY"""
+    config = current_app.config
+
+    return min(config['JOB_RETRY_BASE_DELAY'] * 2 ** (attempts - 1), config['JOB_RETRY_MAX_DELAY'])
+
+
+def claim_next_job(queue='default'):
+    """
+    Claims the next due job of a queue and locks it for the run.
+
+    SKIP LOCKED makes concurrent workers pass over the jobs already claimed by
+    others instead of waiting for them, so each job is run by a single worker.
+
+    The claim is committed straight away. The job gives up its unique key, so a job enqueued
+    with the same key while this one runs is added instead of being coalesced into a run which
+    has already started. Its run_at is pushed JOB_CLAIM_TIMEOUT seconds ahead so no other worker
+    picks it up before it is locked again, or until then if this worker dies.
+    """
+    job = Job.query.filter(Job.queue == queue, Job.run_at <= datetime.utcnow()).order_by(
+        Job.run_at, Job.id).with_for_update(skip_locked=True).first()
+
+    if job is None:
+        return None
+
+    job.unique_key = None
+    job.run_at = datetime.utcnow() + \
+        timedelta(seconds=current_app.config['JOB_CLAIM_TIMEOUT'])
+
+    job_id = job.id
+
+    db.session.commit()
+
+    return Job.query.filter(Job.id == job_id).with_for_update(skip_locked=True).first()
+
+
+def run_next_job(queue='default'):
+    """
+    Runs the next due job of a queue. Returns False if there was none.
+
+    The job row stays locked while its task runs in a savepoint, so the task's writes and the
+    removal of the job are committed together. A failed task is rolled back and the job is
+    retried later with backoff, or moved to the dead_job table after max_attempts.
+    """
+    job = claim_next_job(queue)
+
+    if job is None:
+        db.session.commit()
+        return False
+
+    savepoint = db.session.begin_nested()
+
+    try:
+        TASKS[job.task](**job.get_payload())
+
+        # the task may already have released the savepoint by committing
+        if savepoint.is_active:
+            savepoint.commit()
+
+        db.session.delete(job)
+
+    except Exception:
+        print(sys.exc_info())
+
+        if savepoint.is_active:
+            savepoint.rollback()
+
+        job.attempts += 1
+        job.last_error = traceback.format_exc()
+
+        if job.attempts >= job.max_attempts:
+            db.session.add(DeadJob(queue=job.queue, task=job.task, payload=job.payload,
+                                   attempts=job.attempts, last_error=job.last_error))
+            db.session.delete(job)
+
+        else:
+            job.run_at = datetime.utcnow() + \
+                timedelta(seconds=get_retry_delay(job.attempts))
+
+    db.session.commit()
+
+    return True
+
+
+def run_worker(queue='default', poll_interval=1, burst=False):
+    """
+    Runs the jobs of a queue until interrupted, sleeping poll_interval seconds whenever the queue is empty.
+
+    In burst mode the worker exits once there is no due job left.
+    """
+    while True:
+        try:
+            ran_a_job = run_next_job(queue)
+
+        except Exception:
+            print(sys.exc_info())
+            db.session.rollback()
+            ran_a_job = False
+
+        finally:
+            db.session.remove()
+
+        if not ran_a_job:
+            if burst:
+                return
+
+            time.sleep(poll_interval)
+
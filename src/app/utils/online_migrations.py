@@ -0,0 +1,305 @@
+"""
+Helpers to change the schema of the live database without blocking the API.
+
+env.py runs every revision in its own transaction with a lock_timeout, so that a migration waiting
+for a lock gives up quickly instead of queueing every query behind it, and with a statement_timeout.
+Revisions build indexes with create_index_concurrently, take exclusive locks with
+run_with_lock_retries and fill columns with backfill_in_batches. `flask check-migrations` flags the
+operations which would block an existing table while they run.
+"""
+import ast
+import logging
+import os
+import time
+from contextlib import contextmanager
+from alembic import context, op
+from flask import current_app
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+logger = logging.getLogger('alembic.online_migrations')
+
+# SQLSTATE of a lock_timeout
+LOCK_NOT_AVAILABLE = '55P03'
+
+# a line of a revision ending with this comment is not checked, for operations on tables known to stay small
+REVIEWED_MARKER = '# migration-safety: reviewed'
+
+# revisions of the baseline schema, applied before the checks existed while the tables were small
+REVIEWED_REVISIONS = {'cbcb7906e58d', '8f63db3ad7a1'}
+
+
+def set_timeouts(lock_timeout, statement_timeout):
+    """Sets the timeouts of the migration session, called by env.py before running the migrations"""
+    context.execute(f"SET lock_timeout = '{lock_timeout}'")
+    context.execute(f"SET statement_timeout = '{statement_timeout}'")
+
+
+@contextmanager
+def statement_timeout(timeout):
+    """Overrides the statement timeout of the migration session inside the block, 0 disables it"""
+    op.execute(f"SET statement_timeout = '{timeout}'")
+
+    try:
+        yield
+
+    finally:
+        op.execute(
+            f"SET statement_timeout = '{current_app.config['MIGRATION_STATEMENT_TIMEOUT']}'")
+
+
+def drop_invalid_index(index_name, table_name):
+    """Drops an index left invalid by a concurrent build which failed, e.g. on a lock timeout"""
+    if context.is_offline_mode():
+        return
+
+    invalid_index = op.get_bind().execute(text('''
+        SELECT 1 FROM pg_index JOIN pg_class ON pg_class.oid = pg_index.indexrelid
+        WHERE pg_class.relname = :index_name AND NOT pg_index.indisvalid
+    '''), index_name=index_name).first()
+
+    if invalid_index is not None:
+        logger.warning(f'Dropping {index_name}, left invalid by a previous build')
+
+        op.drop_index(index_name, table_name=table_name,
+                      postgresql_concurrently=True)
+
+
+def create_index_concurrently(index_name, table_name, columns, unique=False, **kw):
+    """
+    Builds an index without blocking the writes to its table.
+
+    CREATE INDEX CONCURRENTLY can't run in a transaction, so the index is built in an autocommit
+    block which first commits the operations of the migration which came before it.
+    The statement timeout is lifted since building an index on a large table takes a while.
+    """
+    with op.get_context().autocommit_block():
+        drop_invalid_index(index_name, table_name)
+
+        with statement_timeout(0):
+            op.create_index(index_name, table_name, columns, unique=unique,
+                            postgresql_concurrently=True, **kw)
+
+
+def drop_index_concurrently(index_name, table_name):
+    """Drops an index without blocking the reads and writes of its table"""
+    with op.get_context().autocommit_block():
+        op.drop_index(index_name, table_name=table_name,
+                      postgresql_concurrently=True)
+
+
+def run_with_lock_retries(operations, attempts=5, wait=5):
+    """
+    Runs operations which need an exclusive lock on a table, like adding a column, retrying them on lock timeouts.
+
+    An exclusive lock request waits for the transactions using the table and blocks every query
+    arriving after it, so it is given up after lock_timeout and tried again after wait seconds,
+    a bit longer each time. Each attempt runs in a savepoint, the locks taken by the earlier
+    operations of the migration are kept in the meantime so they should come after this call.
+    """
+    if context.is_offline_mode():
+        operations()
+        return
+
+    for attempt in range(1, attempts + 1):
+        savepoint = op.get_bind().begin_nested()
+
+        try:
+            operations()
+
+        except OperationalError as error:
+            savepoint.rollback()
+
+            if attempt == attempts or getattr(error.orig, 'pgcode', None) != LOCK_NOT_AVAILABLE:
+                raise
+
+            logger.warning(
+                f'Lock timeout, attempt {attempt} of {attempts}. Retrying in {wait * attempt}s')
+
+            time.sleep(wait * attempt)
+
+        else:
+            savepoint.commit()
+            return
+
+
+def backfill_in_batches(table_name, assignments, where=None, batch_size=None, pause=0):
+    """
+    Updates the rows of a table in batches of consecutive ids, each committed on its own.
+
+    A single UPDATE of a large table would lock all its rows until it is done and take longer
+    than the statement timeout. assignments is the SQL of the SET clause e.g. "version = 1" and
+    where an optional condition on the rows to update. Progress is logged after each batch and
+    pause seconds are left between batches for the replicas to keep up.
+    Returns the number of updated rows.
+    """
+    if context.is_offline_mode():
+        raise RuntimeError(
+            'Backfills need a database connection, they can not be rendered with --sql')
+
+    batch_size = batch_size or current_app.config['MIGRATION_BACKFILL_BATCH_SIZE']
+    condition = f' AND ({where})' if where else ''
+
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+
+        first_id, last_id = bind.execute(
+            text(f'SELECT min(id), max(id) FROM "{table_name}"')).first()
+
+        if first_id is None:
+            return 0
+
+        number_of_updated_rows = 0
+        started_at = time.perf_counter()
+
+        for batch_start in range(first_id, last_id + 1, batch_size):
+            result = bind.execute(text(
+                f'UPDATE "{table_name}" SET {assignments} WHERE id >= :batch_start AND id < :batch_end{condition}'),
+                batch_start=batch_start, batch_end=batch_start + batch_size)
+
+            number_of_updated_rows += result.rowcount
+
+            done = min(batch_start + batch_size, last_id + 1) - first_id
+
+            logger.info(f'{table_name}: {done * 100 // (last_id - first_id + 1)}% of the ids, '
+                        f'{number_of_updated_rows} rows updated in {time.perf_counter() - started_at:.1f}s')
+
+            if pause:
+                time.sleep(pause)
+
+    return number_of_updated_rows
+
+
+def get_literal(node):
+    try:
+        return ast.literal_eval(node)
+
+    except ValueError:
+        return None
+
+
+def get_table_name(call):
+    """Returns the name of the table an op call changes, if it is given as a literal"""
+    # position of the table name argument of each operation
+    table_argument = {
+        'create_index': (1, 'table_name'),
+        'create_unique_constraint': (1, 'table_name'),
+        'create_primary_key': (1, 'table_name'),
+        'create_foreign_key': (1, 'source_table'),
+        'create_check_constraint': (1, 'table_name')
+    }.get(call.func.attr, (0, 'table_name'))
+
+    position, keyword = table_argument
+
+    for argument in call.keywords:
+        if argument.arg == keyword:
+            return get_literal(argument.value)
+
+    if len(call.args) > position:
+        return get_literal(call.args[position])
+
+    return None
+
+
+def get_unsafe_operation(call):
+    """Returns why an op call would block an existing table while it runs, or None if it wouldn't"""
+    keywords = {argument.arg: argument.value for argument in call.keywords}
+    operation = call.func.attr
+
+    if operation == 'create_index' and get_literal(keywords.get('postgresql_concurrently', ast.Constant(False))) is not True:
+        return 'op.create_index blocks the writes to the table while the index is built, use create_index_concurrently'
+
+    if operation == 'add_column' and len(call.args) > 1 and isinstance(call.args[1], ast.Call):
+        column_keywords = {argument.arg: argument.value for argument in call.args[1].keywords}
+
+        if 'nullable' in column_keywords and get_literal(column_keywords['nullable']) is False \
+                and 'server_default' not in column_keywords:
+            return 'adding a NOT NULL column without a server_default fails on a table with rows, add a server_default or backfill it first'
+
+    if operation == 'alter_column':
+        if 'type_' in keywords:
+            return 'changing the type of a column rewrites the table while blocking its reads and writes'
+
+        if 'nullable' in keywords and get_literal(keywords['nullable']) is False:
+            return 'SET NOT NULL scans the whole table while blocking its reads and writes, validate a NOT VALID check constraint first'
+
+    if operation in ('create_unique_constraint', 'create_primary_key'):
+        return f'op.{operation} builds its index while blocking the writes to the table, build a unique index concurrently and add the constraint USING INDEX'
+
+    if operation == 'create_foreign_key':
+        return 'a new foreign key is validated against every row while blocking the writes to both tables, add it NOT VALID and validate it in a later migration'
+
+    if operation == 'execute' and call.args:
+        statement = ' '.join(str(get_literal(call.args[0]) or '').upper().split())
+
+        if ('CREATE INDEX' in statement or 'CREATE UNIQUE INDEX' in statement) and 'CONCURRENTLY' not in statement:
+            return 'CREATE INDEX blocks the writes to the table while the index is built, use create_index_concurrently'
+
+    return None
+
+
+def find_unsafe_operations(source):
+    """
+    Returns a (line number, message) tuple for each operation in the upgrade() of a revision which
+    would block the reads or writes of an existing table while it runs.
+
+    Operations on tables created by the same revision are not flagged since nothing uses them yet.
+    """
+    tree = ast.parse(source)
+    source_lines = source.splitlines()
+
+    upgrade = next((node for node in tree.body if isinstance(node, ast.FunctionDef)
+                    and node.name == 'upgrade'), None)
+
+    if upgrade is None:
+        return []
+
+    calls = sorted((node for node in ast.walk(upgrade) if isinstance(node, ast.Call)
+                    and isinstance(node.func, ast.Attribute)
+                    and isinstance(node.func.value, ast.Name) and node.func.value.id == 'op'),
+                   key=lambda call: call.lineno)
+
+    created_tables = {get_literal(call.args[0]) for call in calls
+                      if call.func.attr == 'create_table' and call.args}
+
+    unsafe_operations = []
+
+    for call in calls:
+        if get_table_name(call) in created_tables:
+            continue
+
+        if source_lines[call.lineno - 1].rstrip().endswith(REVIEWED_MARKER):
+            continue
+
+        message = get_unsafe_operation(call)
+
+        if message is not None:
+            unsafe_operations.append((call.lineno, message))
+
+    return unsafe_operations
+
+
+def check_revisions(versions_directory):
+    """Returns the unsafe operations of every revision which has not been reviewed, by file name"""
+    unsafe_revisions = {}
+
+    for file_name in sorted(os.listdir(versions_directory)):
+        if not file_name.endswith('.py'):
+            continue
+
+        with open(os.path.join(versions_directory, file_name)) as revision_file:
+            source = revision_file.read()
+
+        revision = next((get_literal(node.value) for node in ast.parse(source).body
+                         if isinstance(node, ast.Assign) and any(
+                             getattr(target, 'id', None) == 'revision' for target in node.targets)), None)
+
+        if revision in REVIEWED_REVISIONS:
+            continue
+
+        unsafe_operations = find_unsafe_operations(source)
+
+        if unsafe_operations:
+            unsafe_revisions[file_name] = unsafe_operations
+
+    return unsafe_revisions
@@ -0,0 +1,165 @@
+import json
+import os
+import select
+import sys
+import threading
+import time
+from collections import defaultdict
+from sqlalchemy import text
+from src.app import db
+
+
+def publish(channel, payload):
+    """
+    Sends a notification on a Postgres channel as part of the current transaction.
+
+    Postgres only delivers the notification once the transaction commits, so listeners
+    never hear about writes which were rolled back.
+    """
+    db.session.execute(text('SELECT pg_notify(:channel, :payload)'), {
+        "channel": channel,
+        "payload": json.dumps(payload, default=str)
+    })
+
+
+class NotificationListener(object):
+    """
+    Holds a single LISTEN connection per process and fans the notifications out to in-process subscribers.
+
+    The connection and its thread are started lazily in whichever process first needs them,
+    so an app preloaded by the gunicorn master gets one listener in each forked worker.
+    """
+
+    def __init__(self, app, poll_interval=1, reconnect_delay=2):
+        self.app = app
+        self.poll_interval = poll_interval
+        self.reconnect_delay = reconnect_delay
+        self.channels = set()
+        self._subscribers = defaultdict(list)
+        self._process_subscribers = defaultdict(list)
+        self._connect_callbacks = []
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def register_channel(self, channel):
+        """Adds a channel to LISTEN on. Channels must be registered before the listener starts"""
+        self.channels.add(channel)
+
+    def subscribe(self, channel, callback, process_wide=False):
+        """
+        Calls callback with the decoded payload of every notification sent on the channel.
+
+        Process wide subscribers are meant to be added while the app is created: they are kept
+        in forked workers and do not start the listener, which is started by the first request instead.
+        """
+        with self._lock:
+            if process_wide:
+                self._process_subscribers[channel].append(callback)
+                return
+
+            self._subscribers[channel].append(callback)
+
+        self.ensure_started()
+
+    def unsubscribe(self, channel, callback):
+        with self._lock:
+            if callback in self._subscribers[channel]:
+                self._subscribers[channel].remove(callback)
+
+    def add_connect_callback(self, callback):
+        """
+        Calls callback every time the listener (re)connects.
+
+        Notifications sent while the listener was disconnected are lost, so subscribers
+        which must not miss any can use this to resynchronise.
+        """
+        self._connect_callbacks.append(callback)
+
+    def ensure_started(self):
+        if self._pid == os.getpid() or not self.app.config.get('PG_NOTIFY_LISTENER_ENABLED', True):
+            return
+
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+
+            # subscribers inherited from the parent process belong to its threads
+            self._subscribers = defaultdict(list, {
+                channel: [] for channel in self._subscribers})
+
+            thread = threading.Thread(
+                target=self._run, name='pg-notify-listener', daemon=True)
+            thread.start()
+
+            self._pid = os.getpid()
+
+    def dispatch(self, channel, payload):
+        with self._lock:
+            callbacks = self._process_subscribers[channel] + \
+                self._subscribers[channel]
+
+        for callback in callbacks:
+            try:
+                callback(payload)
+
+            except Exception:
+                print(sys.exc_info())
+
+    def _connect(self):
+        with self.app.app_context():
+            connection = db.engine.raw_connection()
+
+        # the connection belongs to this thread for good so it is taken out of the pool
+        connection.detach()
+
+        dbapi_connection = connection.connection
+        dbapi_connection.autocommit = True
+
+        cursor = dbapi_connection.cursor()
+
+        for channel in self.channels:
+            cursor.execute(f'LISTEN "{channel}"')
+
+        for callback in self._connect_callbacks:
+            try:
+                callback()
+
+            except Exception:
+                print(sys.exc_info())
+
+        return dbapi_connection
+
+    def _run(self):
+        while True:
+            dbapi_connection = None
+
+            try:
+                dbapi_connection = self._connect()
+
+                while True:
+                    readable, _, _ = select.select(
+                        [dbapi_connection], [], [], self.poll_interval)
+
+                    if not readable:
+                        continue
+
+                    dbapi_connection.poll()
+
+                    while dbapi_connection.notifies:
+                        notification = dbapi_connection.notifies.pop(0)
+
+                        self.dispatch(notification.channel,
+                                      json.loads(notification.payload))
+
+            except Exception:
+                print(sys.exc_info())
+
+                if dbapi_connection is not None:
+                    dbapi_connection.close()
+
+                time.sleep(self.reconnect_delay)
+
+
+def init_notifications(app):
+    """Attaches the process wide notification listener to the app"""
+    app.extensions['notification_listener'] = NotificationListener(app)
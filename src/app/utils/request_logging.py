@@ -0,0 +1,171 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from flask import request, _request_ctx_stack
+from flask.logging import default_handler
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# attributes of a log record which are not passed through the extra argument
+RESERVED_RECORD_ATTRIBUTES = set(vars(logging.LogRecord(
+    '', logging.INFO, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Formats log records as one JSON object per line.
+
+    Anything passed to the logger through extra e.g. the route or latency of a request
+    is added to the JSON object as a top level key.
+    """
+
+    def format(self, record):
+        log_entry = {
+            "timestamp": datetime.utcfromtimestamp(record.created).isoformat() + 'Z',
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+
+        for key, value in vars(record).items():
+            if key not in RESERVED_RECORD_ATTRIBUTES:
+                log_entry[key] = value
+
+        if record.exc_text:
+            log_entry["exception"] = record.exc_text
+
+        return json.dumps(log_entry, default=str)
+
+
+def count_queries(conn, cursor, statement, parameters, context, executemany):
+    """Counts the SQL statements executed while handling the current request"""
+    request_context = _request_ctx_stack.top
+
+    if request_context is not None:
+        request_context.query_count = getattr(
+            request_context, 'query_count', 0) + 1
+
+
+def start_request_timer():
+    # kept on the request context rather than g which is shared by batched sub-requests
+    _request_ctx_stack.top.request_started_at = time.perf_counter()
+    _request_ctx_stack.top.query_count = 0
+
+
+def log_request(response):
+    """Emits one structured access log record per request"""
+    request_started_at = getattr(
+        _request_ctx_stack.top, 'request_started_at', None)
+
+    latency_ms = None
+
+    if request_started_at is not None:
+        latency_ms = round(
+            (time.perf_counter() - request_started_at) * 1000, 2)
+
+    # set by the auth helpers once the access token has been decoded
+    current_user = getattr(_request_ctx_stack.top, 'current_user', None) or {}
+
+    logging.getLogger('student_hub.access').info('request', extra={
+        "method": request.method,
+        "route": request.url_rule.rule if request.url_rule else request.path,
+        "status": response.status_code,
+        "latency_ms": latency_ms,
+        "user_id": current_user.get('sub'),
+        "query_count": getattr(_request_ctx_stack.top, 'query_count', 0)
+    })
+
+    return response
+
+
+def stop_log_listener(listener):
+    """Flushes the queued records when the process exits"""
+    listener.stop()
+
+
+class ProcessLocalQueueHandler(QueueHandler):
+    """
+    Queue handler which starts its listener thread in whichever process first logs through it.
+
+    Threads do not survive a fork, so when gunicorn preloads the app the listener started by
+    the master would never run in the workers. Each process gets its own queue and listener instead.
+    """
+
+    def __init__(self, handlers):
+        super().__init__(queue.Queue(-1))
+        self.handlers = handlers
+        self.listener = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def start_listener(self):
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+
+            self.queue = queue.Queue(-1)
+            self.listener = QueueListener(
+                self.queue, *self.handlers, respect_handler_level=True)
+            self.listener.start()
+            self._pid = os.getpid()
+
+            atexit.register(stop_log_listener, self.listener)
+
+    def enqueue(self, record):
+        if self._pid != os.getpid():
+            self.start_listener()
+
+        super().enqueue(record)
+
+
+def init_logging(app):
+    """
+    Sends the app's logs through a queue to a background listener thread.
+
+    Request handlers only put records on an in-memory queue. Formatting and writing
+    to stdout (and optionally a rotating log file) happens on the listener thread so
+    logging never blocks a request on I/O.
+    """
+    log_level = app.config.get('LOG_LEVEL', 'INFO')
+
+    json_formatter = JSONFormatter()
+
+    handlers = []
+
+    if app.config.get('LOG_TO_STDOUT', True):
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(json_formatter)
+        handlers.append(stream_handler)
+
+    log_file = app.config.get('LOG_FILE')
+
+    if log_file:
+        file_handler = RotatingFileHandler(
+            log_file,
+            maxBytes=app.config.get('LOG_FILE_MAX_BYTES', 10 * 1024 * 1024),
+            backupCount=app.config.get('LOG_FILE_BACKUP_COUNT', 5),
+            delay=True)
+        file_handler.setFormatter(json_formatter)
+        handlers.append(file_handler)
+
+    queue_handler = ProcessLocalQueueHandler(handlers)
+
+    for logger in [app.logger, logging.getLogger('student_hub')]:
+        logger.removeHandler(default_handler)
+        logger.addHandler(queue_handler)
+        logger.setLevel(log_level)
+
+    app.extensions['log_queue_handler'] = queue_handler
+
+    if not event.contains(Engine, 'before_cursor_execute', count_queries):
+        event.listen(Engine, 'before_cursor_execute', count_queries)
+
+    app.before_request(start_request_timer)
+    app.after_request(log_request)
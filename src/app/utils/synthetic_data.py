@@ -0,0 +1,343 @@
+"""
+Generates realistic synthetic datasets to test how the schema and the queries scale.
+
+The same seed always produces the same rows. Ids are assigned in memory after the highest
+existing ids so that foreign keys never have to be read back, and every table is streamed
+to Postgres with COPY, which loads millions of rows in minutes.
+"""
+import math
+import random
+import tempfile
+from array import array
+from bisect import bisect
+from datetime import datetime, timedelta
+from itertools import accumulate, islice
+from sqlalchemy import text
+from src.app import db
+
+# popularity of the nth nanodegree is proportional to 1 / n ** NANODEGREE_POPULARITY_SKEW
+NANODEGREE_POPULARITY_SKEW = 1.1
+
+# the higher, the more the questions are concentrated on a small share of very active students
+STUDENT_ACTIVITY_SKEW = 3
+
+# share of the questions with a github link, deleted and with an accepted answer
+GITHUB_LINK_RATE = 0.3
+DELETED_QUESTION_RATE = 0.02
+ACCEPTED_ANSWER_RATE = 0.5
+
+# text lengths follow log-normal distributions, (median, sigma, min, max) in characters
+QUESTION_TITLE_LENGTH = (60, 0.4, 15, 150)
+QUESTION_DETAILS_LENGTH = (400, 0.8, 20, 8000)
+ANSWER_DETAILS_LENGTH = (600, 0.9, 20, 10000)
+
+# answers are posted this many minutes after their question on average
+MEAN_ANSWER_DELAY_MINUTES = 360
+
+# number of words of the corpus the texts are taken from
+CORPUS_SIZE = 200000
+
+# relative activity of each hour of the day (UTC), students mostly post in the evening
+HOURLY_ACTIVITY = [2, 1, 1, 1, 1, 2, 3, 4, 5, 6, 6, 6,
+                   6, 6, 6, 6, 7, 8, 9, 10, 10, 9, 6, 4]
+
+WORDS = ("flask route query model database migration test error stack trace project review rubric "
+         "endpoint request response token auth permission deploy heroku docker postgres index "
+         "python javascript react component state props hook css layout grid udacity mentor "
+         "submission feedback deadline help please why does how can I fix this when after before "
+         "the a an is are was it my our with without from into on in of for to and or not").split()
+
+# the columns of each table in the order of the generated rows
+COLUMNS = {
+    'nanodegree': ['id', 'date_created', 'title', 'description'],
+    'project': ['id', 'date_created', 'title', 'nanodegree_id'],
+    'user': ['id', 'date_created', 'jwt_subject'],
+    'nanodegree_enrollment': ['user_id', 'nanodegree_id'],
+    'question': ['id', 'date_created', 'title', 'details', 'posted_by', 'nanodegree_id', 'project_id',
+                 'github_link', 'is_deleted', 'has_accepted_answer', 'version'],
+    'answer': ['id', 'date_created', 'posted_by', 'details', 'question_id', 'accepted', 'version']
+}
+
+# tables with an id sequence which must be moved past the generated ids
+SEQUENCE_TABLES = ['nanodegree', 'project', 'user', 'question', 'answer']
+
+
+def format_row(row):
+    """
+    Renders a row in the text format of COPY, with None as NULL.
+
+    Values are not escaped: the generated values never contain tabs, newlines or backslashes,
+    and the csv module is several times slower for long texts.
+    """
+    return '\t'.join('\\N' if value is None else str(value) for value in row) + '\n'
+
+
+class RowStream(object):
+    """
+    Read only file like object which renders rows for COPY on demand.
+
+    It is passed to COPY ... FROM STDIN so that the rows are generated while they are
+    loaded instead of being built in memory or written to a file first.
+    """
+
+    ROWS_PER_CHUNK = 1000
+
+    def __init__(self, rows):
+        self.rows = iter(rows)
+        self.pending = ''
+        self.position = 0
+
+    def read_chunk(self):
+        return ''.join(format_row(row) for row in islice(self.rows, self.ROWS_PER_CHUNK))
+
+    def read(self, size=-1):
+        """Returns up to size characters, or everything left if size is negative, and an empty string once all the rows are read"""
+        if size < 0:
+            data = self.pending[self.position:] + ''.join(iter(self.read_chunk, ''))
+            self.pending, self.position = '', 0
+
+            return data
+
+        # reads are served from the current chunk without copying what is left of it
+        if self.position >= len(self.pending):
+            self.pending, self.position = self.read_chunk(), 0
+
+        data = self.pending[self.position:self.position + size]
+        self.position += len(data)
+
+        return data
+
+
+class SyntheticDataset(object):
+    """
+    Generates the rows of a dataset, table by table.
+
+    Students enroll in one or more nanodegrees with a Zipf like popularity, questions are asked by
+    enrolled students, with a few very active ones, in the projects of their nanodegrees, and
+    questions get a geometric number of answers. Activity grows over the generated period and
+    follows the hours of the day.
+    """
+
+    def __init__(self, seed=0, nanodegrees=20, projects_per_nanodegree=8, users=10000,
+                 enrollments_per_user=1.5, questions=100000, answers_per_question=1.5,
+                 days=365, end=None, first_ids=None):
+        self.random = random.Random(seed)
+
+        self.number_of_nanodegrees = nanodegrees
+        self.projects_per_nanodegree = projects_per_nanodegree
+        self.number_of_users = users
+        self.enrollments_per_user = enrollments_per_user
+        self.number_of_questions = questions
+        self.answers_per_question = answers_per_question
+
+        self.end = end or datetime.utcnow().replace(microsecond=0)
+        self.start = self.end - timedelta(days=days)
+        self.days = days
+
+        # the ids given to the first generated row of each table
+        self.first_ids = dict.fromkeys(SEQUENCE_TABLES, 1)
+        self.first_ids.update(first_ids or {})
+
+        self.counts = dict.fromkeys(COLUMNS, 0)
+
+        self.nanodegree_popularity = list(accumulate(
+            1 / rank ** NANODEGREE_POPULARITY_SKEW for rank in range(1, nanodegrees + 1)))
+
+        self.hourly_activity = list(accumulate(HOURLY_ACTIVITY))
+
+        # drawing every word of every text is too slow for millions of rows
+        self.corpus = ' '.join(self.random.choices(WORDS, k=CORPUS_SIZE))
+
+        # (user_id, nanodegree_id) of every generated enrollment, kept compact for large datasets
+        self.enrolled_user_ids = array('l')
+        self.enrolled_nanodegree_ids = array('l')
+
+    def get_text(self, length, question=False):
+        median, sigma, min_length, max_length = length
+        length = int(self.random.lognormvariate(math.log(median), sigma))
+        length = min(max(length, min_length), max_length)
+
+        # texts are cut out of the corpus at a random word boundary
+        start = self.corpus.index(' ', self.random.randrange(
+            len(self.corpus) - 2 * max_length)) + 1
+
+        sentence = self.corpus[start:start + length - 1].rstrip()
+
+        return sentence[:1].upper() + sentence[1:] + ('?' if question else '.')
+
+    def get_timestamp(self):
+        """Returns a timestamp in the generated period, activity grows linearly over the period"""
+        day = int(self.days * math.sqrt(self.random.random()))
+        hour = bisect(self.hourly_activity,
+                      self.random.random() * self.hourly_activity[-1])
+
+        timestamp = self.start + timedelta(days=day, hours=hour,
+                                           seconds=self.random.randrange(3600))
+
+        return min(timestamp, self.end)
+
+    def count(self, table, rows):
+        for row in rows:
+            self.counts[table] += 1
+            yield row
+
+    def nanodegree_rows(self):
+        first_id = self.first_ids['nanodegree']
+
+        for nanodegree_id in range(first_id, first_id + self.number_of_nanodegrees):
+            yield (nanodegree_id, self.start, f'Synthetic Nanodegree {nanodegree_id}',
+                   self.get_text(QUESTION_DETAILS_LENGTH)[:2000])
+
+    def project_rows(self):
+        project_id = self.first_ids['project']
+
+        for nanodegree_index in range(self.number_of_nanodegrees):
+            for project_number in range(1, self.projects_per_nanodegree + 1):
+                yield (project_id, self.start, f'Project {project_number}',
+                       self.first_ids['nanodegree'] + nanodegree_index)
+
+                project_id += 1
+
+    def user_rows(self):
+        first_id = self.first_ids['user']
+
+        for user_id in range(first_id, first_id + self.number_of_users):
+            yield (user_id, self.start - timedelta(days=self.random.randrange(self.days + 1)),
+                   f'synthetic|{user_id}')
+
+    def enrollment_rows(self):
+        # 1 + a geometric number of extra enrollments, with the requested mean
+        extra_enrollment_rate = 1 / max(self.enrollments_per_user, 1)
+
+        for user_id in range(self.first_ids['user'], self.first_ids['user'] + self.number_of_users):
+            number_of_enrollments = 1
+
+            while number_of_enrollments < self.number_of_nanodegrees and \
+                    self.random.random() > extra_enrollment_rate:
+                number_of_enrollments += 1
+
+            nanodegree_indexes = set()
+
+            while len(nanodegree_indexes) < number_of_enrollments:
+                nanodegree_indexes.add(bisect(self.nanodegree_popularity,
+                                              self.random.random() * self.nanodegree_popularity[-1]))
+
+            for nanodegree_index in sorted(nanodegree_indexes):
+                nanodegree_id = self.first_ids['nanodegree'] + nanodegree_index
+
+                self.enrolled_user_ids.append(user_id)
+                self.enrolled_nanodegree_ids.append(nanodegree_id)
+
+                yield (user_id, nanodegree_id)
+
+    def question_rows(self, answer_rows):
+        """Yields the question rows and writes the rows of their answers to the given file"""
+        number_of_enrollments = len(self.enrolled_user_ids)
+        answer_id = self.first_ids['answer']
+
+        # geometric number of answers per question, with the requested mean
+        no_more_answer_rate = 1 / (1 + self.answers_per_question)
+
+        for question_id in range(self.first_ids['question'], self.first_ids['question'] + self.number_of_questions):
+            # enrollments are ordered by user so this favours a small group of very active students
+            enrollment = int(number_of_enrollments *
+                             self.random.random() ** STUDENT_ACTIVITY_SKEW)
+
+            nanodegree_id = self.enrolled_nanodegree_ids[enrollment]
+            nanodegree_index = nanodegree_id - self.first_ids['nanodegree']
+
+            project_id = self.first_ids['project'] + nanodegree_index * self.projects_per_nanodegree + \
+                self.random.randrange(self.projects_per_nanodegree)
+
+            date_created = self.get_timestamp()
+
+            github_link = f'https://github.com/synthetic/project-{project_id}' \
+                if self.random.random() < GITHUB_LINK_RATE else None
+
+            number_of_answers = 0
+
+            while self.random.random() > no_more_answer_rate:
+                number_of_answers += 1
+
+            accepted_answer = self.random.randrange(number_of_answers) \
+                if number_of_answers and self.random.random() < ACCEPTED_ANSWER_RATE else None
+
+            answered_at = date_created
+
+            for answer_number in range(number_of_answers):
+                answered_at = min(answered_at + timedelta(minutes=self.random.expovariate(
+                    1 / MEAN_ANSWER_DELAY_MINUTES)), self.end).replace(microsecond=0)
+
+                answer_rows.write(format_row((answer_id, answered_at,
+                                      self.first_ids['user'] +
+                                      self.random.randrange(self.number_of_users),
+                                      self.get_text(ANSWER_DETAILS_LENGTH), question_id,
+                                      't' if answer_number == accepted_answer else 'f', 1)))
+
+                self.counts['answer'] += 1
+                answer_id += 1
+
+            yield (question_id, date_created, self.get_text(QUESTION_TITLE_LENGTH, question=True),
+                   self.get_text(QUESTION_DETAILS_LENGTH), self.enrolled_user_ids[enrollment],
+                   nanodegree_id, project_id, github_link,
+                   't' if self.random.random() < DELETED_QUESTION_RATE else 'f',
+                   'f' if accepted_answer is None else 't', 1)
+
+    def tables(self):
+        """
+        Yields a (table, file like object of rows in the COPY text format) tuple for each table, in the order they must be loaded.
+
+        Each table must be read entirely before the next one is requested since the rows of
+        a table depend on the rows generated for the previous ones.
+        """
+        yield 'nanodegree', RowStream(self.count('nanodegree', self.nanodegree_rows()))
+        yield 'project', RowStream(self.count('project', self.project_rows()))
+        yield 'user', RowStream(self.count('user', self.user_rows()))
+        yield 'nanodegree_enrollment', RowStream(self.count('nanodegree_enrollment', self.enrollment_rows()))
+
+        # the answers are generated along with their question and spooled to a file until the questions are loaded
+        with tempfile.TemporaryFile(mode='w+') as answer_rows:
+            yield 'question', RowStream(self.count('question', self.question_rows(answer_rows)))
+
+            answer_rows.seek(0)
+
+            yield 'answer', answer_rows
+
+
+def get_first_ids():
+    """Returns the id following the highest existing id of each table"""
+    return {table: db.session.execute(text(f'SELECT coalesce(max(id), 0) + 1 FROM "{table}"')).scalar()
+            for table in SEQUENCE_TABLES}
+
+
+def load_dataset(dataset):
+    """
+    Loads a dataset with one COPY per table and commits.
+
+    The id sequences are moved past the generated ids and the tables are analyzed
+    so that the planner sees the new distribution straight away.
+    Returns the number of rows loaded into each table.
+    """
+    cursor = db.session.connection().connection.cursor()
+
+    try:
+        for table, rows in dataset.tables():
+            cursor.copy_expert(
+                f'COPY "{table}" ({", ".join(COLUMNS[table])}) FROM STDIN', rows)
+
+    finally:
+        cursor.close()
+
+    for table in SEQUENCE_TABLES:
+        db.session.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('\"{table}\"', 'id'), max(id)) FROM \"{table}\" HAVING max(id) IS NOT NULL"))
+
+    db.session.commit()
+
+    # ANALYZE can't see the rows of the transaction which loaded them
+    for table in COLUMNS:
+        db.session.execute(text(f'ANALYZE "{table}"'))
+
+    db.session.commit()
+
+    return dataset.counts
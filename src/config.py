@@ -1,3 +1,4 @@
+import multiprocessing
 import os
 from os.path import dirname, abspath
 
@@ -5,9 +6,20 @@ from dotenv import load_dotenv
 
 basedir = dirname((abspath(__file__)))
 
+# The .env file is loaded once, here, and every setting is read from the config classes below
 load_dotenv(os.path.join(basedir, '.env'))
 
 
+def get_database_pool_size(max_connections, workers, threads):
+    """
+    Returns the size of the database pool of each worker so that all the workers together open at
+    most max_connections, counting the LISTEN connection of each worker. A worker never needs more
+    connections than it has threads and always gets at least one, gunicorn.conf.py refuses to start
+    more workers than the budget allows.
+    """
+    return max(1, min(threads, max_connections // workers - 1))
+
+
 class DevelopmentConfig(object):
     """
     Flask configuration for development
@@ -31,17 +43,180 @@ class DevelopmentConfig(object):
 
     DEBUG = True
 
+    APP_NAME = os.environ.get('APP_NAME', 'student-hub')
+
     STUDENTS_PER_PAGE = os.environ.get(
         'STUDENTS_PER_PAGE')
 
     QUESTIONS_PER_PAGE = os.environ.get(
         'QUESTIONS_PER_PAGE')
 
-    # Application threads. A common general assumption is
-    # using 2 per available processor cores - to handle
-    # incoming requests using one and performing background
-    # operations using the other.
-    THREADS_PER_PAGE = 2
+    # larger questions_per_page values are rejected with a 400
+    MAX_QUESTIONS_PER_PAGE = 100
+
+    # Maximum number of ids accepted by the multi-get endpoints e.g. /questions?ids=1,2,3
+    MAX_IDS_PER_REQUEST = 100
+
+    # Maximum number of sub-requests accepted by the batch endpoint
+    MAX_BATCH_REQUESTS = 20
+
+    # In-memory caches of hot reads, kept in sync across workers by the cache invalidation bus.
+    # Expired values are served for up to CACHE_STALE_GRACE seconds while one request recomputes
+    # them, and hot values are recomputed CACHE_REFRESH_AHEAD seconds before they expire
+    NANODEGREES_CACHE_TTL = 300
+
+    QUESTIONS_CACHE_TTL = 30
+
+    CACHE_STALE_GRACE = 30
+
+    CACHE_REFRESH_AHEAD = 5
+
+    # seconds a request waits for another one computing the same value before computing it itself
+    CACHE_WAIT_TIMEOUT = 10
+
+    # entries kept per cache namespace and worker process, the least recently used ones are evicted beyond it
+    CACHE_MAX_ENTRIES = 1000
+
+    # the statistics only change when `flask stats refresh` runs, which invalidates them
+    STATS_CACHE_TTL = 600
+
+    # dashboards are invalidated by the user's own writes, the ttl bounds how long
+    # new questions of other students take to show up in them
+    DASHBOARD_CACHE_TTL = 60
+
+    # number of questions, answers and unanswered questions listed on a dashboard
+    DASHBOARD_ITEMS_LIMIT = 20
+
+    # seconds during which the response to a POST request sent with an Idempotency-Key header is replayed for retries
+    IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+
+    # seconds a request in progress holds its Idempotency-Key, a little above GUNICORN_TIMEOUT so that
+    # the key of a request whose worker was killed can be reclaimed by a retry
+    IDEMPOTENCY_KEY_LOCK_TIMEOUT = 60
+
+    # Comments are paginated with a cursor, the limit query parameter can ask for up to MAX_COMMENTS_PER_PAGE
+    COMMENTS_PER_PAGE = 20
+
+    MAX_COMMENTS_PER_PAGE = 100
+
+    # Background jobs run by `flask worker`. Failed jobs are retried after JOB_RETRY_BASE_DELAY
+    # seconds, doubling up to JOB_RETRY_MAX_DELAY, and moved to dead_job after JOB_MAX_ATTEMPTS
+    JOB_MAX_ATTEMPTS = 5
+
+    JOB_RETRY_BASE_DELAY = 10
+
+    JOB_RETRY_MAX_DELAY = 3600
+
+    JOB_POLL_INTERVAL = 1
+
+    # a claimed job which is not run within this many seconds, e.g. because its worker died, is run again
+    JOB_CLAIM_TIMEOUT = 300
+
+    # writes enqueue a statistics refresh which runs this many seconds later, so
+    # that all the writes made in the meantime share a single refresh
+    STATS_REFRESH_DELAY = 60
+
+    # Migrations give up on a lock after MIGRATION_LOCK_TIMEOUT rather than queue the API's
+    # queries behind them, see src/app/utils/online_migrations.py
+    MIGRATION_LOCK_TIMEOUT = '5s'
+
+    MIGRATION_STATEMENT_TIMEOUT = '1min'
+
+    MIGRATION_BACKFILL_BATCH_SIZE = 10000
+
+    # Live activity feed (server-sent events fed by Postgres LISTEN/NOTIFY)
+    PG_NOTIFY_LISTENER_ENABLED = True
+
+    FEED_HEARTBEAT_INTERVAL = 15
+
+    # streams are closed after this many seconds and clients reconnect with Last-Event-ID
+    FEED_MAX_DURATION = 300
+
+    FEED_RETRY_MS = 3000
+
+    # maximum number of missed events sent to a reconnecting client
+    FEED_MAX_REPLAY = 500
+
+    # seconds after which a client turned away because of FEED_MAX_STREAMS should try again
+    FEED_STREAMS_RETRY_AFTER = 30
+
+    # Auth0 settings used to verify access tokens
+    AUTH0_TENANT_DOMAIN = os.environ.get('AUTH0_TENANT_DOMAIN')
+
+    AUTH0_API_AUDIENCE = os.environ.get('AUTH0_API_AUDIENCE')
+
+    AUTH0_ALGORITHMS = os.environ.get('AUTH0_ALGORITHMS', 'RS256').split(',')
+
+    AUTH0_ISSUER = f'https://{AUTH0_TENANT_DOMAIN}/'
+
+    # The JSON Web Key Set is fetched from AUTH0_JWKS_URL unless AUTH0_JWKS is set
+    AUTH0_JWKS_URL = f'https://{AUTH0_TENANT_DOMAIN}/.well-known/jwks.json'
+
+    AUTH0_JWKS = None
+
+    AUTH0_JWKS_CACHE_TTL = 3600
+
+    # seconds to wait for the identity provider when fetching the key set
+    AUTH0_JWKS_TIMEOUT = 5
+
+    # Logging (only enabled when not in debug or testing mode). Records are
+    # written as JSON lines to stdout and, if LOG_FILE is set, to a rotating file
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+
+    LOG_TO_STDOUT = True
+
+    LOG_FILE = os.environ.get('LOG_FILE')
+
+    LOG_FILE_MAX_BYTES = 10 * 1024 * 1024
+
+    LOG_FILE_BACKUP_COUNT = 5
+
+    # Responses larger than COMPRESSION_MIN_SIZE bytes are gzip or brotli encoded
+    # (brotli only if the module is installed) when the client accepts it
+    COMPRESSION_MIN_SIZE = 1024
+
+    COMPRESSION_GZIP_LEVEL = 6
+
+    COMPRESSION_BROTLI_QUALITY = 5
+
+    COMPRESSION_MIMETYPES = ['application/json', 'text/html']
+
+    # number of compressed bodies kept in memory per worker for hot pages
+    COMPRESSION_CACHE_SIZE = 256
+
+    # Gunicorn settings, read by gunicorn.conf.py. Handlers mostly wait on Postgres and
+    # Auth0 so each worker process serves requests from a pool of threads
+    GUNICORN_WORKER_CLASS = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+
+    GUNICORN_WORKERS = int(os.environ.get(
+        'WEB_CONCURRENCY', multiprocessing.cpu_count() + 1))
+
+    GUNICORN_THREADS = int(os.environ.get(
+        'GUNICORN_THREADS', 2 * multiprocessing.cpu_count()))
+
+    GUNICORN_KEEPALIVE = 5
+
+    GUNICORN_TIMEOUT = 30
+
+    GUNICORN_GRACEFUL_TIMEOUT = 30
+
+    # workers are recycled after a random number of requests in this range to
+    # contain memory growth without restarting them all at once
+    GUNICORN_MAX_REQUESTS = 1000
+
+    GUNICORN_MAX_REQUESTS_JITTER = 100
+
+    GUNICORN_PRELOAD_APP = True
+
+    # each open stream holds a worker thread, so a worker serves at most this many streams at once
+    # (half of its threads by default, always leaving one free) and answers 503 beyond it
+    FEED_MAX_STREAMS = max(1, min(int(os.environ.get(
+        'FEED_MAX_STREAMS', GUNICORN_THREADS // 2)), GUNICORN_THREADS - 1))
+
+    # Postgres connections the web workers of a dyno may open in total. The connection limit of the
+    # database plan minus what the job worker, the other dynos and one-off commands need
+    DATABASE_MAX_CONNECTIONS = int(
+        os.environ.get('DATABASE_MAX_CONNECTIONS', 20))
 
 
 class TestConfig(object):
@@ -65,11 +240,149 @@ class TestConfig(object):
 
     DEBUG = True
 
+    APP_NAME = os.environ.get('APP_NAME', 'student-hub')
+
     STUDENTS_PER_PAGE = os.environ.get(
         'STUDENTS_PER_PAGE')
 
     QUESTIONS_PER_PAGE = os.environ.get(
         'QUESTIONS_PER_PAGE')
 
+    # larger questions_per_page values are rejected with a 400
+    MAX_QUESTIONS_PER_PAGE = 100
+
+    # Maximum number of ids accepted by the multi-get endpoints e.g. /questions?ids=1,2,3
+    MAX_IDS_PER_REQUEST = 100
+
+    # Maximum number of sub-requests accepted by the batch endpoint
+    MAX_BATCH_REQUESTS = 20
+
+    # In-memory caches of hot reads, kept in sync across workers by the cache invalidation bus.
+    # Expired values are served for up to CACHE_STALE_GRACE seconds while one request recomputes
+    # them, and hot values are recomputed CACHE_REFRESH_AHEAD seconds before they expire
+    NANODEGREES_CACHE_TTL = 300
+
+    QUESTIONS_CACHE_TTL = 30
+
+    CACHE_STALE_GRACE = 30
+
+    CACHE_REFRESH_AHEAD = 5
+
+    # seconds a request waits for another one computing the same value before computing it itself
+    CACHE_WAIT_TIMEOUT = 10
+
+    # entries kept per cache namespace and worker process, the least recently used ones are evicted beyond it
+    CACHE_MAX_ENTRIES = 1000
+
+    # the statistics only change when `flask stats refresh` runs, which invalidates them
+    STATS_CACHE_TTL = 600
+
+    # dashboards are invalidated by the user's own writes, the ttl bounds how long
+    # new questions of other students take to show up in them
+    DASHBOARD_CACHE_TTL = 60
+
+    # number of questions, answers and unanswered questions listed on a dashboard
+    DASHBOARD_ITEMS_LIMIT = 20
+
+    # seconds during which the response to a POST request sent with an Idempotency-Key header is replayed for retries
+    IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+
+    # seconds a request in progress holds its Idempotency-Key, a little above GUNICORN_TIMEOUT so that
+    # the key of a request whose worker was killed can be reclaimed by a retry
+    IDEMPOTENCY_KEY_LOCK_TIMEOUT = 60
+
+    # Comments are paginated with a cursor, the limit query parameter can ask for up to MAX_COMMENTS_PER_PAGE
+    COMMENTS_PER_PAGE = 20
+
+    MAX_COMMENTS_PER_PAGE = 100
+
+    # Background jobs run by `flask worker`. Failed jobs are retried after JOB_RETRY_BASE_DELAY
+    # seconds, doubling up to JOB_RETRY_MAX_DELAY, and moved to dead_job after JOB_MAX_ATTEMPTS
+    JOB_MAX_ATTEMPTS = 5
+
+    JOB_RETRY_BASE_DELAY = 10
+
+    JOB_RETRY_MAX_DELAY = 3600
+
+    JOB_POLL_INTERVAL = 1
+
+    # a claimed job which is not run within this many seconds, e.g. because its worker died, is run again
+    JOB_CLAIM_TIMEOUT = 300
+
+    # writes enqueue a statistics refresh which runs this many seconds later, so
+    # that all the writes made in the meantime share a single refresh
+    STATS_REFRESH_DELAY = 60
+
+    # Migrations give up on a lock after MIGRATION_LOCK_TIMEOUT rather than queue the API's
+    # queries behind them, see src/app/utils/online_migrations.py
+    MIGRATION_LOCK_TIMEOUT = '5s'
+
+    MIGRATION_STATEMENT_TIMEOUT = '1min'
+
+    MIGRATION_BACKFILL_BATCH_SIZE = 10000
+
+    # Live activity feed (server-sent events fed by Postgres LISTEN/NOTIFY)
+    PG_NOTIFY_LISTENER_ENABLED = True
+
+    FEED_HEARTBEAT_INTERVAL = 15
+
+    # streams are closed after this many seconds and clients reconnect with Last-Event-ID
+    FEED_MAX_DURATION = 300
+
+    FEED_RETRY_MS = 3000
+
+    # maximum number of missed events sent to a reconnecting client
+    FEED_MAX_REPLAY = 500
+
+    FEED_MAX_STREAMS = 2
+
+    FEED_STREAMS_RETRY_AFTER = 30
+
+    # Auth0 settings used to verify access tokens
+    AUTH0_TENANT_DOMAIN = os.environ.get('AUTH0_TENANT_DOMAIN')
+
+    AUTH0_API_AUDIENCE = os.environ.get('AUTH0_API_AUDIENCE')
+
+    AUTH0_ALGORITHMS = os.environ.get('AUTH0_ALGORITHMS', 'RS256').split(',')
+
+    AUTH0_ISSUER = f'https://{AUTH0_TENANT_DOMAIN}/'
+
+    # The JSON Web Key Set is fetched from AUTH0_JWKS_URL unless AUTH0_JWKS is set
+    AUTH0_JWKS_URL = f'https://{AUTH0_TENANT_DOMAIN}/.well-known/jwks.json'
+
+    AUTH0_JWKS = None
+
+    AUTH0_JWKS_CACHE_TTL = 3600
+
+    # seconds to wait for the identity provider when fetching the key set
+    AUTH0_JWKS_TIMEOUT = 5
+
+
+class ProductionConfig(DevelopmentConfig):
+    """
+    Flask configuration for production
+    """
+    SQLALCHEMY_DATABASE_URI = os.environ.get(
+        'DATABASE_URL', DevelopmentConfig.SQLALCHEMY_DATABASE_URI)
+
+    # the workers share DATABASE_MAX_CONNECTIONS, a thread waits for a connection if its worker has none left
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": get_database_pool_size(DevelopmentConfig.DATABASE_MAX_CONNECTIONS,
+                                            DevelopmentConfig.GUNICORN_WORKERS, DevelopmentConfig.GUNICORN_THREADS),
+        "max_overflow": 0,
+        "pool_pre_ping": True
+    }
+
+    DEBUG = False
+
+
+config_by_name = {
+    'development': DevelopmentConfig,
+    'test': TestConfig,
+    'production': ProductionConfig
+}
+
 
-# Remember to setup a deployment config class
+def get_config_class():
+    """Returns the config class named by the APP_CONFIG environment variable"""
+    return config_by_name[os.environ.get('APP_CONFIG', 'development')]
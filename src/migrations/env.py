@@ -22,6 +22,7 @@ logger = logging.getLogger('alembic.env')
 # from myapp import mymodel
 # target_metadata = mymodel.Base.metadata
 from flask import current_app
+from src.app.utils.online_migrations import set_timeouts
 config.set_main_option(
     'sqlalchemy.url',
     str(current_app.extensions['migrate'].db.engine.url).replace('%', '%%'))
@@ -47,9 +48,13 @@ def run_migrations_offline():
     """
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url, target_metadata=target_metadata, literal_binds=True
+        url=url, target_metadata=target_metadata, literal_binds=True,
+        transaction_per_migration=True
     )
 
+    set_timeouts(current_app.config['MIGRATION_LOCK_TIMEOUT'],
+                 current_app.config['MIGRATION_STATEMENT_TIMEOUT'])
+
     with context.begin_transaction():
         context.run_migrations()
 
@@ -83,9 +88,16 @@ def run_migrations_online():
             connection=connection,
             target_metadata=target_metadata,
             process_revision_directives=process_revision_directives,
+            # each revision commits on its own so that its locks are not held until the last one is done
+            transaction_per_migration=True,
             **current_app.extensions['migrate'].configure_args
         )
 
+        # the timeouts are set for the whole session since create_index_concurrently and
+        # backfill_in_batches commit the migration's transaction
+        set_timeouts(current_app.config['MIGRATION_LOCK_TIMEOUT'],
+                     current_app.config['MIGRATION_STATEMENT_TIMEOUT'])
+
         with context.begin_transaction():
             context.run_migrations()
 
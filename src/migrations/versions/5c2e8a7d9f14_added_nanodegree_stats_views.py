@@ -0,0 +1,61 @@
+"""Added the project_stats and nanodegree_stats materialized views
+
+Revision ID: 5c2e8a7d9f14
+Revises: 1e6a9c3f5b28
+Create Date: 2026-10-19 13:02:17.208411
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c2e8a7d9f14'
+down_revision = '1e6a9c3f5b28'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("""
+    CREATE MATERIALIZED VIEW project_stats AS
+    SELECT project.id AS project_id,
+           project.nanodegree_id,
+           project.title,
+           count(question.id) AS number_of_questions,
+           count(question.id) FILTER (WHERE answered.question_id IS NULL) AS number_of_unanswered_questions,
+           count(question.id) FILTER (WHERE question.has_accepted_answer) AS number_of_questions_with_accepted_answer,
+           now() AS refreshed_at
+    FROM project
+    LEFT JOIN question ON question.project_id = project.id AND NOT question.is_deleted
+    LEFT JOIN (SELECT DISTINCT question_id FROM answer) AS answered ON answered.question_id = question.id
+    GROUP BY project.id
+    """)
+
+    op.execute("""
+    CREATE MATERIALIZED VIEW nanodegree_stats AS
+    SELECT nanodegree.id AS nanodegree_id,
+           (SELECT count(*) FROM nanodegree_enrollment
+            WHERE nanodegree_enrollment.nanodegree_id = nanodegree.id) AS number_of_students,
+           (SELECT count(*) FROM project
+            WHERE project.nanodegree_id = nanodegree.id) AS number_of_projects,
+           count(question.id) AS number_of_questions,
+           count(question.id) FILTER (WHERE answered.question_id IS NULL) AS number_of_unanswered_questions,
+           count(question.id) FILTER (WHERE question.has_accepted_answer) AS number_of_questions_with_accepted_answer,
+           now() AS refreshed_at
+    FROM nanodegree
+    LEFT JOIN question ON question.nanodegree_id = nanodegree.id AND NOT question.is_deleted
+    LEFT JOIN (SELECT DISTINCT question_id FROM answer) AS answered ON answered.question_id = question.id
+    GROUP BY nanodegree.id
+    """)
+
+    # REFRESH MATERIALIZED VIEW CONCURRENTLY needs a unique index on each view.
+    # The views were just created by this revision so nothing reads them yet
+    op.create_index('ux_project_stats_project_id', 'project_stats', ['project_id'], unique=True)  # migration-safety: reviewed
+    op.create_index('ix_project_stats_nanodegree_id', 'project_stats', ['nanodegree_id'], unique=False)  # migration-safety: reviewed
+    op.create_index('ux_nanodegree_stats_nanodegree_id', 'nanodegree_stats', ['nanodegree_id'], unique=True)  # migration-safety: reviewed
+
+
+def downgrade():
+    op.execute('DROP MATERIALIZED VIEW nanodegree_stats')
+    op.execute('DROP MATERIALIZED VIEW project_stats')
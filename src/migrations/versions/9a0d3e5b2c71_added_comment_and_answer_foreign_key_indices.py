@@ -0,0 +1,34 @@
+"""Added indices on the foreign keys of the answer and comment tables
+
+Revision ID: 9a0d3e5b2c71
+Revises: 7e4a1f0b6c93
+Create Date: 2026-10-19 14:20:33.918204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from src.app.utils.online_migrations import create_index_concurrently, drop_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision = '9a0d3e5b2c71'
+down_revision = '7e4a1f0b6c93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # built concurrently since the tables are read and written by the api while the migration runs
+    create_index_concurrently(op.f('ix_answer_question_id'), 'answer', ['question_id'])
+    create_index_concurrently(op.f('ix_question_comment_question_id'), 'question_comment', ['question_id'])
+    create_index_concurrently(op.f('ix_question_comment_posted_by'), 'question_comment', ['posted_by'])
+    create_index_concurrently(op.f('ix_answer_comment_answer_id'), 'answer_comment', ['answer_id'])
+    create_index_concurrently(op.f('ix_answer_comment_posted_by'), 'answer_comment', ['posted_by'])
+
+
+def downgrade():
+    drop_index_concurrently(op.f('ix_answer_comment_posted_by'), 'answer_comment')
+    drop_index_concurrently(op.f('ix_answer_comment_answer_id'), 'answer_comment')
+    drop_index_concurrently(op.f('ix_question_comment_posted_by'), 'question_comment')
+    drop_index_concurrently(op.f('ix_question_comment_question_id'), 'question_comment')
+    drop_index_concurrently(op.f('ix_answer_question_id'), 'answer')
@@ -0,0 +1,30 @@
+"""Added indices on the posted_by columns and on the nanodegree_id of enrollments
+
+Revision ID: d5e9b2a7c4f6
+Revises: c81e5d0f3a27
+Create Date: 2026-10-19 16:42:08.530716
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from src.app.utils.online_migrations import create_index_concurrently, drop_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5e9b2a7c4f6'
+down_revision = 'c81e5d0f3a27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # built concurrently since the tables are read and written by the api while the migration runs
+    create_index_concurrently(op.f('ix_question_posted_by'), 'question', ['posted_by'])
+    create_index_concurrently(op.f('ix_answer_posted_by'), 'answer', ['posted_by'])
+    create_index_concurrently(op.f('ix_nanodegree_enrollment_nanodegree_id'), 'nanodegree_enrollment', ['nanodegree_id'])
+
+
+def downgrade():
+    drop_index_concurrently(op.f('ix_nanodegree_enrollment_nanodegree_id'), 'nanodegree_enrollment')
+    drop_index_concurrently(op.f('ix_answer_posted_by'), 'answer')
+    drop_index_concurrently(op.f('ix_question_posted_by'), 'question')
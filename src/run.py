@@ -1,17 +1,18 @@
-import os
-from .config import DevelopmentConfig
+from .config import get_config_class
 from .app import create_app, db
-from .app.models.user import User
-from .app.models.nanodegree import Nanodegree, nanodegree_enrollments
-from .app.models.project import Project
-from .app.models.question import Question
-from .app.models.answer import Answer
 
-app = create_app(DevelopmentConfig)
+app = create_app(get_config_class())
 
 
 @app.shell_context_processor
 def make_shell_context():
+    # the models are only needed by `flask shell` so they are imported on demand
+    from .app.models.user import User
+    from .app.models.nanodegree import Nanodegree
+    from .app.models.project import Project
+    from .app.models.question import Question
+    from .app.models.answer import Answer
+
     return {
         'db': db,
         'User': User,
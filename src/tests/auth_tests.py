@@ -0,0 +1,144 @@
+import socket
+import threading
+import time
+import unittest
+from src.app.blueprints.api_v1.utils.auth0_helper import JWKSKeyProvider
+from src.tests.token_factory import TEST_JWKS, TEST_KEY_ID
+
+
+class CountingKeyProvider(JWKSKeyProvider):
+    """JWKS key provider which serves the test key set instead of fetching it over the network"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.number_of_fetches = 0
+
+    def _fetch_jwks(self):
+        self.number_of_fetches += 1
+        super()._fetch_jwks()
+
+    def _load_jwks(self):
+        return TEST_JWKS
+
+
+class SlowKeyProvider(CountingKeyProvider):
+    """Key provider whose fetches, after the first one, hang until released or fail if failing is set"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fetch_started = threading.Event()
+        self.release_fetch = threading.Event()
+        self.failing = False
+
+    def _load_jwks(self):
+        if self.number_of_fetches > 1:
+            self.fetch_started.set()
+            self.release_fetch.wait(5)
+
+            if self.failing:
+                raise OSError("The identity provider is unreachable")
+
+        return super()._load_jwks()
+
+    def expire(self):
+        self._fetched_at = time.monotonic() - self.cache_ttl - 1
+
+
+class JWKSKeyProviderTestCases(unittest.TestCase):
+    """
+    Tests to ensure that the cached JWKS key provider is safe to share between worker threads
+    """
+
+    def test_concurrent_lookups_fetch_the_key_set_once(self):
+        """Many threads looking up a key at the same time should trigger a single fetch"""
+
+        key_provider = CountingKeyProvider("https://example.test/jwks.json")
+
+        keys_found = []
+
+        def lookup_key():
+            keys_found.append(key_provider.get_signing_key(TEST_KEY_ID))
+
+        threads = [threading.Thread(target=lookup_key) for _ in range(20)]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(key_provider.number_of_fetches, 1)
+        self.assertEqual(len(keys_found), 20)
+
+        for key in keys_found:
+            self.assertEqual(key["kid"], TEST_KEY_ID)
+
+    def test_unknown_key_id(self):
+        """Looking up a key which is not in the key set should return None"""
+
+        key_provider = CountingKeyProvider("https://example.test/jwks.json")
+
+        self.assertIsNone(key_provider.get_signing_key("unknown-key"))
+
+    def test_lookups_use_the_cached_keys_during_a_refresh(self):
+        """Threads should keep getting the cached keys instead of waiting while another thread refreshes them"""
+
+        key_provider = SlowKeyProvider("https://example.test/jwks.json")
+
+        key_provider.get_signing_key(TEST_KEY_ID)
+        key_provider.expire()
+
+        refresh = threading.Thread(
+            target=key_provider.get_signing_key, args=(TEST_KEY_ID,))
+        refresh.start()
+
+        self.assertTrue(key_provider.fetch_started.wait(5))
+
+        started_at = time.monotonic()
+
+        self.assertEqual(key_provider.get_signing_key(
+            TEST_KEY_ID)["kid"], TEST_KEY_ID)
+        self.assertLess(time.monotonic() - started_at, 1)
+
+        key_provider.release_fetch.set()
+        refresh.join()
+
+        self.assertEqual(key_provider.number_of_fetches, 2)
+
+    def test_failed_refresh_keeps_the_cached_keys(self):
+        """A refresh which fails should keep the cached keys and not be retried before min_refresh_interval"""
+
+        key_provider = SlowKeyProvider("https://example.test/jwks.json")
+        key_provider.failing = True
+        key_provider.release_fetch.set()
+
+        key_provider.get_signing_key(TEST_KEY_ID)
+        key_provider.expire()
+
+        for _ in range(3):
+            self.assertEqual(key_provider.get_signing_key(
+                TEST_KEY_ID)["kid"], TEST_KEY_ID)
+
+        self.assertEqual(key_provider.number_of_fetches, 2)
+
+    def test_fetch_times_out(self):
+        """Fetching the key set from an identity provider which doesn't answer should give up after the timeout"""
+
+        # accepts connections but never answers
+        server = socket.socket()
+        server.bind(("127.0.0.1", 0))
+        server.listen(1)
+
+        key_provider = JWKSKeyProvider(
+            f"http://127.0.0.1:{server.getsockname()[1]}/jwks.json", timeout=0.2)
+
+        started_at = time.monotonic()
+
+        try:
+            with self.assertRaises(OSError):
+                key_provider.get_signing_key(TEST_KEY_ID)
+
+        finally:
+            server.close()
+
+        self.assertLess(time.monotonic() - started_at, 2)
@@ -1,18 +1,164 @@
+from flask_sqlalchemy import SignallingSession
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.orm import scoped_session
 from src.config import TestConfig
 from src.app import create_app, db
+from src.tests.token_factory import TEST_ALGORITHMS, TEST_AUDIENCE, TEST_ISSUER, TEST_JWKS
+import os
 import unittest
 
 
+def get_worker_database_uri(database_uri=TestConfig.SQLALCHEMY_DATABASE_URI):
+    """
+    Returns the test database uri for the current pytest-xdist worker.
+
+    Each worker (gw0, gw1, ...) gets its own database so that tests can run in parallel
+    without stepping on each other. Outside of xdist the configured test database is used as is.
+    """
+    worker_id = os.environ.get('PYTEST_XDIST_WORKER')
+
+    if not worker_id:
+        return database_uri
+
+    url = make_url(database_uri)
+    url.database = f'{url.database}_{worker_id}'
+
+    return str(url)
+
+
+def create_database_if_missing(database_uri):
+    """Creates the database referenced by the uri if it does not exist yet"""
+    url = make_url(database_uri)
+    database_name = url.database
+    url.database = 'postgres'
+
+    engine = create_engine(url, isolation_level='AUTOCOMMIT')
+
+    try:
+        with engine.connect() as connection:
+            exists = connection.execute(
+                text('SELECT 1 FROM pg_database WHERE datname = :name'), name=database_name).scalar()
+
+            if not exists:
+                connection.execute(f'CREATE DATABASE "{database_name}"')
+
+    finally:
+        engine.dispose()
+
+
+class WorkerTestConfig(TestConfig):
+    """
+    Test configuration pointing at the database owned by the current test worker
+    """
+    SQLALCHEMY_DATABASE_URI = get_worker_database_uri()
+
+    # tokens are signed locally by the token factory instead of Auth0
+    AUTH0_ISSUER = TEST_ISSUER
+
+    AUTH0_API_AUDIENCE = TEST_AUDIENCE
+
+    AUTH0_ALGORITHMS = TEST_ALGORITHMS
+
+    AUTH0_JWKS = TEST_JWKS
+
+    # notifications sent inside the test transaction are never delivered
+    PG_NOTIFY_LISTENER_ENABLED = False
+
+
+class TransactionalTestSession(SignallingSession):
+    """
+    Session bound to a connection whose outer transaction is rolled back after each test.
+
+    The app calls db.session.close() at the end of every request, which would normally end
+    the test transaction. Here close() only discards the work done since the last savepoint.
+    """
+
+    def close(self):
+        if self.transaction is not None and self.transaction.nested:
+            self.rollback()
+
+        self.expunge_all()
+
+
+def restart_savepoint(session, transaction):
+    """
+    Opens a new savepoint whenever the application commits or rolls back the current one.
+
+    The session is expired like a real commit would, unless expire_on_commit was turned off.
+    """
+    if transaction.nested and not transaction._parent.nested:
+        if session.expire_on_commit:
+            session.expire_all()
+
+        session.begin_nested()
+
+
+_test_app = None
+
+
+def get_test_app():
+    """
+    Returns the app shared by every test in this process.
+
+    The schema is dropped and created once, the first time this is called,
+    instead of before and after every single test.
+    """
+    global _test_app
+
+    if _test_app is None:
+        create_database_if_missing(WorkerTestConfig.SQLALCHEMY_DATABASE_URI)
+
+        _test_app = create_app(WorkerTestConfig)
+
+        with _test_app.app_context():
+            db.drop_all()
+            db.create_all()
+
+    return _test_app
+
+
+def reset_id_sequences(connection):
+    """
+    Restarts the id sequences so each test sees ids starting from 1.
+
+    Sequences are not transactional so rolling back the test transaction does not reset them.
+    """
+    setval_calls = [f"setval(pg_get_serial_sequence('\"{table.name}\"', 'id'), 1, false)"
+                    for table in db.metadata.sorted_tables if 'id' in table.columns]
+
+    if setval_calls:
+        connection.execute(f'SELECT {", ".join(setval_calls)}')
+
+
 class TestSetup(unittest.TestCase):
     def setUp(self):
-        self.app = create_app(TestConfig)
+        self.app = get_test_app()
         self.client = self.app.test_client
         self.app_context = self.app.app_context()
         self.app_context.push()
-        db.drop_all()
-        db.create_all()
+
+        # cached reads of a previous test were rolled back with its transaction
+        self.app.extensions['cache_bus'].clear_all()
+
+        # every test runs inside a transaction which is rolled back in tearDown
+        self.connection = db.engine.connect()
+        self.transaction = self.connection.begin()
+        reset_id_sequences(self.connection)
+
+        self.session = TransactionalTestSession(
+            db, bind=self.connection, binds={})
+        self.session.begin_nested()
+        event.listen(self.session, 'after_transaction_end', restart_savepoint)
+
+        self.original_session = db.session
+        db.session = scoped_session(lambda: self.session)
 
     def tearDown(self):
-        db.session.remove()
-        db.drop_all()
+        db.session = self.original_session
+        event.remove(self.session, 'after_transaction_end', restart_savepoint)
+
+        self.session.expunge_all()
+        self.transaction.rollback()
+        self.connection.close()
         self.app_context.pop()
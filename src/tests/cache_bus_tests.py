@@ -0,0 +1,144 @@
+import threading
+import time
+import unittest
+from flask import Flask
+from src.app.utils.pg_notify import NotificationListener
+from src.app.utils.cache_bus import CacheInvalidationBus, CACHE_INVALIDATION_CHANNEL
+
+
+class CacheInvalidationBusTestCases(unittest.TestCase):
+    """
+    Tests to ensure that invalidation messages from other worker processes are applied to the local caches
+    """
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['PG_NOTIFY_LISTENER_ENABLED'] = False
+
+        self.listener = NotificationListener(self.app)
+        self.bus = CacheInvalidationBus(self.listener)
+
+    def test_message_invalidates_key(self):
+        """A message naming a key should only drop that key"""
+
+        cache = self.bus.get_cache('projects')
+        cache.set(1, ['Fyyur'])
+        cache.set(2, ['Trivia'])
+
+        self.listener.dispatch(CACHE_INVALIDATION_CHANNEL, {
+                               "namespace": "projects", "key": 1})
+
+        self.assertIsNone(cache.get(1))
+        self.assertEqual(cache.get(2), ['Trivia'])
+
+    def test_message_without_key_invalidates_namespace(self):
+        """A message without a key should drop the whole namespace and leave the others alone"""
+
+        nanodegrees = self.bus.get_cache('nanodegrees')
+        nanodegrees.set('all', ['Full Stack'])
+
+        users = self.bus.get_cache('users')
+        users.set('test-student@clients', 1)
+
+        self.listener.dispatch(CACHE_INVALIDATION_CHANNEL, {
+                               "namespace": "nanodegrees", "key": None})
+
+        self.assertEqual(len(nanodegrees), 0)
+        self.assertEqual(users.get('test-student@clients'), 1)
+
+    def test_reconnect_clears_all_caches(self):
+        """Messages may be lost while the listener reconnects so every cache should be cleared"""
+
+        self.bus.get_cache('users').set('test-student@clients', 1)
+
+        for callback in self.listener._connect_callbacks:
+            callback()
+
+        self.assertIsNone(self.bus.get_cache('users').get('test-student@clients'))
+
+    def test_entries_expire_after_ttl(self):
+        """The ttl is a safety net for missed messages"""
+
+        cache = self.bus.get_cache('enrollments', ttl=0.01)
+        cache.set(1, {'test-student@clients'})
+
+        time.sleep(0.02)
+
+        self.assertIsNone(cache.get(1))
+
+    def test_concurrent_misses_compute_once(self):
+        """Concurrent requests for a missing key should wait for a single computation"""
+
+        cache = self.bus.get_cache('nanodegrees', ttl=60)
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.1)
+            return ['Full Stack']
+
+        results = []
+
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute('all', compute)))
+                   for i in range(10)]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [['Full Stack']] * 10)
+
+    def test_stale_value_is_served_while_refreshing(self):
+        """An expired value within the grace window should be served while it is recomputed in the background"""
+
+        cache = self.bus.get_cache('questions')
+        cache.set(1, 'old page', ttl=0.01, grace=60)
+
+        time.sleep(0.02)
+
+        with self.app.app_context():
+            self.assertEqual(cache.get_or_compute(
+                1, lambda: 'new page', ttl=60, grace=60), 'old page')
+
+        # wait for the background refresh
+        deadline = time.monotonic() + 1
+
+        while cache.get(1) is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        self.assertEqual(cache.get(1), 'new page')
+
+    def test_value_computed_during_invalidation_is_not_cached(self):
+        """A value computed while its namespace was invalidated may be stale and should not be cached"""
+
+        cache = self.bus.get_cache('nanodegrees', ttl=60)
+
+        def compute():
+            self.listener.dispatch(CACHE_INVALIDATION_CHANNEL, {
+                                   "namespace": "nanodegrees", "key": None})
+            return ['Full Stack']
+
+        self.assertEqual(cache.get_or_compute('all', compute), ['Full Stack'])
+        self.assertIsNone(cache.get('all'))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        """A cache should keep at most max_entries entries and evict the least recently used ones first"""
+
+        cache = self.bus.get_cache('dashboards', max_entries=2)
+
+        cache.set('student-1', 'dashboard 1')
+        cache.set('student-2', 'dashboard 2')
+
+        # student-1 is used again so student-2 becomes the least recently used entry
+        self.assertEqual(cache.get_or_compute(
+            'student-1', lambda: 'recomputed'), 'dashboard 1')
+
+        cache.set('student-3', 'dashboard 3')
+
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get('student-2'))
+        self.assertEqual(cache.get('student-1'), 'dashboard 1')
+        self.assertEqual(cache.get('student-3'), 'dashboard 3')
@@ -0,0 +1,92 @@
+import gzip
+import unittest
+from flask import Flask, jsonify
+from src.app.utils.compression import init_compression, remove_encoding_from_etag
+from src.app.blueprints.api_v1.utils.preconditions import get_if_match_versions
+
+
+class CompressionTestCases(unittest.TestCase):
+    """
+    Tests to ensure that responses are compressed according to size and the client's Accept-Encoding header
+    """
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['COMPRESSION_MIN_SIZE'] = 500
+
+        @self.app.route('/large')
+        def large():
+            return jsonify({"data": ["question"] * 200})
+
+        @self.app.route('/versioned')
+        def versioned():
+            return jsonify({"data": ["question"] * 200}), 200, {"ETag": '"5"'}
+
+        @self.app.route('/small')
+        def small():
+            return jsonify({"data": "question"})
+
+        init_compression(self.app)
+
+        self.client = self.app.test_client
+
+    def test_large_response_is_gzipped(self):
+        """A large response should be gzipped for a client accepting gzip"""
+
+        response_object = self.client().get(
+            '/large', headers={"Accept-Encoding": "gzip"})
+
+        self.assertEqual(response_object.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response_object.headers['Vary'])
+
+        body = gzip.decompress(response_object.get_data())
+
+        self.assertIn(b'question', body)
+        self.assertEqual(int(response_object.headers['Content-Length']), len(
+            response_object.get_data()))
+
+    def test_responses_which_are_not_compressed(self):
+        """Small responses and responses to clients which do not accept gzip should be sent as is"""
+
+        requests = [('/small', 'gzip'), ('/large', 'identity'), ('/large', None)]
+
+        for endpoint, accept_encoding in requests:
+            headers = {"Accept-Encoding": accept_encoding} if accept_encoding else {}
+
+            response_object = self.client().get(endpoint, headers=headers)
+
+            self.assertNotIn('Content-Encoding', response_object.headers)
+            self.assertIsNotNone(response_object.get_json())
+
+    def test_compressed_body_is_cached(self):
+        """Identical responses should only be compressed once"""
+
+        for _ in range(3):
+            self.client().get('/large', headers={"Accept-Encoding": "gzip"})
+
+        body_cache = self.app.extensions['compressed_body_cache']
+
+        self.assertEqual(len(body_cache._entries), 1)
+
+    def test_compressed_response_keeps_a_strong_etag(self):
+        """A strong ETag should stay strong, with the encoding appended, when its response is compressed"""
+
+        response_object = self.client().get(
+            '/versioned', headers={"Accept-Encoding": "gzip"})
+
+        self.assertEqual(response_object.headers['ETag'], '"5-gzip"')
+        self.assertEqual(remove_encoding_from_etag(
+            response_object.get_etag()[0]), '5')
+
+        response_object = self.client().get('/versioned')
+
+        self.assertEqual(response_object.headers['ETag'], '"5"')
+
+    def test_if_match_uses_the_strong_comparison(self):
+        """The ETags of compressed responses should match their version in If-Match, weak ETags should not"""
+
+        if_match_headers = [('"5-gzip"', [5]), ('"5-br", "7"', [5, 7]), ('W/"5"', []), ('"5-deflate"', [])]
+
+        for if_match, versions in if_match_headers:
+            with self.app.test_request_context('/versioned', method='PATCH', headers={"If-Match": if_match}):
+                self.assertEqual(sorted(get_if_match_versions()), versions)
@@ -0,0 +1,22 @@
+import unittest
+from src.config import get_database_pool_size
+
+
+class DatabasePoolSizeTestCases(unittest.TestCase):
+    """
+    Tests to ensure that the web workers stay within the database connection budget
+    """
+
+    def test_workers_share_the_connection_budget(self):
+        """The pools and LISTEN connections of all the workers should fit in the budget"""
+
+        for max_connections, workers, threads in [(20, 9, 16), (20, 3, 8), (120, 9, 16), (20, 10, 4)]:
+            pool_size = get_database_pool_size(max_connections, workers, threads)
+
+            self.assertGreaterEqual(pool_size, 1)
+            self.assertLessEqual(workers * (pool_size + 1), max_connections)
+
+    def test_pool_is_not_larger_than_the_threads(self):
+        """A worker should not hold more connections than it has threads"""
+
+        self.assertEqual(get_database_pool_size(500, 2, 8), 8)
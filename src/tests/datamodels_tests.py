@@ -2,12 +2,15 @@ import os
 import random
 import json
 import sqlalchemy
+from sqlalchemy import event
+from src.app import db
 from src.tests.base import TestSetup
 from src.app.models.user import User
 from src.app.models.nanodegree import Nanodegree
 from src.app.models.project import Project
 from src.app.models.question import Question
 from src.app.models.answer import Answer
+from src.app.utils import hot_queries
 
 
 class UserModelTestCases(TestSetup):
@@ -65,6 +68,32 @@ class NanodegreeModelTestCases(TestSetup):
         self.assertEqual(type(list_of_nanodegrees), list)
         self.assertEqual(len(list_of_nanodegrees), 2)
 
+    def test_saved_nanodegree_is_not_reloaded(self):
+        """A saved object should be serialized from memory without selecting the row just inserted"""
+
+        statements = []
+
+        def record_statement(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record_statement)
+
+        try:
+            nanodegree = Nanodegree(
+                title="Full Stack Web Developer", description="Learn to build APIs")
+            nanodegree.save()
+
+            serialized_nanodegree = nanodegree.serialize()
+
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record_statement)
+
+        self.assertEqual(serialized_nanodegree['id'], 1)
+        self.assertEqual(serialized_nanodegree['title'], "Full Stack Web Developer")
+
+        self.assertEqual(
+            [statement for statement in statements if statement.lstrip().upper().startswith('SELECT')], [])
+
 
 class ProjectModelTestCases(TestSetup):
     """
@@ -145,3 +174,80 @@ class Question_And_Answer_Models_Test_Cases(TestSetup):
         self.assertEqual(question_one.project_id, 1)
         self.assertEqual(len(question_one.answers), 1)
         self.assertEqual(answer_one.question_id, 1)
+
+
+class HotQueryTestCases(TestSetup):
+    """
+    Tests to ensure that the baked hot queries return the same rows as the ORM queries they replace
+    """
+
+    def setUp(self):
+        super().setUp()
+
+        self.student = User(jwt_subject="hot-query-student")
+        self.other_student = User(jwt_subject="hot-query-other-student")
+
+        self.nanodegree = Nanodegree(
+            title="Full Stack Developer Nanodegree", description="None for now")
+        other_nanodegree = Nanodegree(
+            title="Data Engineer Nanodegree", description="None for now")
+
+        self.nanodegree.students.append(self.student)
+        other_nanodegree.students.append(self.other_student)
+
+        for number in range(3):
+            project = Project(title=f"Project {number}")
+            self.nanodegree.projects.append(project)
+
+            for question_number in range(4):
+                # one question of each project is deleted
+                question = Question(title=f"Question {number}.{question_number}",
+                                    details="None for now", user=self.student, is_deleted=question_number == 3)
+                project.questions.append(question)
+                self.nanodegree.questions.append(question)
+
+        db.session.add_all([self.nanodegree, other_nanodegree])
+        db.session.commit()
+
+    def test_hot_queries_match_the_orm_queries(self):
+        """Users, enrollments, projects and pages of questions should be the same as with the ORM queries"""
+
+        self.assertEqual(hot_queries.get_user(
+            "hot-query-student"), self.student)
+        self.assertIsNone(hot_queries.get_user("unknown-student"))
+        self.assertEqual(hot_queries.get_user_id(
+            "hot-query-other-student").id, self.other_student.id)
+
+        self.assertEqual(hot_queries.get_enrolled_student(
+            self.nanodegree.id, "hot-query-student"), self.student)
+        self.assertIsNone(hot_queries.get_enrolled_student(
+            self.nanodegree.id, "hot-query-other-student"))
+
+        self.assertEqual(hot_queries.get_by_id(
+            Nanodegree, self.nanodegree.id), self.nanodegree)
+
+        self.assertEqual(hot_queries.get_projects_of_nanodegree(self.nanodegree.id, ['id', 'title']),
+                         Project.query.filter_by(nanodegree_id=self.nanodegree.id).order_by(Project.id).all())
+
+        # deleted questions are neither listed nor counted
+        self.assertEqual(hot_queries.count_questions(), 9)
+
+        self.assertEqual(hot_queries.get_questions_page(5, 5, ['id', 'title']),
+                         Question.query.filter_by(is_deleted=False).order_by(Question.id).limit(5).offset(5).all())
+
+    def test_hot_queries_are_compiled_once(self):
+        """Running a hot query with other parameters should reuse its baked query and compiled SQL"""
+
+        hot_queries.get_user("hot-query-student")
+        hot_queries.get_projects_of_nanodegree(self.nanodegree.id, ['id', 'title'])
+
+        cache_size = len(hot_queries.bakery.cache)
+
+        hot_queries.get_user("hot-query-other-student")
+        hot_queries.get_projects_of_nanodegree(self.nanodegree.id + 1, ['id', 'title'])
+
+        self.assertEqual(len(hot_queries.bakery.cache), cache_size)
+
+        hot_queries.get_projects_of_nanodegree(self.nanodegree.id, ['id'])
+
+        self.assertGreater(len(hot_queries.bakery.cache), cache_size)
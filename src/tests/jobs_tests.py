@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta
+from src.app import db
+from src.app.models.job import Job, DeadJob
+from src.app.utils.jobs import TASKS, enqueue, run_next_job
+from src.tests.base import TestSetup
+
+
+class JobQueueTestCases(TestSetup):
+    """
+    Tests to ensure that background jobs are run once, retried with backoff and dead lettered
+    """
+
+    def setUp(self):
+        super().setUp()
+
+        self.calls = []
+
+        def record_call(**payload):
+            self.calls.append(payload)
+
+        def fail(**payload):
+            raise ValueError('the task failed')
+
+        TASKS['record_call'] = record_call
+        TASKS['fail'] = fail
+
+    def tearDown(self):
+        TASKS.pop('record_call')
+        TASKS.pop('fail')
+
+        super().tearDown()
+
+    def test_job_is_run_and_removed(self):
+        """A due job should be run with its payload and removed from the queue"""
+
+        enqueue('record_call', question_id=1)
+
+        self.assertTrue(run_next_job())
+
+        self.assertEqual(self.calls, [{"question_id": 1}])
+        self.assertEqual(Job.query.count(), 0)
+
+        # the queue is now empty
+        self.assertFalse(run_next_job())
+
+    def test_delayed_job_is_not_run_early(self):
+        """A job enqueued with a delay should not be run before it is due"""
+
+        enqueue('record_call', delay=60)
+
+        self.assertFalse(run_next_job())
+        self.assertEqual(self.calls, [])
+
+    def test_jobs_with_the_same_unique_key_are_coalesced(self):
+        """Only one pending job should exist for a unique key"""
+
+        enqueue('record_call', unique_key='refresh_stats')
+        enqueue('record_call', unique_key='refresh_stats')
+
+        self.assertEqual(Job.query.count(), 1)
+
+    def test_job_enqueued_while_running_is_not_coalesced(self):
+        """A job enqueued with the key of a running job should be added, so writes made during a run get a run of their own"""
+
+        def enqueue_during_run(**payload):
+            enqueue('record_call', unique_key='refresh_stats')
+
+        TASKS['enqueue_during_run'] = enqueue_during_run
+
+        try:
+            enqueue('enqueue_during_run', unique_key='refresh_stats')
+
+            self.assertTrue(run_next_job())
+
+        finally:
+            TASKS.pop('enqueue_during_run')
+
+        job = Job.query.one()
+
+        self.assertEqual(job.task, 'record_call')
+        self.assertEqual(job.unique_key, 'refresh_stats')
+
+        self.assertTrue(run_next_job())
+        self.assertEqual(self.calls, [{}])
+
+    def test_failed_job_is_retried_then_dead_lettered(self):
+        """A failing job should be retried with backoff and moved to dead_job after max_attempts"""
+
+        enqueue('fail', max_attempts=2)
+
+        self.assertTrue(run_next_job())
+
+        job = Job.query.one()
+
+        self.assertEqual(job.attempts, 1)
+        self.assertIn('the task failed', job.last_error)
+        self.assertGreater(job.run_at, datetime.utcnow())
+
+        # make the retry due straight away
+        job.run_at = datetime.utcnow() - timedelta(seconds=1)
+        db.session.commit()
+
+        self.assertTrue(run_next_job())
+
+        self.assertEqual(Job.query.count(), 0)
+
+        dead_job = DeadJob.query.one()
+
+        self.assertEqual(dead_job.task, 'fail')
+        self.assertEqual(dead_job.attempts, 2)
@@ -0,0 +1,129 @@
+import ast
+import os
+import re
+import unittest
+from src.app.models.nanodegree_stats import NANODEGREE_STATS_VIEW, PROJECT_STATS_VIEW
+from src.app.utils.online_migrations import REVIEWED_MARKER, check_revisions, find_unsafe_operations, get_literal
+
+VERSIONS_DIRECTORY = os.path.join(os.path.dirname(
+    os.path.dirname(__file__)), 'migrations', 'versions')
+
+UNSAFE_REVISION = '''
+def upgrade():
+    op.create_index(op.f('ix_question_posted_by'), 'question', ['posted_by'], unique=False)
+    op.add_column('answer', sa.Column('score', sa.Integer(), nullable=False))
+    op.alter_column('question', 'title', type_=sa.String(length=200))
+    op.alter_column('question', 'github_link', nullable=False)
+    op.create_unique_constraint('uq_project_title', 'project', ['title'])
+    op.create_foreign_key(None, 'answer', 'user', ['posted_by'], ['id'])
+    op.execute('CREATE INDEX ix_answer_date_posted ON answer (date_posted)')
+
+
+def downgrade():
+    op.drop_index(op.f('ix_question_posted_by'), table_name='question')
+'''
+
+SAFE_REVISION = f'''
+def upgrade():
+    op.create_table('badge',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_badge_user_id'), 'badge', ['user_id'], unique=False)
+    op.create_foreign_key(None, 'badge', 'user', ['user_id'], ['id'])
+    create_index_concurrently(op.f('ix_question_posted_by'), 'question', ['posted_by'])
+    op.create_index('ix_answer_posted_by', 'answer', ['posted_by'], postgresql_concurrently=True)
+    op.add_column('answer', sa.Column('score', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('answer', sa.Column('edited_at', sa.DateTime(), nullable=True))
+    op.alter_column('question', 'github_link', nullable=True)
+    op.create_unique_constraint('uq_nanodegree_title', 'nanodegree', ['title'])  {REVIEWED_MARKER}
+    op.execute('CREATE INDEX CONCURRENTLY ix_answer_date_posted ON answer (date_posted)')
+
+
+def downgrade():
+    op.drop_table('badge')
+'''
+
+
+def get_revisions_in_order(versions_directory):
+    """Returns the source of every revision, from the first one to the head"""
+    revisions = {}
+
+    for file_name in os.listdir(versions_directory):
+        if not file_name.endswith('.py'):
+            continue
+
+        with open(os.path.join(versions_directory, file_name)) as revision_file:
+            source = revision_file.read()
+
+        identifiers = {target.id: get_literal(node.value) for node in ast.parse(source).body
+                       if isinstance(node, ast.Assign) for target in node.targets if isinstance(target, ast.Name)}
+
+        revisions[identifiers['down_revision']] = (identifiers['revision'], source)
+
+    sources = []
+    revision = None
+
+    while revision in revisions:
+        revision, source = revisions[revision]
+        sources.append(source)
+
+    return sources
+
+
+def get_migrated_view_definitions(versions_directory):
+    """Returns the SQL of the latest CREATE MATERIALIZED VIEW run by the migrations for each view, by view name"""
+    view_definitions = {}
+
+    for source in get_revisions_in_order(versions_directory):
+        upgrade = next(node for node in ast.parse(source).body
+                       if isinstance(node, ast.FunctionDef) and node.name == 'upgrade')
+
+        for node in ast.walk(upgrade):
+            if isinstance(node, ast.Call) and getattr(node.func, 'attr', None) == 'execute' and node.args:
+                statement = get_literal(node.args[0])
+                match = re.search(r'CREATE MATERIALIZED VIEW (\w+)', str(statement))
+
+                if match:
+                    view_definitions[match.group(1)] = statement
+
+    return view_definitions
+
+
+def normalize_sql(statement):
+    return ' '.join(statement.split())
+
+
+class MigrationSafetyTestCases(unittest.TestCase):
+    """
+    Tests to ensure that the migrations don't block the tables of the live database
+    """
+
+    def test_unsafe_operations_are_found(self):
+        """Every operation blocking an existing table should be reported with its line"""
+
+        unsafe_operations = find_unsafe_operations(UNSAFE_REVISION)
+
+        self.assertEqual([line_number for line_number, message in unsafe_operations],
+                         [3, 4, 5, 6, 7, 8, 9])
+
+        self.assertIn('create_index_concurrently', unsafe_operations[0][1])
+
+    def test_safe_operations_are_not_reported(self):
+        """Operations on new tables, concurrent index builds and reviewed lines should not be reported"""
+
+        self.assertEqual(find_unsafe_operations(SAFE_REVISION), [])
+
+    def test_revisions_are_safe(self):
+        """Every revision which has not been reviewed should be safe to run on the live database"""
+
+        self.assertEqual(check_revisions(VERSIONS_DIRECTORY), {})
+
+    def test_stats_views_match_their_migrations(self):
+        """The views created with the tables by the tests should be the ones the migrations create"""
+
+        view_definitions = get_migrated_view_definitions(VERSIONS_DIRECTORY)
+
+        self.assertEqual(normalize_sql(view_definitions['project_stats']), normalize_sql(PROJECT_STATS_VIEW))
+        self.assertEqual(normalize_sql(view_definitions['nanodegree_stats']), normalize_sql(NANODEGREE_STATS_VIEW))
@@ -0,0 +1,163 @@
+from datetime import datetime
+from src.app.models.answer import Answer
+from src.app.models.nanodegree_stats import refresh_stats
+from src.app.utils.synthetic_data import SyntheticDataset, get_first_ids, load_dataset
+from src.tests.base import TestSetup
+from src.tests.token_factory import create_admin_token, create_student_token
+from src.tests.query_plans import record_statements, find_sequential_scans
+
+# the maximum number of SQL statements each route may execute for one request, notifications and
+# enqueued jobs included. The statements of COPY are sent outside of SQLAlchemy and are not counted.
+# Lower a budget when a route gets cheaper so that it can't silently get expensive again
+QUERY_BUDGETS = {
+    'api_v1.get_nanodegrees': 1,
+    'api_v1.create_nanodegree': 2,
+    'api_v1.get_nanodegree_projects': 2,
+    'api_v1.create_nanodegree_projects': 5,
+    'api_v1.get_projects_by_id': 1,
+    'api_v1.get_users_by_id': 1,
+    'api_v1.get_nanodegree_statistics': 3,
+    'api_v1.get_nanodegree_students': 4,
+    'api_v1.enroll_in_nanodegree': 9,
+    'api_v1.bulk_enroll_in_nanodegree': 10,
+    'api_v1.get_my_dashboard': 5,
+    'api_v1.create_new_question': 10,
+    'api_v1.get_questions': 2,
+    'api_v1.get_question': 3,
+    'api_v1.update_question': 3,
+    'api_v1.delete_question': 3,
+    'api_v1.comment_on_question': 3,
+    'api_v1.get_question_comments': 2,
+    'api_v1.comment_on_answer': 4,
+    'api_v1.get_answer_comments': 2
+}
+
+# routes which are not checked, and why
+UNCHECKED_ENDPOINTS = {
+    'api_v1.api_home': "does not query the database",
+    'api_v1.batch': "dispatches its sub-requests to the other routes",
+    'api_v1.get_activity_feed': "streams events for as long as the client stays connected"
+}
+
+
+class QueryPlanTestCases(TestSetup):
+    """
+    Tests to ensure that every api_v1 route stays within its query budget and reads the large tables through their indexes
+    """
+
+    def setUp(self):
+        super().setUp()
+
+        load_dataset(SyntheticDataset(seed=0, nanodegrees=5, projects_per_nanodegree=3, users=200,
+                                      questions=500, end=datetime(2026, 1, 1), first_ids=get_first_ids()))
+
+        self.admin_headers = {
+            "Authorization": f"Bearer {create_admin_token()}"
+        }
+
+        self.student_headers = {
+            "Authorization": f"Bearer {create_student_token()}"
+        }
+
+    def check_request(self, method, url, expected_status_code=200, **kwargs):
+        """
+        Sends a request and asserts that it executed at most the query budget of its route
+        and that none of its statements scans a large table
+        """
+        endpoint = self.app.url_map.bind('localhost').match(
+            url.split('?')[0], method)[0]
+
+        with record_statements() as statements:
+            response_object = self.client().open(url, method=method, **kwargs)
+
+        self.assertEqual(response_object.status_code, expected_status_code)
+
+        self.assertLessEqual(len(statements), QUERY_BUDGETS[endpoint],
+                             f"{endpoint} executed:\n" + '\n'.join(statement for statement, plan in statements))
+
+        for statement, plan in statements:
+            if plan is not None:
+                self.assertEqual(find_sequential_scans(plan), [],
+                                 f"{endpoint} scans a large table:\n{statement}")
+
+        return response_object
+
+    def test_every_route_has_a_query_budget(self):
+        """Every api_v1 route should either have a query budget or be explicitly left unchecked"""
+
+        endpoints = {rule.endpoint for rule in self.app.url_map.iter_rules()
+                     if rule.endpoint.startswith('api_v1.')}
+
+        self.assertEqual(
+            endpoints - set(QUERY_BUDGETS) - set(UNCHECKED_ENDPOINTS), set())
+
+    def test_read_routes(self):
+        """The public and admin read routes should use the indexes of the large tables"""
+
+        refresh_stats()
+
+        self.check_request('GET', '/api/v1/nanodegrees')
+        self.check_request('GET', '/api/v1/nanodegrees/1/projects')
+        self.check_request('GET', '/api/v1/projects?ids=1,2,3')
+        self.check_request('GET', '/api/v1/users?ids=1,2,3')
+        self.check_request('GET', '/api/v1/nanodegrees/2/stats')
+        self.check_request('GET', '/api/v1/nanodegrees/2/students',
+                           headers=self.admin_headers)
+
+        self.check_request('GET', '/api/v1/questions')
+        self.check_request('GET', '/api/v1/questions?ids=1,2,3')
+        self.check_request('GET', '/api/v1/questions/1')
+        self.check_request('GET', '/api/v1/questions/1/comments')
+        self.check_request('GET', '/api/v1/answers/1/comments')
+
+    def test_student_routes(self):
+        """Enrolling, asking, editing, commenting and deleting should use the indexes of the large tables"""
+
+        nanodegree_id = Answer.query.get(1).question.nanodegree_id
+
+        self.check_request(
+            'GET', f'/api/v1/nanodegrees/{nanodegree_id}/enroll', headers=self.student_headers)
+
+        response_object = self.check_request('POST', '/api/v1/questions', 201, headers=self.student_headers, json={
+            "title": "Why is my query slow?",
+            "details": "It reads the whole table",
+            "nanodegree_id": nanodegree_id,
+            "project_id": (nanodegree_id - 1) * 3 + 1,
+            "github_link": None
+        })
+
+        question_id = response_object.get_json()['data']['id']
+
+        self.check_request('GET', '/api/v1/me/dashboard',
+                           headers=self.student_headers)
+
+        self.check_request('PATCH', f'/api/v1/questions/{question_id}',
+                           headers=dict(self.student_headers, **{"If-Match": '"1"'}),
+                           json={"title": "Why is my query still slow?"})
+
+        self.check_request('POST', f'/api/v1/questions/{question_id}/comments', 201,
+                           headers=self.student_headers, json={"details": "Found it, a missing index"})
+
+        self.check_request('POST', '/api/v1/answers/1/comments', 201,
+                           headers=self.student_headers, json={"details": "Thanks!"})
+
+        self.check_request('DELETE', f'/api/v1/questions/{question_id}',
+                           headers=self.student_headers)
+
+    def test_admin_write_routes(self):
+        """Creating nanodegrees and projects and enrolling a cohort should use the indexes of the large tables"""
+
+        response_object = self.check_request('POST', '/api/v1/nanodegrees', 201, headers=self.admin_headers, json={
+            "title": "Data Engineer",
+            "description": "None for now"
+        })
+
+        nanodegree_id = response_object.get_json()['data']['id']
+
+        self.check_request('POST', f'/api/v1/nanodegrees/{nanodegree_id}/projects', 201, headers=self.admin_headers, json={
+            "projects": [{"title": "Data Modeling"}, {"title": "Data Pipelines"}]
+        })
+
+        self.check_request('POST', f'/api/v1/nanodegrees/{nanodegree_id}/enrollments',
+                           headers=dict(self.admin_headers, **{"Content-Type": "text/csv"}),
+                           data="synthetic|1\nsynthetic|2\ncohort-student-1\n")
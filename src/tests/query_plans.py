@@ -0,0 +1,85 @@
+"""
+Records the SQL statements executed while handling requests along with their Postgres query plans.
+
+Used by query_plan_tests.py to keep every api_v1 route within a number of queries
+and away from sequential scans of the tables which grow with the number of students.
+"""
+from contextlib import contextmanager
+from sqlalchemy import event
+from src.app import db
+
+# tables which grow with the number of students, a sequential scan of one of them does not scale
+LARGE_TABLES = {'user', 'nanodegree_enrollment', 'question', 'answer', 'question_comment',
+                'answer_comment', 'activity_event', 'idempotency_key', 'job'}
+
+# statements of the test transaction itself, which the app does not send in production
+IGNORED_STATEMENTS = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+
+EXPLAINED_STATEMENTS = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE')
+
+
+def explain(dbapi_connection, statement, parameters):
+    """
+    Returns the JSON plan of a statement without running it.
+
+    Sequential scans are disabled first so that the planner only picks one when no index can
+    serve the query. The plans then don't depend on the size of the test tables, which are far
+    too small for an index to be cheaper than reading the whole table.
+    The setting is local to the test transaction.
+    """
+    cursor = dbapi_connection.cursor()
+
+    try:
+        cursor.execute('SET LOCAL enable_seqscan = off')
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {statement}', parameters)
+
+        return cursor.fetchone()[0][0]['Plan']
+
+    finally:
+        cursor.close()
+
+
+def iter_plan_nodes(plan):
+    yield plan
+
+    for child_plan in plan.get('Plans', []):
+        yield from iter_plan_nodes(child_plan)
+
+
+def find_sequential_scans(plan, tables=LARGE_TABLES):
+    """Returns the names of the given tables which are read with a sequential scan in a plan"""
+    return sorted({node['Relation Name'] for node in iter_plan_nodes(plan)
+                   if node['Node Type'] == 'Seq Scan' and node.get('Relation Name') in tables})
+
+
+@contextmanager
+def record_statements():
+    """
+    Yields a list which is filled with a (statement, plan) tuple for each statement executed in the block.
+
+    Statements are explained right before they run, while the temporary tables and rows
+    they rely on still exist. Statements which can't be explained, like COPY or DDL, get a None plan.
+    """
+    statements = []
+
+    def record_statement(conn, cursor, statement, parameters, context, executemany):
+        keyword = statement.lstrip().upper()
+
+        if keyword.startswith(IGNORED_STATEMENTS):
+            return
+
+        plan = None
+
+        if keyword.startswith(EXPLAINED_STATEMENTS):
+            plan = explain(cursor.connection, statement,
+                           parameters[0] if executemany else parameters)
+
+        statements.append((statement, plan))
+
+    event.listen(db.engine, 'before_cursor_execute', record_statement)
+
+    try:
+        yield statements
+
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record_statement)
@@ -0,0 +1,112 @@
+import unittest
+from collections import Counter
+from datetime import datetime
+from src.app.utils.synthetic_data import SyntheticDataset, RowStream, COLUMNS
+
+
+def generate(**options):
+    """Returns the rows generated for each table, parsed back from the text given to COPY"""
+    dataset = SyntheticDataset(end=datetime(2026, 1, 1), **options)
+
+    return {table: [line.split('\t') for line in rows.read().splitlines()]
+            for table, rows in dataset.tables()}, dataset
+
+
+class SyntheticDatasetTestCases(unittest.TestCase):
+    """
+    Tests to ensure that the synthetic datasets are reproducible and consistent
+    """
+
+    options = {
+        "nanodegrees": 5,
+        "projects_per_nanodegree": 3,
+        "users": 300,
+        "questions": 1000,
+        "first_ids": {"user": 11, "question": 101}
+    }
+
+    def test_same_seed_generates_the_same_rows(self):
+        """Two datasets generated with the same seed should be identical, and differ from another seed"""
+
+        rows, dataset = generate(seed=7, **self.options)
+
+        self.assertEqual(generate(seed=7, **self.options)[0], rows)
+        self.assertNotEqual(generate(seed=8, **self.options)[0], rows)
+
+        for table, table_rows in rows.items():
+            self.assertEqual(len(table_rows), dataset.counts[table])
+
+            for row in table_rows:
+                self.assertEqual(len(row), len(COLUMNS[table]))
+
+    def test_rows_reference_each_other(self):
+        """Questions should be asked by enrolled students in the projects of their nanodegree and answers should follow their question"""
+
+        rows, dataset = generate(seed=1, **self.options)
+
+        enrollments = {(int(user_id), int(nanodegree_id))
+                       for user_id, nanodegree_id in rows['nanodegree_enrollment']}
+
+        project_nanodegrees = {int(project[0]): int(project[3])
+                               for project in rows['project']}
+
+        questions = {}
+
+        for question in rows['question']:
+            question_id, posted_by, nanodegree_id, project_id = int(question[0]), int(
+                question[4]), int(question[5]), int(question[6])
+
+            self.assertIn((posted_by, nanodegree_id), enrollments)
+            self.assertEqual(project_nanodegrees[project_id], nanodegree_id)
+
+            questions[question_id] = question
+
+        self.assertEqual(min(questions), 101)
+        self.assertEqual(min(user_id for user_id, nanodegree_id in enrollments), 11)
+
+        accepted_answers = Counter()
+
+        for answer in rows['answer']:
+            question = questions[int(answer[4])]
+
+            self.assertGreaterEqual(answer[1], question[1])
+            self.assertLessEqual(len(answer[3]), 10000)
+
+            if answer[5] == 't':
+                accepted_answers[int(answer[4])] += 1
+
+        for question_id, question in questions.items():
+            self.assertEqual(accepted_answers[question_id], 1 if question[9] == 't' else 0)
+
+    def test_enrollments_are_skewed(self):
+        """The first nanodegrees should be much more popular than the last ones"""
+
+        rows, dataset = generate(seed=3, **self.options)
+
+        enrollments_per_nanodegree = Counter(
+            int(nanodegree_id) for user_id, nanodegree_id in rows['nanodegree_enrollment'])
+
+        self.assertGreater(
+            enrollments_per_nanodegree[1], 2 * enrollments_per_nanodegree[5])
+
+        # every user is enrolled at least once
+        self.assertEqual(len({user_id for user_id, nanodegree_id in rows['nanodegree_enrollment']}), 300)
+
+    def test_row_stream_reads_in_chunks(self):
+        """Reading a row stream in small chunks should return the same rows as reading it at once"""
+
+        rows = [(number, f'row {number}', None) for number in range(2500)]
+
+        stream = RowStream(rows)
+        chunks = []
+
+        while True:
+            chunk = stream.read(100)
+
+            if not chunk:
+                break
+
+            chunks.append(chunk)
+
+        self.assertEqual(''.join(chunks), RowStream(rows).read())
+        self.assertEqual(''.join(chunks).splitlines()[-1], '2499\trow 2499\t\\N')
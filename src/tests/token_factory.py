@@ -0,0 +1,60 @@
+"""
+Signs access tokens locally so that the tests never have to reach the Auth0 tenant.
+
+The tokens are shaped like the ones issued by Auth0 for machine to machine applications
+and are verified by the app against TEST_JWKS instead of the tenant's live JWKS.
+"""
+import time
+import rsa
+from jose import jwk, jwt
+
+TEST_KEY_ID = 'student-hub-test-key'
+TEST_ISSUER = 'https://student-hub.test/'
+TEST_AUDIENCE = 'student-hub-test-api'
+TEST_ALGORITHMS = ['RS256']
+
+ADMIN_PERMISSIONS = ['create:nanodegree',
+                     'create:project', 'get:nanodegree-students', 'create:enrollments']
+
+STUDENT_PERMISSIONS = ['create:question', 'update:question',
+                       'delete:question', 'create:answer', 'create:comment']
+
+# A throwaway key pair generated once per test process
+_public_key, _private_key = rsa.newkeys(1024)
+
+PRIVATE_KEY_PEM = _private_key.save_pkcs1().decode()
+
+TEST_JWKS = {
+    "keys": [
+        dict(jwk.construct(PRIVATE_KEY_PEM, 'RS256').public_key().to_dict(),
+             kid=TEST_KEY_ID, use='sig')
+    ]
+}
+
+
+def create_test_token(subject, permissions=(), expires_in=3600, issuer=TEST_ISSUER, audience=TEST_AUDIENCE, key_id=TEST_KEY_ID):
+    """
+    Returns a signed access token for the subject with the given set of permissions
+    """
+    issued_at = int(time.time())
+
+    claims = {
+        "sub": subject,
+        "iss": issuer,
+        "aud": audience,
+        "iat": issued_at,
+        "exp": issued_at + expires_in,
+        "permissions": list(permissions)
+    }
+
+    return jwt.encode(claims, PRIVATE_KEY_PEM, algorithm=TEST_ALGORITHMS[0], headers={"kid": key_id})
+
+
+def create_admin_token(subject='test-admin@clients'):
+    """Returns a token carrying the admin permissions"""
+    return create_test_token(subject, ADMIN_PERMISSIONS)
+
+
+def create_student_token(subject='test-student@clients'):
+    """Returns a token carrying the student permissions"""
+    return create_test_token(subject, STUDENT_PERMISSIONS)